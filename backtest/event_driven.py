@@ -0,0 +1,357 @@
+import heapq
+from collections import namedtuple
+
+import numpy as np
+
+from backtest.first_touch import FirstTouchBacktester, EXIT_SL, EXIT_TP, EXIT_REVERSE, day_index
+
+TRADE_DTYPE = np.dtype([
+    ('entry_index', np.int64),
+    ('exit_index', np.int64),
+    ('side', np.int8),
+    ('entry_price', np.float64),
+    ('exit_price', np.float64),
+    ('lot_size', np.float64),
+    ('price_diff', np.float64),
+    ('pnl', np.float64),
+    ('exit_reason', np.int8),
+])
+
+EventDrivenResult = namedtuple('EventDrivenResult', ['trades', 'capital', 'level', 'open_positions'])
+
+
+class Position:
+    """Một lệnh đang mở. `pending` là thứ tự các cấu hình trailing chưa được áp dụng."""
+
+    __slots__ = ('entry_index', 'side', 'entry_price', 'sl_price', 'tp_price', 'lot_size', 'pending')
+
+    def __init__(self, entry_index, side, entry_price, sl_price, tp_price, lot_size, pending):
+        self.entry_index = entry_index
+        self.side = side
+        self.entry_price = entry_price
+        self.sl_price = sl_price
+        self.tp_price = tp_price
+        self.lot_size = lot_size
+        self.pending = pending
+
+
+# ------ Policies ------ #
+
+class TrailingLadder:
+    """
+    Dời SL/TP theo danh sách TrailingStopConfig, mỗi cấu hình áp dụng một lần khi close vượt
+    entry ± threshold (giống các hàm backtest cũ).
+    """
+
+    def __init__(self, trailing_configs=()):
+        self.configs = list(trailing_configs)
+
+    def trigger_price(self, position, idx):
+        # Lệnh mua kích hoạt khi close > giá này, lệnh bán khi close < giá này
+        if position.side > 0:
+            return position.entry_price + self.configs[idx].threshold
+        return position.entry_price - self.configs[idx].threshold
+
+    def apply(self, position, idx):
+        config = self.configs[idx]
+        if position.side > 0:
+            position.sl_price = position.entry_price + config.sl_adjustment
+            position.tp_price += config.tp_adjustment
+        else:
+            position.sl_price = position.entry_price - config.sl_adjustment
+            position.tp_price -= config.tp_adjustment
+
+
+class FixedLot:
+    """Khối lượng cố định cho mọi lệnh."""
+
+    def __init__(self, lot_size=1.0):
+        self.lot_size = lot_size
+
+    def __call__(self, backtester):
+        return self.lot_size
+
+
+class CapitalLot:
+    """Khối lượng theo vốn hiện tại (vốn ban đầu + PnL các lệnh đã đóng), vd. bảng vốn -> lot."""
+
+    def __init__(self, lot_for_capital):
+        self.lot_for_capital = lot_for_capital
+
+    def __call__(self, backtester):
+        return self.lot_for_capital(backtester.capital)
+
+
+class LevelLot:
+    """Khối lượng theo bậc hiện tại (tăng mỗi ngày đạt mục tiêu của DailyTarget)."""
+
+    def __init__(self, lot_for_level):
+        self.lot_for_level = lot_for_level
+
+    def __call__(self, backtester):
+        return self.lot_for_level(backtester.level)
+
+
+class DailyTarget:
+    """
+    Dừng mở lệnh mới trong ngày khi tổng kết quả các lệnh trong ngày đạt `target`.
+
+    Mặc định kết quả của lệnh được tính khi lệnh đóng, vào ngày đóng lệnh. Với `at_entry`, kết quả chạm đầu tiên
+    của lệnh (đã biết khi vào lệnh) được tính ngay khi mở lệnh vào ngày mở lệnh, và bậc chỉ tăng khi còn nến sau
+    trong cùng ngày, giống vòng lặp cũ của `run_compound_backtest_with_daily_target`.
+
+    :param target: mục tiêu trong ngày
+    :param measure: 'pnl' (lợi nhuận) hoặc 'price_diff' (chênh lệch giá, như backtest lãi kép theo bậc)
+    :param level_up: tăng `level` của backtester một bậc mỗi ngày đạt mục tiêu
+    :param at_entry: tính kết quả lệnh vào ngày mở lệnh ngay khi mở thay vì khi lệnh đóng
+    """
+
+    def __init__(self, target, measure='pnl', level_up=False, at_entry=False):
+        if measure not in ('pnl', 'price_diff'):
+            raise ValueError(f"measure phải là 'pnl' hoặc 'price_diff', nhận {measure!r}")
+        self.target = target
+        self.measure = measure
+        self.level_up = level_up
+        self.at_entry = at_entry
+        self.day = None
+        self.total = 0.0
+        self.reached = False
+
+    def _roll(self, day):
+        if day != self.day:
+            self.day = day
+            self.total = 0.0
+            self.reached = False
+
+    def _update(self, backtester):
+        if self.level_up and not self.reached and self.total >= self.target:
+            backtester.level += 1
+        self.reached = self.total >= self.target
+
+    def check(self, backtester, day):
+        """Xét mục tiêu tại một nến của ngày `day`; với `at_entry`, bậc tăng ở nến đầu tiên sau khi đạt mục tiêu."""
+        self._roll(day)
+        if self.at_entry:
+            self._update(backtester)
+
+    def allow_entry(self, backtester, day):
+        self.check(backtester, day)
+        return self.total < self.target
+
+    def on_entry(self, backtester, day, trade):
+        if self.at_entry:
+            self._roll(day)
+            self.total += trade[self.measure]
+
+    def on_close(self, backtester, day, trade):
+        if not self.at_entry:
+            self._roll(day)
+            self.total += trade[self.measure]
+            self._update(backtester)
+
+
+# ------ Backtester ------ #
+
+class EventDrivenBacktester:
+    """
+    Backtest hướng sự kiện: đi qua dữ liệu một lần theo thứ tự thời gian, giữ tập lệnh đang mở.
+
+    Sự kiện là nến có tín hiệu (mở lệnh) và nến tiếp theo mà một lệnh đang mở có thay đổi (đóng lệnh
+    hoặc dời SL/TP). Nến sự kiện của mỗi lệnh được tìm bằng chạm đầu tiên (`backtest.first_touch`) trên
+    đoạn dữ liệu hiện tại, nên các nến không có sự kiện không tốn vòng lặp Python. Dữ liệu có thể được nạp
+    theo từng đoạn (`feed`), bộ nhớ chỉ phụ thuộc kích thước đoạn và số lệnh đang mở, không phụ thuộc tổng
+    số nến; lệnh còn mở ở cuối đoạn được chuyển sang đoạn sau.
+
+    Quy tắc đóng lệnh giống `run_simple_backtest`: mỗi tín hiệu (từ nến thứ 2) mở một lệnh độc lập, lệnh
+    đóng khi chạm SL/TP hoặc khi có tín hiệu ngược chiều, trailing được áp dụng sau khi kiểm tra đóng lệnh.
+    Trong cùng một nến, lệnh mới được mở trước khi các lệnh cũ đóng, nên vốn dùng để tính khối lượng chỉ
+    gồm các lệnh đã đóng ở nến trước đó (như `close_at < i` trong `run_compound_backtest`).
+
+    Khác với các hàm cũ, kết quả của lệnh chỉ được tính vào vốn và mục tiêu ngày khi lệnh thực sự đóng
+    (không nhìn trước kết quả tại thời điểm mở lệnh), trừ mục tiêu ngày `DailyTarget(at_entry=True)`: khi đó kết quả
+    chạm đầu tiên của lệnh trên đoạn dữ liệu hiện tại được tính ngay khi mở lệnh (0 nếu lệnh chưa đóng trước cuối
+    đoạn, như lệnh không bao giờ đóng trong vòng lặp cũ).
+
+    :param trailing: TrailingLadder hoặc danh sách TrailingStopConfig
+    :param sizing: hàm nhận backtester trả về khối lượng lệnh (FixedLot, CapitalLot, LevelLot)
+    :param daily_target: DailyTarget hoặc None
+    :param init_capital: vốn ban đầu
+    :param contract_size: hệ số quy đổi chênh lệch giá * lot sang tiền (100 với vàng trong backtest lãi kép)
+    :param entry_column: cột giá vào lệnh ('close' hoặc 'entry_price' như các hàm *_with_entry_price)
+    :param keep_trades: lưu các lệnh đã đóng để trả về trong `result()`
+    :param on_trade: hàm gọi với mỗi lệnh đã đóng (bản ghi TRADE_DTYPE), vd. để tính chỉ số theo dòng
+    :param intrabar: IntrabarIndex trên toàn bộ các nến sẽ được nạp, để phân giải nến chạm cả SL và TP
+    """
+
+    def __init__(self, trailing=None, sizing=None, daily_target=None, init_capital=0.0, contract_size=1.0,
+                 entry_column='close', keep_trades=True, on_trade=None, intrabar=None):
+        self.trailing = trailing if isinstance(trailing, TrailingLadder) else TrailingLadder(trailing or ())
+        self.sizing = FixedLot() if sizing is None else sizing
+        self.daily_target = daily_target
+        self.contract_size = contract_size
+        self.entry_column = entry_column
+        self.keep_trades = keep_trades
+        self.on_trade = on_trade
+        self.intrabar = intrabar
+
+        self.capital = init_capital
+        self.level = 1
+        self.positions = []
+        self.offset = 0
+        self._check_next = False
+        self._trades = np.empty(0, dtype=TRADE_DTYPE)
+        self._count = 0
+
+    def _record(self, values):
+        # values: tuple theo thứ tự các trường của TRADE_DTYPE
+        if not self.keep_trades:
+            return np.array(values, dtype=TRADE_DTYPE)[()]
+        if self._count == len(self._trades):
+            grown = np.empty(max(2 * len(self._trades), 1024), dtype=TRADE_DTYPE)
+            grown[:self._count] = self._trades[:self._count]
+            self._trades = grown
+        self._trades[self._count] = values
+        self._count += 1
+        return self._trades[self._count - 1]
+
+    def _next_event(self, engine, position, start):
+        # (nến sự kiện cục bộ, có phải đóng lệnh) trong đoạn hiện tại, None nếu không có
+        triggers = []
+        for idx in position.pending:
+            level = self.trailing.trigger_price(position, idx)
+            if position.side > 0:
+                bar = engine.close_above.first_below(-level, start)
+            else:
+                bar = engine.close_below.first_below(level, start)
+            if bar is not None:
+                triggers.append(bar)
+
+        stop = min(triggers) + 1 if triggers else len(engine.signal)
+        bar = engine.first_exit(position.side, start, stop, position.sl_price, position.tp_price)
+        if bar is not None:
+            return bar, True
+        if triggers:
+            return stop - 1, False
+        return None
+
+    def _trail(self, position, close):
+        # Áp dụng các cấu hình trailing kích hoạt tại giá close, theo thứ tự khai báo
+        pending = []
+        for idx in position.pending:
+            level = self.trailing.trigger_price(position, idx)
+            if (close > level) if position.side > 0 else (close < level):
+                self.trailing.apply(position, idx)
+            else:
+                pending.append(idx)
+        position.pending = pending
+
+    def _close(self, engine, position, bar, day):
+        diff, reason = engine.close_trade(position.side, bar, position.entry_price, position.sl_price,
+                                          position.tp_price)
+        exit_price = {EXIT_SL: position.sl_price, EXIT_TP: position.tp_price}.get(reason)
+        if reason == EXIT_REVERSE:
+            exit_price = engine.close[bar]
+        pnl = diff * position.lot_size * self.contract_size
+
+        trade = self._record((position.entry_index, self.offset + bar, position.side, position.entry_price,
+                              exit_price, position.lot_size, diff, pnl, reason))
+
+        # PnL được cộng vào vốn ngay, nhưng lệnh mới ở cùng nến đã được mở trước đó
+        self.capital += pnl
+        if self.daily_target is not None:
+            self.daily_target.on_close(self, day[bar], trade)
+        if self.on_trade is not None:
+            self.on_trade(trade)
+
+    def _enter(self, engine, position, bar, day):
+        # DailyTarget(at_entry=True): kết quả chạm đầu tiên của lệnh trong đoạn hiện tại, rồi xét mục tiêu ở nến kế
+        # tiếp (nến đầu đoạn sau nếu lệnh mở ở nến cuối đoạn)
+        diff, _, _ = engine.trade(bar, position.side, position.entry_price, position.sl_price, position.tp_price,
+                                  self.trailing.configs)
+        pnl = diff * position.lot_size * self.contract_size
+        self.daily_target.on_entry(self, day[bar], {'price_diff': diff, 'pnl': pnl})
+        if bar + 1 < len(day):
+            self.daily_target.check(self, day[bar + 1])
+        else:
+            self._check_next = True
+
+    def _schedule(self, engine, events, position, start):
+        event = self._next_event(engine, position, start)
+        if event is None:
+            self.positions.append(position)
+        else:
+            bar, closing = event
+            heapq.heappush(events, (bar, position.entry_index, closing, position))
+
+    def _process(self, engine, events, until, day):
+        # Xử lý các sự kiện của lệnh đang mở tại các nến < until
+        while events and events[0][0] < until:
+            bar, _, closing, position = heapq.heappop(events)
+            if closing:
+                self._close(engine, position, bar, day)
+            else:
+                self._trail(position, engine.close[bar])
+                self._schedule(engine, events, position, bar + 1)
+
+    def feed(self, chunk):
+        """
+        Nạp một đoạn dữ liệu tiếp theo.
+
+        :param chunk: pd.DataFrame hoặc dict mảng với các cột Signal, high, low, close, SL, TP, cột giá vào
+                      lệnh `entry_column` và time (khi có daily_target)
+        :return: self
+        """
+        n = len(chunk['Signal'])
+        intrabar = None if self.intrabar is None else self.intrabar.slice(self.offset, self.offset + n)
+        engine = FirstTouchBacktester(chunk['Signal'], chunk['high'], chunk['low'], chunk['close'], intrabar)
+        sl = np.asarray(chunk['SL'], dtype=float)
+        tp = np.asarray(chunk['TP'], dtype=float)
+        entry = np.asarray(chunk[self.entry_column], dtype=float)
+        day = day_index(chunk['time']) if self.daily_target is not None else None
+
+        if self._check_next and n:
+            self.daily_target.check(self, day[0])
+            self._check_next = False
+
+        # Lệnh mang sang từ đoạn trước được xét lại từ đầu đoạn này
+        events = []
+        carried, self.positions = self.positions, []
+        for position in carried:
+            self._schedule(engine, events, position, 0)
+
+        signals = np.flatnonzero((engine.signal == 1) | (engine.signal == -1)).tolist()
+        for i in signals:
+            if self.offset + i == 0:
+                continue
+            self._process(engine, events, i, day)
+            if self.daily_target is not None and not self.daily_target.allow_entry(self, day[i]):
+                continue
+
+            side = 1 if engine.signal[i] == 1 else -1
+            position = Position(self.offset + i, side, entry[i], sl[i], tp[i], self.sizing(self),
+                                list(range(len(self.trailing.configs))))
+            if self.daily_target is not None and self.daily_target.at_entry:
+                self._enter(engine, position, i, day)
+            self._schedule(engine, events, position, i + 1)
+
+        self._process(engine, events, n, day)
+        self.offset += n
+        return self
+
+    def run(self, chunks):
+        """Nạp lần lượt các đoạn dữ liệu (vd. `iter_chunks(df)`), trả về `result()`."""
+        for chunk in chunks:
+            self.feed(chunk)
+        return self.result()
+
+    def result(self):
+        """EventDrivenResult(trades, capital, level, open_positions), trades là mảng TRADE_DTYPE chỉ đọc."""
+        trades = self._trades[:self._count]
+        trades.flags.writeable = False
+        return EventDrivenResult(trades, self.capital, self.level, list(self.positions))
+
+
+def iter_chunks(df, chunk_size=1_000_000):
+    """Chia DataFrame thành các đoạn liên tiếp để nạp vào EventDrivenBacktester."""
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
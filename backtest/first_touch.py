@@ -0,0 +1,282 @@
+import copy
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Lý do đóng lệnh trong `FirstTouchResult.exit_reason`
+EXIT_SKIPPED = -1  # Tín hiệu bị bỏ qua vì đã đạt mục tiêu lợi nhuận ngày
+EXIT_NONE = 0  # Không có tín hiệu, hoặc lệnh chưa đóng khi hết dữ liệu
+EXIT_SL = 1
+EXIT_TP = 2
+EXIT_REVERSE = 3  # Đóng theo giá close khi có tín hiệu ngược chiều
+
+FirstTouchResult = namedtuple('FirstTouchResult', ['pnl', 'exit_index', 'exit_reason'])
+
+
+class FirstTouchIndex:
+    """
+    Tìm chạm đầu tiên: chỉ số j nhỏ nhất trong [start, stop) với values[j] < level.
+
+    Mảng được chia thành các khối `block` phần tử; giá trị nhỏ nhất của mỗi khối được gom thành bảng
+    thưa (min của 2^k khối liên tiếp), nên từ `start` chỉ cần nhảy nhị phân qua các khối không có phần tử
+    nào nhỏ hơn `level` rồi quét một khối duy nhất: O(block + log n) cho mỗi truy vấn thay vì quét từng nến.
+
+    Chạm "vượt lên" (values[j] > level) được đưa về dạng trên bằng cách tạo chỉ mục cho -values với -level.
+    NaN không bao giờ thỏa so sánh, giống điều kiện trong vòng lặp backtest.
+
+    :param values: mảng giá
+    :param block: số phần tử mỗi khối
+    """
+
+    def __init__(self, values, block=64):
+        values = np.asarray(values, dtype=float)
+        self.values = np.where(np.isnan(values), np.inf, values)
+        self.block = block
+
+        n_blocks = max(-(-len(values) // block), 1)
+        padded = np.full(n_blocks * block, np.inf)
+        padded[:len(values)] = self.values
+        # table[k][b] = min của các khối b .. b + 2^k - 1
+        self.table = [padded.reshape(n_blocks, block).min(axis=1)]
+        while 2 ** len(self.table) <= n_blocks:
+            previous, half = self.table[-1], 2 ** (len(self.table) - 1)
+            self.table.append(np.minimum(previous[:-half], previous[half:]))
+
+    def first_below(self, level, start, stop=None):
+        """Chỉ số đầu tiên trong [start, stop) có giá trị nhỏ hơn `level`, None nếu không có."""
+        values, block = self.values, self.block
+        stop = len(values) if stop is None else min(stop, len(values))
+        if start >= stop or level != level:
+            return None
+
+        # Phần còn lại của khối chứa `start`
+        end = min((start // block + 1) * block, stop)
+        touched = values[start:end] < level
+        offset = touched.argmax()
+        if touched[offset]:
+            return start + int(offset)
+
+        if end == stop:
+            return None
+
+        # Nhảy qua các khối có min >= level
+        position = end // block
+        for k in range(len(self.table) - 1, -1, -1):
+            level_k = self.table[k]
+            if position < len(level_k) and level_k[position] >= level:
+                position += 2 ** k
+
+        begin = position * block
+        if begin >= stop:
+            return None
+        touched = values[begin:min(begin + block, stop)] < level
+        offset = touched.argmax()
+        return begin + int(offset) if touched[offset] else None
+
+
+def day_index(time):
+    """Mã ngày (số ngày kể từ epoch) theo giờ địa phương của cột thời gian, giữ nguyên múi giờ của dữ liệu."""
+    dates = pd.to_datetime(time)
+    if not isinstance(dates, pd.Series):
+        dates = pd.Series(dates)
+    return dates.dt.tz_localize(None).to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def _next_index(mask):
+    # next[j] = chỉ số nhỏ nhất >= j có mask True (len(mask) nếu không có)
+    n = len(mask)
+    index = np.where(mask, np.arange(n), n)
+    return np.minimum.accumulate(index[::-1])[::-1]
+
+
+class FirstTouchBacktester:
+    """
+    Backtest theo tín hiệu trên mảng NumPy, cho cùng cột PnL với các hàm `run_simple_backtest*`.
+
+    Mỗi tín hiệu (Signal = 1 mua, -1 bán, từ nến thứ 2) là một lệnh độc lập. Thay vì quét từng nến sau
+    điểm vào lệnh, nến đóng lệnh được tìm bằng chạm đầu tiên:
+      - nến đầu tiên low < SL / high > TP (hoặc ngược lại với lệnh bán) qua `FirstTouchIndex`,
+      - nến có tín hiệu ngược chiều kế tiếp qua mảng chỉ số tính trước,
+      - với mỗi cấu hình trailing, nến đầu tiên close vượt entry ± threshold. SL/TP không đổi giữa hai
+        lần dời, nên lệnh được chia thành các đoạn và mỗi đoạn chỉ cần vài truy vấn.
+    Thứ tự kiểm tra trong một nến giữ nguyên như vòng lặp gốc: đóng lệnh trước, dời SL/TP sau; lệnh mua
+    ưu tiên SL trước TP, lệnh bán ưu tiên TP trước SL (trừ nến đảo chiều, nơi SL được xét trước).
+
+    Các chỉ mục chỉ phụ thuộc dữ liệu giá và tín hiệu, nên một đối tượng có thể chạy lại nhiều bộ SL/TP
+    và trailing khác nhau.
+
+    :param signal: mảng tín hiệu (1, -1, 0)
+    :param high: mảng giá cao
+    :param low: mảng giá thấp
+    :param close: mảng giá đóng cửa
+    :param intrabar: IntrabarIndex (backtest.intrabar) để phân giải các nến chạm cả SL và TP bằng nến con;
+                     None thì giữ thứ tự ưu tiên cố định
+    """
+
+    def __init__(self, signal, high, low, close, intrabar=None):
+        self.intrabar = intrabar
+        self.signal = np.asarray(signal, dtype=float)
+        self.high = np.asarray(high, dtype=float)
+        self.low = np.asarray(low, dtype=float)
+        self.close = np.asarray(close, dtype=float)
+
+        self.low_index = FirstTouchIndex(self.low)
+        self.high_index = FirstTouchIndex(-self.high)
+        self.close_below = FirstTouchIndex(self.close)
+        self.close_above = FirstTouchIndex(-self.close)
+        self.next_sell = _next_index(self.signal == -1)
+        self.next_buy = _next_index(self.signal == 1)
+
+    @classmethod
+    def from_frame(cls, df_signals, intrabar=None):
+        return cls(df_signals['Signal'].to_numpy(), df_signals['high'].to_numpy(), df_signals['low'].to_numpy(),
+                   df_signals['close'].to_numpy(), intrabar)
+
+    def with_signal(self, signal):
+        """Backtester cho một mảng tín hiệu khác trên cùng dữ liệu giá, dùng lại các chỉ mục giá đã tạo."""
+        other = copy.copy(self)
+        other.signal = np.asarray(signal, dtype=float)
+        other.next_sell = _next_index(other.signal == -1)
+        other.next_buy = _next_index(other.signal == 1)
+        return other
+
+    def _trailing_events(self, side, index, entry_price, trailing_configs):
+        # (nến kích hoạt, thứ tự cấu hình) của từng cấu hình trailing, theo thứ tự áp dụng
+        events = []
+        for idx, config in enumerate(trailing_configs):
+            if side > 0:
+                bar = self.close_above.first_below(-(entry_price + config.threshold), index + 1)
+            else:
+                bar = self.close_below.first_below(entry_price - config.threshold, index + 1)
+            if bar is not None:
+                events.append((bar, idx))
+        events.sort()
+        return events
+
+    def first_exit(self, side, start, stop, sl_price, tp_price):
+        """Nến đóng lệnh đầu tiên trong [start, stop) khi SL/TP giữ cố định, None nếu lệnh còn mở."""
+        if side > 0:
+            stop = min(stop, self.next_sell[start] + 1) if start < len(self.signal) else stop
+            sl_bar = self.low_index.first_below(sl_price, start, stop)
+            if sl_bar is not None:
+                stop = sl_bar + 1
+            tp_bar = self.high_index.first_below(-tp_price, start, stop)
+        else:
+            stop = min(stop, self.next_buy[start] + 1) if start < len(self.signal) else stop
+            tp_bar = self.low_index.first_below(tp_price, start, stop)
+            if tp_bar is not None:
+                stop = tp_bar + 1
+            sl_bar = self.high_index.first_below(-sl_price, start, stop)
+
+        candidates = [bar for bar in (sl_bar, tp_bar) if bar is not None]
+        if candidates:
+            return min(candidates)
+        # Không chạm SL/TP: đóng ở nến đảo chiều nếu nó nằm trong đoạn
+        return stop - 1 if start < stop and self.signal[stop - 1] == -side else None
+
+    def close_trade(self, side, bar, entry_price, sl_price, tp_price):
+        """Chênh lệch giá và lý do đóng lệnh tại nến `bar` (nến do `first_exit` trả về)."""
+        if self.intrabar is not None and self.signal[bar] != -side:
+            # Nến chạm cả SL và TP (không phải nến đảo chiều): nến con quyết định mức nào chạm trước
+            if side > 0 and self.low[bar] < sl_price and self.high[bar] > tp_price \
+                    and self.intrabar.resolve(bar, side, sl_price, tp_price) == EXIT_TP:
+                return tp_price - entry_price, EXIT_TP
+            if side < 0 and self.low[bar] < tp_price and self.high[bar] > sl_price \
+                    and self.intrabar.resolve(bar, side, sl_price, tp_price) == EXIT_SL:
+                return entry_price - sl_price, EXIT_SL
+
+        if side > 0:
+            if self.low[bar] < sl_price:
+                return sl_price - entry_price, EXIT_SL
+            if self.signal[bar] == -1:
+                return self.close[bar] - entry_price, EXIT_REVERSE
+            return tp_price - entry_price, EXIT_TP
+
+        if self.signal[bar] == 1:
+            if self.high[bar] > sl_price:
+                return entry_price - sl_price, EXIT_SL
+            return entry_price - self.close[bar], EXIT_REVERSE
+        if self.low[bar] < tp_price:
+            return entry_price - tp_price, EXIT_TP
+        return entry_price - sl_price, EXIT_SL
+
+    def trade(self, index, side, entry_price, sl_price, tp_price, trailing_configs=()):
+        """
+        Mô phỏng một lệnh vào tại nến `index`.
+
+        :param side: 1 lệnh mua, -1 lệnh bán
+        :return: tuple (PnL, nến đóng lệnh, lý do) hoặc (0.0, -1, EXIT_NONE) nếu lệnh chưa đóng
+        """
+        n = len(self.signal)
+        start = index + 1
+        events = self._trailing_events(side, index, entry_price, trailing_configs)
+        position = 0
+        while True:
+            # SL/TP giữ nguyên tới hết nến kích hoạt trailing kế tiếp (dời sau khi đã kiểm tra đóng lệnh)
+            stop = events[position][0] + 1 if position < len(events) else n
+            bar = self.first_exit(side, start, stop, sl_price, tp_price)
+            if bar is not None:
+                pnl, reason = self.close_trade(side, bar, entry_price, sl_price, tp_price)
+                return pnl, bar, reason
+            if position == len(events):
+                return 0.0, -1, EXIT_NONE
+
+            trigger = events[position][0]
+            while position < len(events) and events[position][0] == trigger:
+                config = trailing_configs[events[position][1]]
+                if side > 0:
+                    sl_price = entry_price + config.sl_adjustment
+                    tp_price += config.tp_adjustment
+                else:
+                    sl_price = entry_price - config.sl_adjustment
+                    tp_price -= config.tp_adjustment
+                position += 1
+            start = trigger + 1
+
+    def run(self, sl, tp, trailing_configs=(), entry_price=None, day=None, daily_target_profit=None):
+        """
+        Chạy backtest cho mọi tín hiệu.
+
+        :param sl: mảng giá SL tại nến tín hiệu
+        :param tp: mảng giá TP tại nến tín hiệu
+        :param trailing_configs: danh sách TrailingStopConfig
+        :param entry_price: mảng giá vào lệnh, mặc định là close
+        :param day: mảng mã ngày (số nguyên, không giảm) của từng nến, dùng cùng `daily_target_profit`
+        :param daily_target_profit: khi tổng PnL các lệnh trong ngày đạt mức này, các tín hiệu còn lại
+                                    của ngày bị bỏ qua (giống `run_simple_backtest_with_daily_target`)
+        :return: FirstTouchResult(pnl, exit_index, exit_reason), exit_index = -1 khi lệnh chưa đóng
+        """
+        n = len(self.signal)
+        sl = np.asarray(sl, dtype=float)
+        tp = np.asarray(tp, dtype=float)
+        entry_price = self.close if entry_price is None else np.asarray(entry_price, dtype=float)
+        trailing_configs = list(trailing_configs)
+
+        pnl = np.zeros(n)
+        exit_index = np.full(n, -1, dtype=np.int64)
+        exit_reason = np.full(n, EXIT_NONE, dtype=np.int8)
+
+        current_day = None
+        daily_pnl = 0.0
+        for i in np.flatnonzero((self.signal == 1) | (self.signal == -1)).tolist():
+            if i == 0:
+                continue
+            if daily_target_profit is not None:
+                # Các nến không có tín hiệu không làm thay đổi PnL ngày, nên chỉ cần xét ở nến tín hiệu
+                if day[i] != current_day:
+                    current_day = day[i]
+                    daily_pnl = 0.0
+                if daily_pnl >= daily_target_profit:
+                    exit_reason[i] = EXIT_SKIPPED
+                    continue
+
+            side = 1 if self.signal[i] == 1 else -1
+            value, bar, reason = self.trade(i, side, entry_price[i], sl[i], tp[i], trailing_configs)
+            if reason != EXIT_NONE:
+                pnl[i] = value
+                exit_index[i] = bar
+                exit_reason[i] = reason
+                daily_pnl += value
+
+        return FirstTouchResult(pnl, exit_index, exit_reason)
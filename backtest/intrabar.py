@@ -0,0 +1,117 @@
+"""
+Xác định SL hay TP chạm trước trong các nến chạm cả hai, dựa vào dữ liệu khung nhỏ hơn (M1 hoặc tick).
+
+Vòng lặp backtest gốc ưu tiên cố định (lệnh mua xét SL trước, lệnh bán xét TP trước) khi cả hai mức nằm
+trong cùng một nến. Với `IntrabarIndex`, chỉ các nến mơ hồ đó mới được xét lại bằng các nến con của nó:
+nến con đầu tiên chạm một trong hai mức quyết định kết quả; nếu nến con đó vẫn chạm cả hai (hoặc không có
+dữ liệu nến con) thì giữ quy tắc ưu tiên gốc.
+
+Vị trí nến con của mọi nến được tính trước bằng searchsorted, nên mỗi lần tra chỉ đọc đúng các nến con
+của một nến.
+
+Ví dụ:
+    sub_bars = SubBars.from_frame(df_m1)
+    intrabar = sub_bars.index(df_signals['time'])
+    run_simple_backtest(df_signals, trailing_configs, intrabar=intrabar)
+"""
+import numpy as np
+import pandas as pd
+
+from backtest.first_touch import EXIT_SL, EXIT_TP
+
+
+def _time_ns(time):
+    # Thời gian có múi giờ được đổi về UTC; hai nguồn dữ liệu phải cùng kiểu (cùng có hoặc cùng không có múi giờ)
+    time = pd.Series(pd.to_datetime(time))
+    if isinstance(time.dtype, pd.DatetimeTZDtype):
+        time = time.dt.tz_convert(None)
+    return time.to_numpy().astype('datetime64[ns]').astype(np.int64)
+
+
+class SubBars:
+    """
+    Dữ liệu khung nhỏ (thời gian tăng dần, high, low) dùng để phân giải trong nến.
+
+    :param time: thời gian mở nến con (hoặc thời gian tick)
+    :param high: giá cao của nến con
+    :param low: giá thấp của nến con
+    """
+
+    def __init__(self, time, high, low):
+        self.time = _time_ns(time)
+        self.high = np.asarray(high, dtype=float)
+        self.low = np.asarray(low, dtype=float)
+        if len(self.time) > 1 and np.any(np.diff(self.time) < 0):
+            raise ValueError("Thời gian nến con phải tăng dần")
+
+    @classmethod
+    def from_frame(cls, df, price_column=None):
+        """
+        Từ DataFrame nến M1 (time, high, low) hoặc tick (time và cột giá `price_column`, vd. 'bid').
+        """
+        time = df['time'] if 'time' in df else df.index
+        if price_column is not None:
+            return cls(time, df[price_column], df[price_column])
+        return cls(time, df['high'], df['low'])
+
+    def index(self, bar_time, duration=None):
+        """
+        Vị trí nến con của từng nến: nến j gồm các nến con có time trong [bar_time[j], bar_time[j] + duration).
+
+        :param bar_time: thời gian mở của các nến backtest
+        :param duration: độ dài một nến (pd.Timedelta hoặc chuỗi như '5min'), mặc định là khoảng cách nhỏ nhất
+                         giữa hai nến liên tiếp
+        :return: IntrabarIndex
+        """
+        bar_time = _time_ns(bar_time)
+        if duration is None:
+            steps = np.diff(bar_time)
+            steps = steps[steps > 0]
+            if len(steps) == 0:
+                raise ValueError("Không suy ra được độ dài nến, cần truyền duration")
+            duration = int(steps.min())
+        else:
+            duration = pd.Timedelta(duration).value
+        start = np.searchsorted(self.time, bar_time, side='left')
+        end = np.searchsorted(self.time, bar_time + duration, side='left')
+        return IntrabarIndex(self, start, end)
+
+
+class IntrabarIndex:
+    """Các nến con [start[j], end[j]) của từng nến backtest j (xem SubBars.index)."""
+
+    def __init__(self, sub_bars, start, end):
+        self.sub_bars = sub_bars
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return len(self.start)
+
+    def slice(self, begin, stop):
+        """Chỉ mục cho các nến [begin, stop), đánh số lại từ 0 (vd. cho từng phần dữ liệu)."""
+        return IntrabarIndex(self.sub_bars, self.start[begin:stop], self.end[begin:stop])
+
+    def resolve(self, bar, side, sl_price, tp_price):
+        """
+        Mức chạm trước trong nến `bar` của lệnh `side` (1 mua, -1 bán).
+
+        :return: EXIT_SL, EXIT_TP, hoặc None nếu nến con không phân biệt được (giữ quy tắc gốc)
+        """
+        begin, end = self.start[bar], self.end[bar]
+        if begin >= end:
+            return None
+        high = self.sub_bars.high[begin:end]
+        low = self.sub_bars.low[begin:end]
+        if side > 0:
+            sl_hit = low < sl_price
+            tp_hit = high > tp_price
+        else:
+            sl_hit = high > sl_price
+            tp_hit = low < tp_price
+
+        hit = sl_hit | tp_hit
+        first = int(hit.argmax())
+        if not hit[first] or (sl_hit[first] and tp_hit[first]):
+            return None
+        return EXIT_SL if sl_hit[first] else EXIT_TP
@@ -0,0 +1,72 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+class LotLadder:
+    """
+    Bảng vốn -> lot (cột 'Vốn', 'Lot Size', 'STT' của file lot size) đọc một lần, tra bằng tìm kiếm nhị phân.
+
+    Quy tắc giống `get_lot_size_from_file` / `get_lot_size_from_file_by_index`:
+    - theo vốn: lot của dòng cuối cùng (theo thứ tự trong bảng) có 'Vốn' <= vốn, không có thì lot của dòng đầu;
+    - theo bậc: lot của dòng cuối cùng có 'STT' == bậc, không có thì lot của dòng cuối.
+
+    Hai hàm tra cứu nhận một số hoặc một mảng (trả về mảng cùng kích thước), dùng được làm `lot_for_capital`
+    của CapitalLot, Monte Carlo hay sweep.
+
+    Ví dụ:
+        ladder = LotLadder.load('data/lot_size.xlsx', 'Sheet1')
+        ladder.lot_for_capital(250)
+        ladder.lot_for_capital(np.array([100, 250, 1000]))
+    """
+
+    def __init__(self, capital, lot_size, level=None):
+        capital = np.asarray(capital, dtype=float)
+        self.lot_size = np.asarray(lot_size)
+        if len(self.lot_size) == 0:
+            raise ValueError("Bảng lot size rỗng")
+
+        # Sắp xếp theo vốn; với mỗi ngưỡng, dòng cuối cùng (theo thứ tự bảng) có vốn <= ngưỡng
+        rows = np.flatnonzero(~np.isnan(capital))
+        order = rows[np.argsort(capital[rows], kind='stable')]
+        self.capital = capital[order]
+        self.capital_row = np.maximum.accumulate(order) if len(order) else order
+
+        self.level = None
+        if level is not None:
+            level = np.asarray(level)
+            # Bậc trùng nhau lấy dòng cuối cùng
+            reversed_levels, reversed_rows = np.unique(level[::-1], return_index=True)
+            self.level = reversed_levels
+            self.level_row = len(level) - 1 - reversed_rows
+
+    @classmethod
+    def from_frame(cls, df_lot):
+        return cls(df_lot['Vốn'], df_lot['Lot Size'], df_lot['STT'] if 'STT' in df_lot else None)
+
+    @classmethod
+    def load(cls, file_path, sheet_name):
+        """Bảng từ file Excel, đọc lại chỉ khi file thay đổi."""
+        return _load(file_path, sheet_name, os.path.getmtime(file_path))
+
+    def lot_for_capital(self, capital):
+        capital_array = np.asarray(capital, dtype=float)
+        position = np.searchsorted(self.capital, capital_array, side='right') - 1
+        rows = np.where(position >= 0, self.capital_row[np.maximum(position, 0)] if len(self.capital) else 0, 0)
+        return self.lot_size[rows]
+
+    def lot_for_level(self, level):
+        if self.level is None:
+            raise ValueError("Bảng lot size không có cột 'STT'")
+        level_array = np.asarray(level)
+        position = np.minimum(np.searchsorted(self.level, level_array), len(self.level) - 1)
+        found = self.level[position] == level_array
+        rows = np.where(found, self.level_row[position], len(self.lot_size) - 1)
+        return self.lot_size[rows]
+
+
+@lru_cache(maxsize=8)
+def _load(file_path, sheet_name, modified):
+    return LotLadder.from_frame(pd.read_excel(file_path, sheet_name=sheet_name))
@@ -0,0 +1,221 @@
+"""
+Chỉ số hiệu quả chiến lược tính trên mảng kết quả lệnh (theo thứ tự đóng lệnh).
+
+`performance_metrics` tính toàn bộ bằng phép toán mảng; `StreamingMetrics` cập nhật cùng các chỉ số sau mỗi
+lệnh đóng (vd. `on_trade` của EventDrivenBacktester), không cần giữ chuỗi vốn đầy đủ.
+
+Ví dụ:
+    result = FirstTouchBacktester.from_frame(df).run(sl, tp)
+    closed = result.exit_index >= 0
+    metrics = performance_metrics(result.pnl[closed], df['time'].to_numpy()[result.exit_index[closed]])
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+
+def safe_ratio(numerator, denominator):
+    """Tỷ số không chia cho 0: mẫu bằng 0 thì inf khi tử dương, nan khi tử bằng 0."""
+    if denominator:
+        return numerator / denominator
+    return math.inf if numerator > 0 else math.nan
+
+
+def drawdown(equity):
+    """
+    Sụt giảm lớn nhất và thời gian sụt giảm dài nhất của đường vốn.
+
+    :param equity: mảng vốn theo thời gian (phần tử đầu là vốn ban đầu)
+    :return: tuple (max_drawdown, max_duration): sụt giảm lớn nhất tính từ đỉnh trước đó và số bước dài nhất
+             kể từ đỉnh gần nhất mà vốn chưa lấy lại được đỉnh đó
+    """
+    equity = np.asarray(equity, dtype=float)
+    if len(equity) == 0:
+        return 0.0, 0
+    peak = np.maximum.accumulate(equity)
+    steps = np.arange(len(equity))
+    last_peak = np.maximum.accumulate(np.where(equity >= peak, steps, 0))
+    return float((peak - equity).max()), int((steps - last_peak).max())
+
+
+def longest_streak(mask):
+    """Số phần tử True liên tiếp dài nhất."""
+    mask = np.asarray(mask, dtype=bool)
+    if not mask.any():
+        return 0
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    return int((np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)).max())
+
+
+def pnl_breakdown(pnl, time):
+    """
+    Tổng PnL và số lệnh theo giờ trong ngày và theo thứ trong tuần (giờ địa phương của dữ liệu).
+
+    :return: tuple (by_hour, by_weekday) hai pd.DataFrame cột pnl, trades
+    """
+    pnl = np.asarray(pnl, dtype=float)
+    time = pd.DatetimeIndex(pd.to_datetime(time))
+    hour = time.hour.to_numpy()
+    weekday = time.weekday.to_numpy()
+    by_hour = pd.DataFrame({'pnl': np.bincount(hour, pnl, 24), 'trades': np.bincount(hour, minlength=24)},
+                           index=pd.RangeIndex(24, name='hour'))
+    by_weekday = pd.DataFrame({'pnl': np.bincount(weekday, pnl, 7), 'trades': np.bincount(weekday, minlength=7)},
+                              index=pd.Index(WEEKDAYS, name='weekday'))
+    return by_hour, by_weekday
+
+
+def _summary(trades, wins, losses, gross_profit, gross_loss, mean, std, downside, max_drawdown, duration,
+             win_streak, loss_streak, periods_per_year):
+    scale = math.sqrt(periods_per_year) if periods_per_year else 1.0
+    return {
+        'trades': trades,
+        'total_pnl': gross_profit - gross_loss,
+        'total_profit_order': wins,
+        'total_loss_order': losses,
+        'pnl_rate': safe_ratio(wins, losses),
+        'win_rate': safe_ratio(wins, trades),
+        'average_win': gross_profit / wins if wins else 0.0,
+        'average_loss': -gross_loss / losses if losses else 0.0,
+        'expectancy': mean if trades else math.nan,
+        'profit_factor': safe_ratio(gross_profit, gross_loss),
+        'max_drawdown': max_drawdown,
+        'max_drawdown_duration': duration,
+        'sharpe': mean / std * scale if std > 0 else math.nan,
+        'sortino': mean / downside * scale if downside > 0 else math.nan,
+        'max_win_streak': win_streak,
+        'max_loss_streak': loss_streak,
+    }
+
+
+def performance_metrics(pnl, time=None, init_capital=0.0, periods_per_year=None):
+    """
+    Chỉ số hiệu quả từ PnL các lệnh đã đóng.
+
+    Sharpe / Sortino tính trên PnL từng lệnh (độ lệch chuẩn mẫu, độ lệch phía giảm so với 0), nhân
+    sqrt(periods_per_year) nếu có. Sụt giảm và thời gian sụt giảm (số lệnh) tính trên đường vốn
+    init_capital + tổng tích lũy PnL.
+
+    :param pnl: mảng PnL của các lệnh đã đóng
+    :param time: thời gian của từng lệnh (vd. nến đóng lệnh), để có thêm 'by_hour' và 'by_weekday'
+    :param init_capital: vốn ban đầu
+    :param periods_per_year: số lệnh (kỳ) mỗi năm để quy đổi Sharpe / Sortino theo năm
+    :return: dict chỉ số
+    """
+    pnl = np.asarray(pnl, dtype=float)
+    trades = len(pnl)
+    equity = init_capital + np.concatenate(([0.0], np.cumsum(pnl)))
+    max_drawdown, duration = drawdown(equity)
+
+    metrics = _summary(
+        trades, int((pnl > 0).sum()), int((pnl < 0).sum()), float(pnl[pnl > 0].sum()), float(-pnl[pnl < 0].sum()),
+        float(pnl.mean()) if trades else 0.0, float(pnl.std(ddof=1)) if trades > 1 else 0.0,
+        float(np.sqrt(np.mean(np.minimum(pnl, 0.0) ** 2))) if trades else 0.0,
+        max_drawdown, duration, longest_streak(pnl > 0), longest_streak(pnl < 0), periods_per_year)
+    if time is not None:
+        metrics['by_hour'], metrics['by_weekday'] = pnl_breakdown(pnl, time)
+    return metrics
+
+
+class StreamingMetrics:
+    """
+    Cùng các chỉ số với `performance_metrics`, cập nhật sau mỗi lệnh đóng với bộ nhớ cố định.
+
+    Dùng trực tiếp `update(pnl, time)`, hoặc làm `on_trade` của EventDrivenBacktester (khi đó thời gian lệnh
+    lấy từ mảng `time` theo nến đóng lệnh).
+
+    :param init_capital: vốn ban đầu
+    :param periods_per_year: xem `performance_metrics`
+    :param time: mảng thời gian của các nến, dùng với `on_trade`
+    """
+
+    def __init__(self, init_capital=0.0, periods_per_year=None, time=None):
+        self.periods_per_year = periods_per_year
+        self.time = None if time is None else pd.DatetimeIndex(pd.to_datetime(time))
+        self.trades = 0
+        self.wins = 0
+        self.losses = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0  # Tổng bình phương độ lệch (Welford)
+        self.downside = 0.0  # Tổng bình phương phần lỗ
+        self.init_capital = init_capital
+        self.cumulative_pnl = 0.0
+        self.equity = init_capital
+        self.peak = init_capital
+        self.max_drawdown = 0.0
+        self.since_peak = 0
+        self.max_duration = 0
+        self.streak = 0  # > 0 chuỗi thắng, < 0 chuỗi thua
+        self.max_win_streak = 0
+        self.max_loss_streak = 0
+        self.hour_pnl = np.zeros(24)
+        self.hour_trades = np.zeros(24, dtype=np.int64)
+        self.weekday_pnl = np.zeros(7)
+        self.weekday_trades = np.zeros(7, dtype=np.int64)
+        # Có mảng thời gian nến thì luôn trả về 'by_hour' / 'by_weekday' như `performance_metrics`, kể cả khi
+        # chưa có lệnh nào
+        self.has_time = self.time is not None
+
+    def update(self, pnl, time=None):
+        pnl = float(pnl)
+        self.trades += 1
+        delta = pnl - self.mean
+        self.mean += delta / self.trades
+        self.m2 += delta * (pnl - self.mean)
+
+        if pnl > 0:
+            self.wins += 1
+            self.gross_profit += pnl
+            self.streak = self.streak + 1 if self.streak > 0 else 1
+            self.max_win_streak = max(self.max_win_streak, self.streak)
+        elif pnl < 0:
+            self.losses += 1
+            self.gross_loss -= pnl
+            self.downside += pnl * pnl
+            self.streak = self.streak - 1 if self.streak < 0 else -1
+            self.max_loss_streak = max(self.max_loss_streak, -self.streak)
+        else:
+            self.streak = 0
+
+        # Cộng dồn PnL riêng rồi mới cộng vốn ban đầu, để so sánh với đỉnh khớp với `performance_metrics`
+        self.cumulative_pnl += pnl
+        self.equity = self.init_capital + self.cumulative_pnl
+        if self.equity >= self.peak:
+            self.peak = self.equity
+            self.since_peak = 0
+        else:
+            self.since_peak += 1
+            self.max_duration = max(self.max_duration, self.since_peak)
+            self.max_drawdown = max(self.max_drawdown, self.peak - self.equity)
+
+        if time is not None:
+            time = pd.Timestamp(time)
+            self.has_time = True
+            self.hour_pnl[time.hour] += pnl
+            self.hour_trades[time.hour] += 1
+            self.weekday_pnl[time.weekday()] += pnl
+            self.weekday_trades[time.weekday()] += 1
+        return self
+
+    def on_trade(self, trade):
+        """Cập nhật từ một bản ghi TRADE_DTYPE của EventDrivenBacktester."""
+        time = None if self.time is None else self.time[int(trade['exit_index'])]
+        self.update(trade['pnl'], time)
+
+    def result(self):
+        """dict chỉ số như `performance_metrics` của các lệnh đã cập nhật."""
+        std = math.sqrt(self.m2 / (self.trades - 1)) if self.trades > 1 else 0.0
+        downside = math.sqrt(self.downside / self.trades) if self.trades else 0.0
+        metrics = _summary(
+            self.trades, self.wins, self.losses, self.gross_profit, self.gross_loss, self.mean, std, downside,
+            self.max_drawdown, self.max_duration, self.max_win_streak, self.max_loss_streak, self.periods_per_year)
+        if self.has_time:
+            metrics['by_hour'] = pd.DataFrame({'pnl': self.hour_pnl, 'trades': self.hour_trades},
+                                              index=pd.RangeIndex(24, name='hour'))
+            metrics['by_weekday'] = pd.DataFrame({'pnl': self.weekday_pnl, 'trades': self.weekday_trades},
+                                                 index=pd.Index(WEEKDAYS, name='weekday'))
+        return metrics
@@ -0,0 +1,184 @@
+"""
+Mô phỏng Monte Carlo chuỗi lệnh của backtest: hoán vị (đổi thứ tự lệnh) hoặc bootstrap (rút có hoàn lại).
+
+Mỗi lô đường vốn là một ma trận (số đường x số lệnh) tính bằng NumPy. Không lãi kép thì đường vốn là tổng
+tích lũy theo trục lệnh; lãi kép (lot theo vốn, vd. bảng vốn -> lot) thì lặp theo thứ tự lệnh, mỗi bước
+tính cho mọi đường cùng lúc, không có vòng lặp Python theo từng đường.
+
+Chỉ hỗ trợ lot theo vốn (`LotLadder.lot_for_capital`). Lot theo bậc (`LotLadder.lot_for_level`, dùng trong
+backtest lãi kép theo mục tiêu ngày) chưa được hỗ trợ: bậc tăng theo ngày của lệnh và mục tiêu chênh lệch giá
+mỗi ngày, mà chuỗi lệnh sau khi hoán vị / rút lại không còn thông tin ngày.
+
+Ví dụ:
+    result = FirstTouchBacktester.from_frame(df).run(sl, tp)
+    ladder = LotLadder.load('data/lot_size.xlsx', 'Sheet1')
+    mc = simulate(trade_returns(result), n_paths=10_000, init_capital=200, lot_for_capital=ladder.lot_for_capital,
+                  contract_size=100, target_capital=400, seed=1)
+    print(summarize(mc))
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+MonteCarloResult = namedtuple('MonteCarloResult', [
+    'final_capital', 'max_drawdown', 'max_drawdown_pct', 'ruin_step', 'target_step', 'equity'])
+
+
+def trade_returns(result):
+    """
+    Kết quả theo giá (chênh lệch giá cho 1 lot) của các lệnh đã đóng, theo thứ tự vào lệnh.
+
+    :param result: FirstTouchResult (backtest chạm đầu tiên) hoặc EventDrivenResult
+    """
+    if hasattr(result, 'trades'):
+        return np.asarray(result.trades['price_diff'], dtype=float)
+    return np.asarray(result.pnl, dtype=float)[np.asarray(result.exit_index) >= 0]
+
+
+def resample_trades(values, n_paths, method='permutation', n_trades=None, rng=None):
+    """
+    Ma trận (n_paths x n_trades) các chuỗi lệnh lấy từ `values`.
+
+    :param method: 'permutation' (hoán vị, mỗi đường dùng đúng các lệnh gốc) hoặc 'bootstrap' (rút có hoàn lại)
+    :param n_trades: số lệnh mỗi đường, mặc định bằng số lệnh gốc (chỉ dùng cho bootstrap)
+    """
+    values = np.asarray(values, dtype=float)
+    rng = np.random.default_rng(rng)
+    if method == 'permutation':
+        if n_trades not in (None, len(values)):
+            raise ValueError("Hoán vị giữ nguyên số lệnh")
+        return rng.permuted(np.broadcast_to(values, (n_paths, len(values))), axis=1)
+    if method == 'bootstrap':
+        n_trades = len(values) if n_trades is None else n_trades
+        return values[rng.integers(0, len(values), (n_paths, n_trades))]
+    raise ValueError(f"method không hợp lệ: {method}")
+
+
+def equity_paths(trades, init_capital=0.0, lot_for_capital=None, lot_size=1.0, contract_size=1.0,
+                 ruin_capital=None):
+    """
+    Đường vốn của từng chuỗi lệnh.
+
+    :param trades: ma trận (số đường x số lệnh) kết quả theo giá của mỗi lệnh
+    :param init_capital: vốn ban đầu
+    :param lot_for_capital: hàm vector hóa vốn (mảng) -> lot (mảng) cho lãi kép; None thì dùng `lot_size` cố định
+    :param lot_size: lot cố định khi không lãi kép
+    :param contract_size: hệ số PnL = chênh lệch giá * lot * contract_size (100 như backtest lãi kép)
+    :param ruin_capital: vốn <= mức này thì đường dừng giao dịch (cháy tài khoản); None thì không dừng
+    :return: ma trận (số đường x số lệnh + 1), cột 0 là vốn ban đầu
+    """
+    trades = np.asarray(trades, dtype=float)
+    n_paths, n_trades = trades.shape
+    equity = np.empty((n_paths, n_trades + 1))
+    equity[:, 0] = init_capital
+
+    if lot_for_capital is None:
+        np.cumsum(trades * (lot_size * contract_size), axis=1, out=equity[:, 1:])
+        equity[:, 1:] += init_capital
+        if ruin_capital is not None:
+            # Giữ nguyên vốn từ lần chạm mức cháy đầu tiên
+            ruined = equity <= ruin_capital
+            first = np.where(ruined.any(axis=1), ruined.argmax(axis=1), n_trades)
+            level = equity[np.arange(n_paths), first]
+            equity = np.where(np.arange(n_trades + 1) > first[:, None], level[:, None], equity)
+        return equity
+
+    capital = equity[:, 0].copy()
+    alive = np.ones(n_paths, dtype=bool)
+    for step in range(n_trades):
+        lot = np.asarray(lot_for_capital(capital), dtype=float)
+        change = trades[:, step] * lot * contract_size
+        if ruin_capital is not None:
+            alive &= capital > ruin_capital
+            change = np.where(alive, change, 0.0)
+        capital += change
+        equity[:, step + 1] = capital
+    return equity
+
+
+def path_statistics(equity, ruin_capital=None, target_capital=None):
+    """
+    Chỉ số của từng đường vốn.
+
+    :return: tuple (final_capital, max_drawdown, max_drawdown_pct, ruin_step, target_step): sụt giảm lớn nhất
+             tính từ đỉnh trước đó (tuyệt đối và theo tỷ lệ đỉnh), ruin_step / target_step là số lệnh đến lần đầu
+             vốn <= ruin_capital / >= target_capital (-1 nếu không xảy ra)
+    """
+    peak = np.maximum.accumulate(equity, axis=1)
+    drawdown = peak - equity
+    max_drawdown = drawdown.max(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdown_pct = np.where(peak > 0, drawdown / peak, np.nan)
+    max_drawdown_pct = np.nanmax(drawdown_pct, axis=1, initial=0.0)
+
+    def first_step(hit):
+        return np.where(hit.any(axis=1), hit.argmax(axis=1), -1)
+
+    n_paths = len(equity)
+    ruin_step = first_step(equity <= ruin_capital) if ruin_capital is not None else np.full(n_paths, -1)
+    target_step = first_step(equity >= target_capital) if target_capital is not None else np.full(n_paths, -1)
+    return equity[:, -1].copy(), max_drawdown, max_drawdown_pct, ruin_step, target_step
+
+
+def simulate(values, n_paths=10_000, method='permutation', n_trades=None, init_capital=0.0, lot_for_capital=None,
+             lot_size=1.0, contract_size=1.0, ruin_capital=None, target_capital=None, seed=None, batch_size=None,
+             keep_paths=False):
+    """
+    Mô phỏng Monte Carlo đường vốn từ kết quả các lệnh của một backtest.
+
+    :param values: kết quả theo giá của các lệnh (trade_returns); không lãi kép và lot_size = 1, contract_size = 1
+                   thì chính là PnL của lệnh
+    :param n_paths: số đường mô phỏng
+    :param method: 'permutation' hoặc 'bootstrap'
+    :param n_trades: số lệnh mỗi đường (bootstrap)
+    :param init_capital: vốn ban đầu
+    :param lot_for_capital: hàm vector hóa vốn -> lot cho lãi kép (vd. bảng vốn -> lot)
+    :param lot_size: lot cố định khi không lãi kép
+    :param contract_size: hệ số quy đổi chênh lệch giá * lot ra tiền
+    :param ruin_capital: mức vốn coi là cháy tài khoản (đường dừng giao dịch); None thì bỏ qua
+    :param target_capital: mức vốn mục tiêu để đo số lệnh cần để đạt
+    :param seed: seed ngẫu nhiên
+    :param batch_size: số đường mỗi lô, để giới hạn bộ nhớ (mỗi lô một ma trận batch_size x số lệnh)
+    :param keep_paths: giữ lại toàn bộ ma trận đường vốn trong kết quả
+    :return: MonteCarloResult, mỗi trường là mảng theo đường (equity là ma trận hoặc None)
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        raise ValueError("Không có lệnh để mô phỏng")
+    rng = np.random.default_rng(seed)
+    batch_size = n_paths if batch_size is None else batch_size
+
+    parts = []
+    paths = []
+    for start in range(0, n_paths, batch_size):
+        trades = resample_trades(values, min(batch_size, n_paths - start), method, n_trades, rng)
+        equity = equity_paths(trades, init_capital, lot_for_capital, lot_size, contract_size, ruin_capital)
+        parts.append(path_statistics(equity, ruin_capital, target_capital))
+        if keep_paths:
+            paths.append(equity)
+
+    columns = [np.concatenate(column) for column in zip(*parts)]
+    return MonteCarloResult(*columns, np.concatenate(paths) if keep_paths else None)
+
+
+def summarize(result, percentiles=(5, 25, 50, 75, 95)):
+    """
+    Bảng phân vị vốn cuối, sụt giảm lớn nhất và số lệnh đến mục tiêu, kèm xác suất cháy / đạt mục tiêu.
+
+    :return: pd.DataFrame chỉ mục là chỉ số, cột là các phân vị ('p5', 'p50', ...) và 'probability'
+    """
+    reached = result.target_step[result.target_step >= 0]
+    rows = {
+        'final_capital': result.final_capital,
+        'max_drawdown': result.max_drawdown,
+        'max_drawdown_pct': result.max_drawdown_pct,
+        'time_to_target': reached.astype(float) if len(reached) else np.array([np.nan]),
+    }
+    table = pd.DataFrame({name: np.percentile(values, percentiles) for name, values in rows.items()},
+                         index=[f'p{p}' for p in percentiles]).T
+    table['probability'] = np.nan
+    table.loc['ruin'] = np.nan
+    table.loc['ruin', 'probability'] = np.mean(result.ruin_step >= 0)
+    table.loc['time_to_target', 'probability'] = np.mean(result.target_step >= 0)
+    return table
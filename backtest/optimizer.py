@@ -0,0 +1,295 @@
+"""
+Tối ưu tham số chiến lược MA bằng successive halving.
+
+Thay vì backtest mọi bộ tham số trên toàn bộ lịch sử, mỗi vòng chỉ chạy các ứng viên còn lại trên một đoạn
+lịch sử gần nhất, giữ lại 1/eta ứng viên tốt nhất rồi chạy tiếp trên đoạn dài gấp eta lần, cho đến vòng cuối
+dùng toàn bộ lịch sử. Ứng viên có thể lấy từ lưới cho trước hoặc từ bộ đề xuất ngẫu nhiên / TPE.
+
+Ví dụ:
+    space = {'min_sl': (0.8, 3.0), 'min_tp': (2.0, 10.0), 'ma_short_period': [3, 5, 8], 'ma_long_period': [5, 10, 20]}
+    result = optimize(df_short, df_long, space, n_candidates=81, rounds=3, proposer='tpe', workers=8)
+    print(result.best)
+"""
+import math
+from collections import namedtuple
+from numbers import Real
+
+import numpy as np
+import pandas as pd
+
+from backtest.sweep import DEFAULT_PARAMS, SweepRunner, parameter_grid, rank_results, required_periods
+
+HalvingResult = namedtuple('HalvingResult', ['best', 'ranking', 'history'])
+
+# Tham số chu kỳ chỉ báo phải là danh sách lựa chọn để tính trước chỉ báo
+PERIOD_PARAMS = ('ma_short_period', 'ma_long_period', 'rsi_short_period', 'adx_short_period', 'adx_short_threshold')
+
+
+def _is_range(value):
+    return (isinstance(value, tuple) and len(value) == 2
+            and all(isinstance(bound, Real) and not isinstance(bound, bool) for bound in value))
+
+
+def halving_schedule(n_candidates, n_bars, eta=3, min_bars=2000):
+    """
+    Số nến và số ứng viên của từng vòng.
+
+    Vòng cuối luôn dùng đủ `n_bars`, mỗi vòng trước ngắn hơn eta lần và không ngắn hơn `min_bars`;
+    số vòng không vượt quá số lần chia được `n_candidates` cho eta.
+
+    :return: list[tuple[int, int]] các cặp (số nến, số ứng viên được chạy)
+    """
+    if eta < 2:
+        raise ValueError("eta phải >= 2")
+    rungs = 1
+    while eta ** rungs < n_candidates and n_bars / eta ** rungs >= min_bars:
+        rungs += 1
+
+    schedule = []
+    count = n_candidates
+    for rung in range(rungs):
+        schedule.append((int(n_bars // eta ** (rungs - 1 - rung)), count))
+        count = max(1, math.ceil(count / eta))
+    return schedule
+
+
+def _rank_key(scores):
+    # Điểm NaN (không có lệnh) xếp cuối
+    return np.where(np.isnan(scores), -np.inf, scores)
+
+
+def successive_halving(runner, candidates, metric='total_pnl', eta=3, min_bars=2000, window=None, on_rung=None):
+    """
+    Chọn bộ tham số tốt nhất trong `candidates` bằng successive halving.
+
+    :param runner: SweepRunner đã tính sẵn chỉ báo cho mọi chu kỳ trong `candidates`
+    :param candidates: danh sách bộ tham số
+    :param metric: chỉ số cần tối đa (cột của `evaluate_params`, vd. 'total_pnl', 'pnl_rate')
+    :param eta: hệ số loại bỏ và hệ số tăng độ dài đoạn lịch sử giữa hai vòng
+    :param min_bars: số nến tối thiểu của vòng đầu
+    :param window: khoảng nến (start, stop) được dùng, mặc định toàn bộ; các vòng ngắn lấy phần cuối của khoảng
+    :param on_rung: hàm gọi với (vòng, bảng kết quả của vòng) sau mỗi vòng
+    :return: HalvingResult(best, ranking, history): bộ tham số tốt nhất, bảng xếp hạng vòng cuối
+             (trên toàn khoảng) và bảng mọi lần đánh giá kèm cột 'rung' và 'candidate'
+    """
+    start, stop = (0, runner.n_bars) if window is None else window
+    if not candidates:
+        raise ValueError("Không có ứng viên")
+
+    alive = np.arange(len(candidates))
+    history = []
+    table = None
+    for rung, (bars, _) in enumerate(halving_schedule(len(candidates), stop - start, eta, min_bars)):
+        rows = runner.evaluate([candidates[k] for k in alive], window=(stop - bars, stop))
+        table = pd.DataFrame(rows)
+        table.insert(0, 'candidate', alive)
+        table.insert(0, 'rung', rung)
+        history.append(table)
+        if on_rung is not None:
+            on_rung(rung, table)
+
+        keep = max(1, math.ceil(len(alive) / eta))
+        order = np.argsort(-_rank_key(table[metric].to_numpy(dtype=float)), kind='stable')
+        alive = alive[np.sort(order[:keep])]
+
+    ranking = rank_results(table.to_dict('records'), (metric,))
+    best = dict(candidates[int(ranking['candidate'].iloc[0])])
+    return HalvingResult(best, ranking, pd.concat(history, ignore_index=True))
+
+
+def halving_scores(history, metric='total_pnl'):
+    """
+    Một điểm cho mỗi ứng viên của `successive_halving`: vòng cuối cùng đạt được cộng thứ hạng phần trăm
+    (0..1) của chỉ số trong vòng đó, nên ứng viên đi xa hơn luôn được xếp trên.
+
+    :return: pd.Series điểm theo chỉ số 'candidate'
+    """
+    last = history.sort_values('rung', kind='stable').groupby('candidate').tail(1)
+    rank = last.groupby('rung')[metric].rank(method='average', pct=True, na_option='bottom')
+    return (last['rung'] + rank.fillna(0.0)).set_axis(last['candidate']).sort_index()
+
+
+class RandomProposer:
+    """
+    Đề xuất bộ tham số ngẫu nhiên trong không gian tìm kiếm.
+
+    Không gian là dict tên tham số -> list (chọn một phần tử), tuple (low, high) (phân phối đều, số nguyên
+    nếu cả hai cận là int) hoặc một giá trị cố định.
+    """
+
+    def __init__(self, space, seed=None):
+        self.space = dict(space)
+        self.rng = np.random.default_rng(seed)
+
+    def _sample(self, name, size):
+        value = self.space[name]
+        if isinstance(value, list):
+            return [value[k] for k in self.rng.integers(0, len(value), size)]
+        if _is_range(value):
+            low, high = value
+            if isinstance(low, int) and isinstance(high, int):
+                return self.rng.integers(low, high + 1, size).tolist()
+            return self.rng.uniform(low, high, size).tolist()
+        return [value] * size
+
+    def propose(self, n):
+        columns = {name: self._sample(name, n) for name in self.space}
+        return [dict(DEFAULT_PARAMS, **{name: columns[name][k] for name in self.space}) for k in range(n)]
+
+    def observe(self, candidates, scores):
+        pass
+
+
+class TPEProposer(RandomProposer):
+    """
+    Đề xuất kiểu Bayes (Tree-structured Parzen Estimator) chỉ dùng NumPy.
+
+    Các bộ đã quan sát được chia thành nhóm tốt (`gamma` phần trên) và nhóm còn lại; mỗi tham số được mô hình
+    độc lập bằng mật độ Parzen (Gauss cho khoảng, tần suất làm trơn cho danh sách) của từng nhóm. Mỗi đề xuất
+    là mẫu có tỷ số mật độ tốt / còn lại lớn nhất trong `n_samples` mẫu rút từ mật độ nhóm tốt.
+    Khi chưa đủ `n_startup` quan sát thì đề xuất ngẫu nhiên.
+    """
+
+    def __init__(self, space, seed=None, gamma=0.25, n_startup=20, n_samples=64):
+        super().__init__(space, seed)
+        self.gamma = gamma
+        self.n_startup = n_startup
+        self.n_samples = n_samples
+        self.observed = []
+        self.scores = []
+
+    def observe(self, candidates, scores):
+        self.observed.extend(candidates)
+        self.scores.extend(float(score) for score in scores)
+
+    def _encode(self, name, candidates):
+        value = self.space[name]
+        if isinstance(value, list):
+            return np.array([value.index(params[name]) for params in candidates], dtype=float)
+        return np.array([params[name] for params in candidates], dtype=float)
+
+    def _log_density(self, name, points, x):
+        # log mật độ Parzen của nhóm `points` tại các điểm x
+        value = self.space[name]
+        if isinstance(value, list):
+            counts = np.bincount(points.astype(int), minlength=len(value)) + 1.0
+            return np.log(counts / counts.sum())[x.astype(int)]
+        low, high = value
+        bandwidth = max((high - low) / max(len(points), 1) ** 0.2 / 4, 1e-12)
+        z = (x[:, None] - points[None, :]) / bandwidth
+        return np.log(np.exp(-0.5 * z * z).mean(axis=1) / bandwidth + 1e-300)
+
+    def _sample_good(self, name, points, size):
+        value = self.space[name]
+        if isinstance(value, list):
+            counts = np.bincount(points.astype(int), minlength=len(value)) + 1.0
+            return self.rng.choice(len(value), size, p=counts / counts.sum()).astype(float)
+        low, high = value
+        bandwidth = max((high - low) / max(len(points), 1) ** 0.2 / 4, 1e-12)
+        x = self.rng.choice(points, size) + self.rng.normal(0.0, bandwidth, size)
+        x = np.clip(x, low, high)
+        if isinstance(low, int) and isinstance(high, int):
+            x = np.round(x)
+        return x
+
+    def propose(self, n):
+        if len(self.observed) < self.n_startup:
+            return super().propose(n)
+
+        scores = np.asarray(self.scores)
+        order = np.argsort(-_rank_key(scores), kind='stable')
+        n_good = max(1, int(math.ceil(self.gamma * len(order))))
+        good = [self.observed[k] for k in order[:n_good]]
+        rest = [self.observed[k] for k in order[n_good:]] or good
+
+        searched = [name for name in self.space if isinstance(self.space[name], list) or _is_range(self.space[name])]
+        size = n * self.n_samples
+        samples = {}
+        ratio = np.zeros(size)
+        for name in searched:
+            good_points = self._encode(name, good)
+            x = self._sample_good(name, good_points, size)
+            ratio += self._log_density(name, good_points, x) - self._log_density(name, self._encode(name, rest), x)
+            samples[name] = x
+
+        # Mỗi nhóm n_samples mẫu cho ra một đề xuất
+        best = ratio.reshape(n, self.n_samples).argmax(axis=1) + np.arange(n) * self.n_samples
+        proposals = []
+        for k in best:
+            params = dict(DEFAULT_PARAMS)
+            for name, value in self.space.items():
+                if isinstance(value, list):
+                    params[name] = value[int(samples[name][k])]
+                elif _is_range(value):
+                    low, high = value
+                    integer = isinstance(low, int) and isinstance(high, int)
+                    params[name] = int(samples[name][k]) if integer else float(samples[name][k])
+                else:
+                    params[name] = value
+            proposals.append(params)
+        return proposals
+
+
+def search_periods(space):
+    """Các chu kỳ chỉ báo cần tính trước cho không gian tìm kiếm (`required_periods`)."""
+    options = {}
+    for name in PERIOD_PARAMS:
+        if name not in space:
+            continue
+        value = space[name]
+        if _is_range(value):
+            raise ValueError(f"{name} phải là danh sách lựa chọn, không phải khoảng {value}")
+        options[name] = value if isinstance(value, list) else [value]
+    return required_periods(parameter_grid(**options))
+
+
+def optimize(df_short, df_long, space, n_candidates=81, rounds=1, proposer='random', eta=3, min_bars=2000,
+             metric='total_pnl', workers=None, ma='sma', exclude_ranges=(), seed=None, runner=None, window=None):
+    """
+    Tìm bộ tham số tốt cho chiến lược MA: mỗi vòng đề xuất `n_candidates` bộ tham số rồi chọn lọc bằng
+    successive halving; kết quả của vòng trước được báo cho bộ đề xuất (có ích với 'tpe').
+
+    :param df_short: dữ liệu khung ngắn
+    :param df_long: dữ liệu khung dài
+    :param space: không gian tìm kiếm (xem RandomProposer); các tham số chu kỳ phải là danh sách
+    :param n_candidates: số bộ tham số mỗi vòng
+    :param rounds: số vòng đề xuất
+    :param proposer: 'random', 'tpe' hoặc một đối tượng có propose(n) / observe(candidates, scores)
+    :param eta: hệ số loại bỏ của successive halving
+    :param min_bars: số nến tối thiểu của lượt đánh giá ngắn nhất
+    :param metric: chỉ số cần tối đa
+    :param workers: số tiến trình (SweepRunner)
+    :param ma: loại đường trung bình ('sma' hoặc 'ema')
+    :param exclude_ranges: các khoảng giờ không vào lệnh
+    :param seed: seed của bộ đề xuất
+    :param runner: SweepRunner có sẵn (bỏ qua df_short, df_long, workers, ma, exclude_ranges)
+    :param window: khoảng nến (start, stop) dùng để tối ưu, mặc định toàn bộ
+    :return: HalvingResult với ranking gồm các bộ tham số vào vòng cuối của mọi vòng đề xuất (cột 'round')
+    """
+    if proposer == 'random':
+        proposer = RandomProposer(space, seed)
+    elif proposer == 'tpe':
+        proposer = TPEProposer(space, seed)
+
+    own_runner = runner is None
+    if own_runner:
+        runner = SweepRunner.from_frames(df_short, df_long, search_periods(space), workers, ma, exclude_ranges)
+    try:
+        finals = []
+        history = []
+        for round_index in range(rounds):
+            candidates = proposer.propose(n_candidates)
+            result = successive_halving(runner, candidates, metric, eta, min_bars, window)
+            scores = halving_scores(result.history, metric)
+            proposer.observe([candidates[k] for k in scores.index], scores.to_numpy())
+
+            ranking = result.ranking.assign(params=[candidates[k] for k in result.ranking['candidate']])
+            finals.append(ranking.assign(round=round_index))
+            history.append(result.history.assign(round=round_index))
+    finally:
+        if own_runner:
+            runner.close()
+
+    ranking = rank_results(pd.concat(finals, ignore_index=True).to_dict('records'), (metric,))
+    best = dict(ranking['params'].iloc[0])
+    return HalvingResult(best, ranking.drop(columns='params'), pd.concat(history, ignore_index=True))
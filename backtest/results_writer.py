@@ -0,0 +1,145 @@
+"""
+Lưu kết quả backtest dạng cột (.npz hoặc Parquet) thay cho xuất toàn bộ DataFrame ra Excel.
+
+Chuỗi theo nến (mọi cột của df_signals) và bảng lệnh được lưu thành hai file riêng; file Excel chỉ còn là
+bản tóm tắt tùy chọn gồm các lệnh. Việc ghi có thể chạy ở luồng nền để backtest tiếp theo không phải chờ.
+
+Ví dụ:
+    with ResultsWriter('results/xau_m5', format='parquet', excel=True, background=True) as writer:
+        run_simple_backtest(df_signals, trailing_configs, writer=writer)
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Các cột mô tả lệnh, giữ lại trong bảng lệnh nếu có trong df_signals
+TRADE_COLUMNS = ('time', 'Signal', 'entry_price', 'close', 'SL', 'TP', 'lot_size', 'close_at', 'price_diff',
+                 'PnL', 'Cumulative_PnL', 'date', 'daily_price_diff')
+
+
+def trades_frame(df_signals):
+    """Các nến có tín hiệu (mỗi nến một lệnh, từ nến thứ 2 như các hàm backtest) với các cột mô tả lệnh."""
+    columns = [name for name in TRADE_COLUMNS if name in df_signals]
+    entries = df_signals['Signal'].to_numpy() != 0
+    entries[:1] = False
+    return df_signals.loc[entries, columns]
+
+
+def _npz_columns(df):
+    # Mỗi cột một mảng; thời gian có múi giờ lưu dạng datetime64 theo UTC, chuỗi lưu dạng unicode
+    arrays = {}
+    for name, column in df.items():
+        if isinstance(column.dtype, pd.DatetimeTZDtype):
+            column = column.dt.tz_convert(None)
+        values = column.to_numpy()
+        if values.dtype == object:
+            values = column.astype(str).to_numpy(dtype=str)
+        arrays[str(name)] = values
+    return arrays
+
+
+def read_npz(path):
+    """Đọc lại file .npz của ResultsWriter thành DataFrame."""
+    with np.load(path, allow_pickle=False) as data:
+        return pd.DataFrame({name: data[name] for name in data.files})
+
+
+class ResultsWriter:
+    """
+    Ghi kết quả một lần backtest.
+
+    :param prefix: đường dẫn gốc của các file, vd. 'results/trading_strategy_results' cho ra
+                   'results/trading_strategy_results_bars.npz', '..._trades.npz' và '....xlsx'
+    :param format: 'npz' (không cần thư viện thêm) hoặc 'parquet' (cần pyarrow hoặc fastparquet)
+    :param bars: lưu chuỗi theo nến (mọi cột của df_signals)
+    :param excel: ghi thêm file Excel tóm tắt (sheet 'Trades' và 'Summary'), cần xlsxwriter
+    :param background: ghi ở một luồng nền; `close()` (hoặc thoát khối with) chờ ghi xong
+    """
+
+    def __init__(self, prefix='trading_strategy_results', format='npz', bars=True, excel=False, background=False):
+        if format not in ('npz', 'parquet'):
+            raise ValueError(f"format không hợp lệ: {format}")
+        self.prefix = prefix
+        self.format = format
+        self.bars = bars
+        self.excel = excel
+        self.executor = ThreadPoolExecutor(max_workers=1) if background else None
+        self.futures = []
+
+    def paths(self, prefix=None):
+        """Các file sẽ được ghi: dict 'bars' / 'trades' / 'excel' -> đường dẫn."""
+        prefix = self.prefix if prefix is None else prefix
+        paths = {'trades': f"{prefix}_trades.{self.format}"}
+        if self.bars:
+            paths['bars'] = f"{prefix}_bars.{self.format}"
+        if self.excel:
+            paths['excel'] = f"{prefix}.xlsx"
+        return paths
+
+    def _write_table(self, df, path):
+        if self.format == 'parquet':
+            df.to_parquet(path)
+        else:
+            np.savez(path, **_npz_columns(df))
+
+    def _write(self, df_signals, paths):
+        directory = os.path.dirname(paths['trades'])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        trades = trades_frame(df_signals)
+        self._write_table(trades, paths['trades'])
+        if 'bars' in paths:
+            self._write_table(df_signals, paths['bars'])
+        if 'excel' in paths:
+            summary = pd.DataFrame({'value': {
+                'trades': len(trades),
+                'profit_orders': int((trades['PnL'] > 0).sum()),
+                'loss_orders': int((trades['PnL'] < 0).sum()),
+                'total_pnl': float(trades['PnL'].sum()),
+            }})
+            with pd.ExcelWriter(paths['excel'], engine='xlsxwriter') as writer:
+                trades.to_excel(writer, sheet_name='Trades')
+                summary.to_excel(writer, sheet_name='Summary')
+        return paths
+
+    def write(self, df_signals, prefix=None):
+        """
+        Ghi kết quả của `df_signals` (cần cột Signal và PnL).
+
+        :param prefix: đường dẫn gốc thay cho `self.prefix` của lần ghi này
+        :return: dict đường dẫn các file (ghi ở luồng nền thì file có thể chưa ghi xong)
+        """
+        paths = self.paths(prefix)
+        if self.executor is None:
+            return self._write(df_signals, paths)
+        # Sao chép vì hàm backtest trả df_signals cho người gọi, có thể bị sửa trong lúc đang ghi
+        self.futures.append(self.executor.submit(self._write, df_signals.copy(), paths))
+        return paths
+
+    def close(self):
+        """Chờ các lần ghi nền xong (lỗi ghi được ném lại ở đây)."""
+        if self.executor is not None:
+            futures, self.futures = self.futures, []
+            for future in futures:
+                future.result()
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export_results(df_signals, writer=None, default_prefix='trading_strategy_results'):
+    """
+    Ghi kết quả backtest bằng `writer`, mặc định ResultsWriter(default_prefix) ghi .npz ở thư mục hiện tại.
+
+    :return: dict đường dẫn các file
+    """
+    writer = ResultsWriter(default_prefix) if writer is None else writer
+    return writer.write(df_signals)
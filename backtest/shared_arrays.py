@@ -0,0 +1,80 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_ALIGN = 64
+
+
+class SharedArrays:
+    """
+    Gom nhiều mảng NumPy vào một khối bộ nhớ dùng chung để các tiến trình con đọc mà không sao chép.
+
+    Tiến trình chính gọi `SharedArrays.create(arrays)`, gửi `spec` (tên khối và vị trí từng mảng, có thể
+    pickle) cho tiến trình con; tiến trình con gọi `SharedArrays.attach(spec)` để có các mảng chỉ đọc
+    trỏ thẳng vào khối đó. Tiến trình chính gọi `unlink()` khi không còn dùng.
+
+    Ví dụ:
+        shared = SharedArrays.create({'close': close, 'ma': ma_matrix})
+        with ProcessPoolExecutor(initializer=init_worker, initargs=(shared.spec,)) as pool:
+            ...
+        shared.unlink()
+    """
+
+    def __init__(self, memory, layout, owner):
+        self.memory = memory
+        self.layout = layout
+        self.owner = owner
+        self.arrays = {}
+        for name, (offset, shape, dtype) in layout.items():
+            values = np.ndarray(shape, dtype=np.dtype(dtype), buffer=memory.buf, offset=offset)
+            if not owner:
+                values.flags.writeable = False
+            self.arrays[name] = values
+
+    @classmethod
+    def create(cls, arrays):
+        """Cấp phát khối dùng chung và sao chép các mảng vào đó (một lần duy nhất)."""
+        layout = {}
+        size = 0
+        for name, values in arrays.items():
+            values = np.ascontiguousarray(values)
+            layout[name] = (size, values.shape, values.dtype.str)
+            size += -(-values.nbytes // _ALIGN) * _ALIGN
+
+        memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        shared = cls(memory, layout, owner=True)
+        for name, values in arrays.items():
+            shared.arrays[name][...] = values
+        return shared
+
+    @classmethod
+    def attach(cls, spec):
+        """Gắn vào khối đã tạo từ `spec` của tiến trình chính."""
+        name, layout = spec
+        try:
+            memory = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13: tiến trình con của multiprocessing dùng chung resource_tracker với tiến trình
+            # chính, khối chỉ được giải phóng khi tiến trình chính gọi unlink()
+            memory = shared_memory.SharedMemory(name=name)
+        return cls(memory, layout, owner=False)
+
+    @property
+    def spec(self):
+        return self.memory.name, self.layout
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+    def close(self):
+        self.arrays = {}
+        self.memory.close()
+
+    def unlink(self):
+        """Giải phóng khối dùng chung (chỉ tiến trình chính)."""
+        self.close()
+        if self.owner:
+            self.memory.unlink()
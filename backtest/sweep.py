@@ -0,0 +1,366 @@
+"""
+Quét tham số chiến lược MA (min_sl, min_tp, chu kỳ MA, ngưỡng RSI/ADX, bậc trailing stop) song song.
+
+Dữ liệu giá và mọi chỉ báo cần cho lưới tham số được tính một lần ở tiến trình chính (mỗi chu kỳ một cột,
+qua cùng pipeline chỉ báo với chiến lược nên tín hiệu trùng khớp), đặt vào bộ nhớ dùng chung và được các
+tiến trình con gắn vào không sao chép.
+Mỗi tiến trình con chỉ sinh tín hiệu cho bộ tham số của mình và chạy backtest chạm đầu tiên.
+
+Ví dụ:
+    grid = parameter_grid(min_sl=[1.0, 1.2, 1.5], min_tp=[4, 6], ma_short_period=[3, 5], ma_long_period=[5, 10],
+                          trailing_configs=[(), (TrailingStopConfig(2, 1, 1),)])
+    table = run_sweep(df_short, df_long, grid, workers=8)
+"""
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtest.first_touch import FirstTouchBacktester
+from backtest.shared_arrays import SharedArrays
+from backtest.metrics import performance_metrics
+from indicators.columnar import compute_indicators
+
+# Giá trị mặc định của các tham số không có trong lưới (giống run_market_analysis)
+DEFAULT_PARAMS = {
+    'rsi_short_period': 14,
+    'rsi_short_low_threshold': 30,
+    'rsi_short_high_threshold': 70,
+    'adx_short_period': 14,
+    'adx_short_threshold': None,
+    'trailing_configs': (),
+    'lot_standard': 1,
+}
+REQUIRED_PARAMS = ('min_sl', 'min_tp', 'ma_short_period', 'ma_long_period')
+
+
+def parameter_grid(**options):
+    """
+    Tích Descartes của các danh sách giá trị tham số.
+
+    :return: list[dict], mỗi phần tử là một bộ tham số đầy đủ (thêm DEFAULT_PARAMS cho tham số không khai báo)
+    """
+    names = list(options)
+    grid = []
+    for values in itertools.product(*(options[name] for name in names)):
+        params = dict(DEFAULT_PARAMS)
+        params.update(zip(names, values))
+        grid.append(params)
+    return grid
+
+
+def exclude_mask(time, exclude_ranges):
+    """Nến có giờ (theo múi giờ của dữ liệu) nằm trong một khoảng loại trừ, giống `is_time_in_exclude_range`."""
+    time = pd.Series(pd.to_datetime(time))
+    clock = time.dt.hour * 3600 + time.dt.minute * 60 + time.dt.second + time.dt.microsecond / 1e6
+    clock = clock.to_numpy()
+    excluded = np.zeros(len(time), dtype=bool)
+    for start_time, end_time in exclude_ranges:
+        start = start_time.hour * 3600 + start_time.minute * 60 + start_time.second + start_time.microsecond / 1e6
+        end = end_time.hour * 3600 + end_time.minute * 60 + end_time.second + end_time.microsecond / 1e6
+        excluded |= (clock >= start) & (clock <= end)
+    return excluded
+
+
+def long_timeframe_index(short_time, long_time):
+    """Chỉ số nến khung dài gần nhất có time <= time của mỗi nến khung ngắn (như `pd.merge_asof`), -1 nếu không có."""
+    short_time = pd.Series(pd.to_datetime(short_time)).to_numpy()
+    long_time = pd.Series(pd.to_datetime(long_time)).to_numpy()
+    return np.searchsorted(long_time, short_time, side='right') - 1
+
+
+def ma_cross_signals(close, ma_short, ma_long, rsi, rsi_low_threshold, rsi_high_threshold, excluded=None,
+                     adx=None, adx_threshold=None):
+    """
+    Tín hiệu và giá vào lệnh của `generate_signal` (simple_ma_strategy) tính dạng vector.
+
+    Mua khi close cắt lên trên MA ngắn và MA dài của nến trước với RSI < ngưỡng trên, bán ngược lại với
+    RSI > ngưỡng dưới. Giá vào lệnh là MA (của nến trước) gần giá hơn. Nếu có `adx_threshold`, chỉ giữ các
+    nến có ADX > ngưỡng.
+
+    :return: tuple (signal, entry_price), signal là 1 / -1 / 0 và nến đầu tiên luôn bằng 0
+    """
+    close = np.asarray(close, dtype=float)
+    pre_close = np.concatenate(([np.nan], close[:-1]))
+    pre_ma_short = np.concatenate(([np.nan], np.asarray(ma_short, dtype=float)[:-1]))
+    pre_ma_long = np.concatenate(([np.nan], np.asarray(ma_long, dtype=float)[:-1]))
+    short_above = pre_ma_short >= pre_ma_long
+
+    buy = ((close > pre_ma_short) & (close > pre_ma_long)
+           & ((short_above & (pre_close < pre_ma_short)) | (~short_above & (pre_close < pre_ma_long)))
+           & (rsi < rsi_high_threshold))
+    sell = ((close < pre_ma_short) & (close < pre_ma_long)
+            & ((short_above & (pre_close > pre_ma_long)) | (~short_above & (pre_close > pre_ma_short)))
+            & (rsi > rsi_low_threshold))
+    if adx_threshold is not None:
+        strong = adx > adx_threshold
+        buy &= strong
+        sell &= strong
+    if excluded is not None:
+        buy &= ~excluded
+        sell &= ~excluded
+
+    signal = np.where(sell, -1, np.where(buy, 1, 0))
+    signal[:1] = 0
+    entry_price = np.where(signal == 1, np.where(pre_ma_short > pre_ma_long, pre_ma_short, pre_ma_long),
+                           np.where(signal == -1, np.where(pre_ma_short < pre_ma_long, pre_ma_short, pre_ma_long),
+                                    0.0))
+    return signal, entry_price
+
+
+def _time_column(df):
+    return df['time'] if 'time' in df else df.index.to_series()
+
+
+def _indicator_matrix(source, name, periods):
+    # Mỗi chu kỳ một cột, tính qua IndicatorPipeline như calculate_technical_indicator
+    columns = []
+    for period in periods:
+        values = compute_indicators(source, [(name, {'period': period})])
+        columns.append(next(iter(values.values())))
+    return np.column_stack(columns) if columns else np.empty((len(source['close']), 0))
+
+
+def required_periods(grid):
+    """Các chu kỳ chỉ báo cần tính trước cho danh sách bộ tham số."""
+    grid = [dict(DEFAULT_PARAMS, **params) for params in grid]
+    periods = {name: sorted({params[name] for params in grid})
+               for name in ('ma_short_period', 'ma_long_period', 'rsi_short_period')}
+    periods['adx_short_period'] = sorted({params['adx_short_period'] for params in grid
+                                          if params['adx_short_threshold'] is not None})
+    return periods
+
+
+def prepare_sweep_arrays(df_short, df_long, periods, ma='sma', exclude_ranges=()):
+    """
+    Tính các mảng dùng chung cho cả lưới tham số.
+
+    :param df_short: dữ liệu khung ngắn (high, low, close, time là cột hoặc chỉ mục)
+    :param df_long: dữ liệu khung dài (close, time)
+    :param periods: các chu kỳ cần tính (required_periods)
+    :param ma: 'sma' (simple_ma_strategy) hoặc 'ema' (calculate_technical_indicator_v2)
+    :param exclude_ranges: các khoảng giờ không vào lệnh
+    :return: tuple (arrays, columns): dict mảng và dict {tên: {chu kỳ: cột}} cho các ma trận chỉ báo
+    """
+    close = df_short['close'].to_numpy(dtype=float)
+    long_close = df_long['close'].to_numpy(dtype=float)
+    long_index = long_timeframe_index(_time_column(df_short), _time_column(df_long))
+
+    ma_long = _indicator_matrix({'close': long_close}, ma, periods['ma_long_period'])[np.maximum(long_index, 0)]
+    ma_long[long_index < 0] = np.nan
+
+    arrays = {
+        'high': df_short['high'].to_numpy(dtype=float),
+        'low': df_short['low'].to_numpy(dtype=float),
+        'close': close,
+        'excluded': exclude_mask(_time_column(df_short), exclude_ranges),
+        'ma_short': _indicator_matrix({'close': close}, ma, periods['ma_short_period']),
+        'ma_long': ma_long,
+        'rsi': _indicator_matrix({'close': close}, 'rsi', periods['rsi_short_period']),
+    }
+    columns = {
+        'ma_short': {period: k for k, period in enumerate(periods['ma_short_period'])},
+        'ma_long': {period: k for k, period in enumerate(periods['ma_long_period'])},
+        'rsi': {period: k for k, period in enumerate(periods['rsi_short_period'])},
+    }
+
+    if periods['adx_short_period']:
+        source = {name: df_short[name].to_numpy(dtype=float) for name in ('high', 'low', 'close')}
+        arrays['adx'] = _indicator_matrix(source, 'adx', periods['adx_short_period'])
+        columns['adx'] = {period: k for k, period in enumerate(periods['adx_short_period'])}
+    return arrays, columns
+
+
+def backtest_params(arrays, columns, backtester, params):
+    """
+    Backtest một bộ tham số (SL/TP theo `calculate_sl_tp_with_entry_price`, vào lệnh tại entry_price).
+
+    :return: FirstTouchResult theo từng nến của `arrays`
+    """
+    missing = [name for name in REQUIRED_PARAMS if name not in params]
+    if missing:
+        raise ValueError(f"Thiếu tham số {missing}")
+    params = dict(DEFAULT_PARAMS, **params)
+
+    adx = None
+    if params['adx_short_threshold'] is not None:
+        adx = arrays['adx'][:, columns['adx'][params['adx_short_period']]]
+    signal, entry_price = ma_cross_signals(
+        arrays['close'],
+        arrays['ma_short'][:, columns['ma_short'][params['ma_short_period']]],
+        arrays['ma_long'][:, columns['ma_long'][params['ma_long_period']]],
+        arrays['rsi'][:, columns['rsi'][params['rsi_short_period']]],
+        params['rsi_short_low_threshold'], params['rsi_short_high_threshold'],
+        arrays['excluded'], adx, params['adx_short_threshold'])
+
+    sl_distance = params['min_sl'] * params['lot_standard']
+    tp_distance = params['min_tp'] * params['lot_standard']
+    sl = np.where(signal == 1, entry_price - sl_distance, np.where(signal == -1, entry_price + sl_distance, np.nan))
+    tp = np.where(signal == 1, entry_price + tp_distance, np.where(signal == -1, entry_price - tp_distance, np.nan))
+
+    return backtester.with_signal(signal).run(sl, tp, params['trailing_configs'], entry_price=entry_price)
+
+
+def evaluate_params(arrays, columns, backtester, params):
+    """
+    Backtest một bộ tham số và tóm tắt kết quả.
+
+    :return: dict gồm các tham số và chỉ số của `performance_metrics` (pnl_rate, total_pnl, trades, ...)
+    """
+    result = backtest_params(arrays, columns, backtester, params)
+    params = dict(DEFAULT_PARAMS, **params)
+
+    row = {name: value for name, value in params.items() if name != 'trailing_configs'}
+    row['trailing_configs'] = ';'.join(f"{config.threshold}/{config.sl_adjustment}/{config.tp_adjustment}"
+                                       for config in params['trailing_configs'])
+    row.update(performance_metrics(result.pnl[result.exit_index >= 0]))
+    return row
+
+
+class _Evaluator:
+    # Đánh giá bộ tham số trên một khoảng nến [start, stop) của các mảng đã tính sẵn
+
+    def __init__(self, arrays, columns, cache_size=8):
+        self.arrays = arrays
+        self.columns = columns
+        self.cache_size = cache_size
+        self.backtesters = {}
+
+    def backtester(self, window):
+        # Chỉ mục chạm đầu tiên trên giá của mỗi khoảng được tạo một lần và dùng lại cho mọi bộ tham số
+        if window not in self.backtesters:
+            if len(self.backtesters) >= self.cache_size:
+                self.backtesters.pop(next(iter(self.backtesters)))
+            start, stop = window
+            self.backtesters[window] = FirstTouchBacktester(
+                np.zeros(stop - start), self.arrays['high'][start:stop], self.arrays['low'][start:stop],
+                self.arrays['close'][start:stop])
+        return self.backtesters[window]
+
+    def _window_arrays(self, window):
+        start, stop = window
+        return {name: values[start:stop] for name, values in self.arrays.items()}
+
+    def result(self, params, window):
+        return backtest_params(self._window_arrays(window), self.columns, self.backtester(window), params)
+
+    def __call__(self, params, window):
+        row = evaluate_params(self._window_arrays(window), self.columns, self.backtester(window), params)
+        row['start'], row['stop'] = window
+        return row
+
+
+# ------ Tiến trình con ------ #
+_worker = {}
+
+
+def _init_worker(spec, columns):
+    shared = SharedArrays.attach(spec)
+    _worker['shared'] = shared
+    _worker['evaluator'] = _Evaluator(shared.arrays, columns)
+
+
+def _evaluate_in_worker(task):
+    params, window = task
+    return _worker['evaluator'](params, window)
+
+
+class SweepRunner:
+    """
+    Mảng giá/chỉ báo đã tính sẵn cùng pool tiến trình, để chạy nhiều lượt đánh giá (các vòng của
+    successive halving, các fold của walk-forward) mà không tính lại chỉ báo hay tạo lại pool.
+
+    Mỗi lượt có thể giới hạn trong một khoảng nến [start, stop); chỉ báo đã được tính trên toàn bộ lịch sử
+    nên các khoảng chồng nhau dùng chung kết quả và không cần giai đoạn khởi động riêng.
+
+    Ví dụ:
+        with SweepRunner.from_frames(df_short, df_long, required_periods(grid), workers=8) as runner:
+            rows = runner.evaluate(grid, window=(0, 50_000))
+    """
+
+    def __init__(self, arrays, columns, workers=None):
+        self.n_bars = len(arrays['close'])
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.evaluator = _Evaluator(arrays, columns)
+        self.shared = None
+        self.pool = None
+        if self.workers > 1:
+            self.shared = SharedArrays.create(arrays)
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(self.shared.spec, columns))
+
+    @classmethod
+    def from_frames(cls, df_short, df_long, periods, workers=None, ma='sma', exclude_ranges=()):
+        """Tính chỉ báo bằng `prepare_sweep_arrays` rồi tạo runner."""
+        arrays, columns = prepare_sweep_arrays(df_short, df_long, periods, ma, exclude_ranges)
+        return cls(arrays, columns, workers)
+
+    def evaluate(self, grid, window=None, on_result=None, chunksize=None):
+        """
+        Backtest mọi bộ tham số của `grid` trên khoảng nến `window` (mặc định toàn bộ).
+
+        :return: list[dict] kết quả theo thứ tự của `grid`
+        """
+        window = (0, self.n_bars) if window is None else (int(window[0]), int(window[1]))
+        if self.pool is None:
+            results = (self.evaluator(params, window) for params in grid)
+        else:
+            chunksize = chunksize or max(1, len(grid) // (self.workers * 4))
+            results = self.pool.map(_evaluate_in_worker, [(params, window) for params in grid], chunksize=chunksize)
+
+        rows = []
+        for row in results:
+            rows.append(row)
+            if on_result is not None:
+                on_result(row)
+        return rows
+
+    def result(self, params, window=None):
+        """FirstTouchResult của một bộ tham số trên khoảng nến `window`, chạy trong tiến trình hiện tại."""
+        window = (0, self.n_bars) if window is None else (int(window[0]), int(window[1]))
+        return self.evaluator.result(params, window)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.shared is not None:
+            self.shared.unlink()
+            self.shared = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def rank_results(rows, rank_by=('pnl_rate', 'total_pnl')):
+    """Bảng kết quả sắp xếp giảm dần theo các chỉ số `rank_by` (NaN xếp cuối)."""
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    return table.sort_values(list(rank_by), ascending=False, kind='stable').reset_index(drop=True)
+
+
+def run_sweep(df_short, df_long, grid, workers=None, ma='sma', exclude_ranges=(), rank_by=('pnl_rate', 'total_pnl'),
+              on_result=None, chunksize=None):
+    """
+    Chạy backtest cho mọi bộ tham số của `grid` trên một pool tiến trình.
+
+    :param df_short: dữ liệu khung ngắn
+    :param df_long: dữ liệu khung dài
+    :param grid: danh sách bộ tham số (parameter_grid)
+    :param workers: số tiến trình, mặc định bằng số CPU; 1 thì chạy ngay trong tiến trình hiện tại
+    :param ma: loại đường trung bình ('sma' hoặc 'ema')
+    :param exclude_ranges: các khoảng giờ không vào lệnh
+    :param rank_by: chỉ số dùng để xếp hạng (giảm dần)
+    :param on_result: hàm gọi với từng dòng kết quả ngay khi có
+    :param chunksize: số bộ tham số gửi cho tiến trình con mỗi lần
+    :return: pd.DataFrame kết quả đã xếp hạng
+    """
+    with SweepRunner.from_frames(df_short, df_long, required_periods(grid), workers, ma, exclude_ranges) as runner:
+        rows = runner.evaluate(grid, on_result=on_result, chunksize=chunksize)
+    return rank_results(rows, rank_by)
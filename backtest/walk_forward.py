@@ -0,0 +1,167 @@
+"""
+Tối ưu walk-forward cho chiến lược MA.
+
+Lịch sử được chia thành các fold (train, test) liên tiếp: mỗi fold tối ưu tham số trên khoảng train
+(successive halving, xem backtest.optimizer) rồi chạy bộ tham số được chọn trên khoảng test ngay sau đó.
+Ghép kết quả các khoảng test cho ra đường vốn ngoài mẫu (out-of-sample).
+
+Chỉ báo cho mọi chu kỳ trong không gian tìm kiếm được tính một lần trên toàn bộ lịch sử và đặt trong bộ nhớ
+dùng chung, nên các khoảng train/test chồng nhau dùng lại cùng kết quả; các fold chạy song song, mỗi tiến
+trình con một fold.
+
+Ví dụ:
+    space = {'min_sl': (0.8, 3.0), 'min_tp': (2.0, 10.0), 'ma_short_period': [3, 5, 8], 'ma_long_period': [5, 10, 20]}
+    result = walk_forward(df_short, df_long, train_bars=20_000, test_bars=5_000, space=space, workers=8)
+    result.equity.plot(x='time', y='equity')
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtest.optimizer import optimize, search_periods, successive_halving
+from backtest.shared_arrays import SharedArrays
+from backtest.sweep import SweepRunner, _time_column, prepare_sweep_arrays, required_periods
+
+WalkForwardResult = namedtuple('WalkForwardResult', ['folds', 'equity'])
+Fold = namedtuple('Fold', ['train_start', 'train_stop', 'test_stop'])
+
+
+def walk_forward_folds(n_bars, train_bars, test_bars, step=None, anchored=False):
+    """
+    Chia `n_bars` nến thành các fold: train [train_start, train_stop), test [train_stop, test_stop).
+
+    :param train_bars: số nến của khoảng train (độ dài tối thiểu nếu `anchored`)
+    :param test_bars: số nến của khoảng test
+    :param step: số nến dịch giữa hai fold, mặc định bằng `test_bars` (các khoảng test nối tiếp nhau)
+    :param anchored: True thì khoảng train luôn bắt đầu từ nến 0 và dài dần
+    :return: list[Fold]
+    """
+    step = test_bars if step is None else step
+    if train_bars <= 0 or test_bars <= 0 or step <= 0:
+        raise ValueError("train_bars, test_bars và step phải > 0")
+
+    folds = []
+    train_stop = train_bars
+    while train_stop + test_bars <= n_bars:
+        train_start = 0 if anchored else train_stop - train_bars
+        folds.append(Fold(train_start, train_stop, train_stop + test_bars))
+        train_stop += step
+    return folds
+
+
+def run_fold(runner, fold, space=None, grid=None, metric='total_pnl', **options):
+    """
+    Tối ưu trên khoảng train của `fold` rồi chạy bộ tham số tốt nhất trên khoảng test.
+
+    :param runner: SweepRunner (một tiến trình) trên toàn bộ lịch sử
+    :param space: không gian tìm kiếm cho `optimize`; hoặc
+    :param grid: danh sách bộ tham số cho `successive_halving`
+    :param options: tham số còn lại của `optimize` / `successive_halving` (n_candidates, rounds, proposer, eta, ...)
+    :return: tuple (best, train_row, test_row, test_pnl): bộ tham số được chọn, kết quả train, kết quả test
+             và PnL theo từng nến của khoảng test
+    """
+    train = (fold.train_start, fold.train_stop)
+    if grid is not None:
+        halving = successive_halving(runner, grid, metric, window=train, **options)
+    else:
+        halving = optimize(None, None, space, metric=metric, runner=runner, window=train, **options)
+    best = halving.best
+    train_row = halving.ranking.iloc[0].to_dict()
+
+    # Bắt đầu sớm một nến để nến đầu tiên của khoảng test cũng có thể có tín hiệu (nến đầu luôn bằng 0)
+    test = (fold.train_stop - 1, fold.test_stop)
+    test_row = runner.evaluate([best], window=test)[0]
+    test_pnl = runner.result(best, window=test).pnl[1:]
+    return best, train_row, test_row, test_pnl
+
+
+# ------ Tiến trình con ------ #
+_worker = {}
+
+
+def _init_worker(spec, columns):
+    shared = SharedArrays.attach(spec)
+    _worker['shared'] = shared
+    _worker['runner'] = SweepRunner(shared.arrays, columns, workers=1)
+
+
+def _run_fold_in_worker(task):
+    fold, kwargs = task
+    return run_fold(_worker['runner'], fold, **kwargs)
+
+
+def walk_forward(df_short, df_long, train_bars, test_bars, space=None, grid=None, step=None, anchored=False,
+                 metric='total_pnl', workers=None, ma='sma', exclude_ranges=(), seed=None, **options):
+    """
+    Tối ưu walk-forward và ghép đường vốn ngoài mẫu.
+
+    :param df_short: dữ liệu khung ngắn (có cột hoặc chỉ mục time)
+    :param df_long: dữ liệu khung dài
+    :param train_bars: số nến khoảng train
+    :param test_bars: số nến khoảng test
+    :param space: không gian tìm kiếm (xem RandomProposer), hoặc
+    :param grid: danh sách bộ tham số cố định
+    :param step: số nến dịch giữa hai fold, mặc định bằng test_bars
+    :param anchored: khoảng train luôn bắt đầu từ đầu lịch sử
+    :param metric: chỉ số cần tối đa khi chọn tham số
+    :param workers: số tiến trình chạy các fold song song, mặc định bằng số CPU
+    :param ma: loại đường trung bình ('sma' hoặc 'ema')
+    :param exclude_ranges: các khoảng giờ không vào lệnh
+    :param seed: seed của bộ đề xuất; fold thứ k dùng seed + k
+    :param options: tham số thêm cho `optimize` / `successive_halving` (n_candidates, rounds, proposer, eta, min_bars)
+    :return: WalkForwardResult(folds, equity): bảng mỗi fold (khoảng, tham số được chọn, chỉ số train và test
+             với tiền tố 'train_' / 'test_') và đường vốn ngoài mẫu (time, fold, PnL, equity) theo từng nến test
+    """
+    if (space is None) == (grid is None):
+        raise ValueError("Cần đúng một trong hai: space hoặc grid")
+    if step is not None and step < test_bars:
+        raise ValueError("step < test_bars làm các khoảng test chồng nhau, không ghép được đường vốn")
+
+    periods = search_periods(space) if grid is None else required_periods(grid)
+    arrays, columns = prepare_sweep_arrays(df_short, df_long, periods, ma, exclude_ranges)
+    folds = walk_forward_folds(len(arrays['close']), train_bars, test_bars, step, anchored)
+    if not folds:
+        raise ValueError("Không đủ dữ liệu cho một fold train + test")
+
+    tasks = []
+    for k, fold in enumerate(folds):
+        kwargs = dict(options, space=space, grid=grid, metric=metric)
+        if grid is None:
+            kwargs['seed'] = None if seed is None else seed + k
+        tasks.append((fold, kwargs))
+
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    workers = min(workers, len(folds))
+    if workers <= 1:
+        runner = SweepRunner(arrays, columns, workers=1)
+        results = [run_fold(runner, fold, **kwargs) for fold, kwargs in tasks]
+    else:
+        shared = SharedArrays.create(arrays)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(shared.spec, columns)) as pool:
+                results = list(pool.map(_run_fold_in_worker, tasks))
+        finally:
+            shared.unlink()
+
+    time = _time_column(df_short).to_numpy()
+    rows = []
+    equity = []
+    for k, (fold, (best, train_row, test_row, test_pnl)) in enumerate(zip(folds, results)):
+        row = {'fold': k, **fold._asdict(),
+               'train_from': time[fold.train_start], 'test_from': time[fold.train_stop],
+               'test_to': time[fold.test_stop - 1]}
+        row.update({name: value for name, value in best.items() if name != 'trailing_configs'})
+        row['trailing_configs'] = test_row['trailing_configs']
+        row.update({f'train_{name}': train_row[name] for name in ('pnl_rate', 'total_pnl', 'trades')})
+        row.update({f'test_{name}': test_row[name] for name in ('pnl_rate', 'total_pnl', 'trades', 'win_rate',
+                                                                'profit_factor', 'max_drawdown', 'sharpe')})
+        rows.append(row)
+        equity.append(pd.DataFrame({'time': time[fold.train_stop:fold.test_stop], 'fold': k, 'PnL': test_pnl}))
+
+    equity = pd.concat(equity, ignore_index=True)
+    equity['equity'] = np.cumsum(equity['PnL'].to_numpy())
+    return WalkForwardResult(pd.DataFrame(rows), equity)
@@ -0,0 +1,209 @@
+"""
+Benchmark CSVDatabase (ghi lại cả file / journal) và SQLiteDatabase trên bảng Signal giả lập.
+
+Cách chạy (từ thư mục gốc của repo):
+    python -m benchmarks.database_benchmark                              # 1 triệu dòng, cả ba backend
+    python -m benchmarks.database_benchmark --rows 100000 --ops 200
+    python -m benchmarks.database_benchmark --backends sqlite csv_journal --json results.json
+    python -m benchmarks.database_benchmark --check                      # so sánh kết quả giữa các backend
+
+Mỗi backend được nạp sẵn `--rows` dòng (ghi thẳng file, không qua insert_row), sau đó đo từng thao tác của
+giao diện chung. Thao tác tra cứu / ghi một dòng lặp `--ops` lần; thao tác phải duyệt cả bảng (và update_row
+của CSVDatabase không journal, vốn ghi lại cả file) lặp `--scan-ops` lần.
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks.harness import environment
+from data.csv_database import CSVDatabase
+from data.sqlite_database import SQLiteDatabase
+from models.trading_signal import Signal
+
+BACKENDS = ('csv', 'csv_journal', 'sqlite')
+
+
+def synthetic_signals(n_rows, seed=0, unprocessed=0.001, start=datetime(2020, 1, 1)):
+    """Các dòng Signal giả lập (dict giá trị Python như model_dump), tỷ lệ `unprocessed` chưa xử lý."""
+    rng = np.random.default_rng(seed)
+    entry = np.round(2000 + np.cumsum(rng.normal(0, 1, n_rows)), 2).tolist()
+    side = rng.choice([1, -1], n_rows).tolist()
+    pending = (rng.random(n_rows) < unprocessed).tolist()
+    empty = dict.fromkeys(Signal.model_fields)
+    for i in range(n_rows):
+        yield {**empty, 'signal_key': f"XAUUSD_{i}", 'timestamp': start + timedelta(minutes=i), 'symbol': 'XAUUSD',
+               'signal': side[i], 'entry': entry[i], 'sl': entry[i] - 5 * side[i], 'tp': entry[i] + 10 * side[i],
+               'lot_size': 0.01, 'order_id': str(10_000_000 + i), 'processed': not pending[i]}
+
+
+def _load(backend, directory, rows):
+    """Nạp sẵn các dòng `rows`, trả về (đối tượng database, số giây nạp + mở)."""
+    start = time.perf_counter()
+    if backend == 'sqlite':
+        db = SQLiteDatabase(Signal, os.path.join(directory, 'signals.db'))
+        db.insert_rows(rows, validate=False)
+    else:
+        path = os.path.join(directory, f'{backend}.csv')
+        with open(path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=list(Signal.model_fields))
+            writer.writeheader()
+            writer.writerows(rows)
+        db = CSVDatabase(Signal, path, journal=backend == 'csv_journal', compact_bytes=1 << 40)
+    return db, time.perf_counter() - start
+
+
+def _operations(db, backend, n_rows, ops, scan_ops, rng):
+    """Tên thao tác -> (hàm nhận số thứ tự lần chạy, số lần lặp)."""
+    keys = [f"XAUUSD_{i}" for i in rng.integers(0, n_rows, ops).tolist()]
+    tickets = [str(10_000_000 + i) for i in rng.integers(0, n_rows, ops).tolist()]
+    new_rows = list(synthetic_signals(ops, seed=1, start=datetime(2030, 1, 1)))
+    for i, row in enumerate(new_rows):
+        row['signal_key'] = f"NEW_{i}"
+    update_ops = scan_ops if backend == 'csv' else ops
+
+    return {
+        # Lần tra cứu đầu tiên của CSVDatabase dựng chỉ mục từ file
+        'first lookup': (lambda i: db.get_first_row_by_key('signal_key', keys[0]), 1),
+        'get_first_row_by_key[signal_key]': (lambda i: db.get_first_row_by_key('signal_key', keys[i]), ops),
+        'get_first_row_by_key[order_id]': (lambda i: db.get_first_row_by_key('order_id', tickets[i]), ops),
+        'insert_row': (lambda i: db.insert_row(new_rows[i]), ops),
+        'update_row[processed]': (lambda i: db.update_row('signal_key', keys[i], {'processed': 'True'}),
+                                  update_ops),
+        'update_row[trailing shift]': (lambda i: db.update_row('order_id', tickets[i], {
+            'first_shift': True, 'first_shift_sl': 1999.5, 'first_shift_tp': 2010.5}), update_ops),
+        'get_unprocessed_rows': (lambda i: db.get_unprocessed_rows(), scan_ops),
+        'get_last_row': (lambda i: db.get_last_row(), scan_ops),
+        'get_last_n_rows[10]': (lambda i: db.get_last_n_rows(10), scan_ops),
+        'get_rows_by_condition': (lambda i: db.get_rows_by_condition(lambda row: row['first_shift'] == 'True'),
+                                  scan_ops),
+    }
+
+
+def run_benchmarks(n_rows=1_000_000, backends=BACKENDS, ops=1000, scan_ops=3, seed=0):
+    """
+    Đo các thao tác của từng backend trên `n_rows` dòng.
+
+    Returns:
+        dict: {backend: {thao tác: {'repeat', 'seconds', 'us_per_op'}}}
+    """
+    results = {}
+    for backend in backends:
+        if backend not in BACKENDS:
+            raise ValueError(f"Không có backend {backend}")
+        directory = tempfile.mkdtemp(prefix='db_benchmark_')
+        try:
+            db, seconds = _load(backend, directory, synthetic_signals(n_rows, seed))
+            results[backend] = {'load': {'repeat': 1, 'seconds': seconds, 'us_per_op': seconds * 1e6}}
+            print(f"{backend:<14}{'load':<36}{seconds:>12.4f}s", flush=True)
+
+            rng = np.random.default_rng(seed)
+            for name, (operation, repeat) in _operations(db, backend, n_rows, ops, scan_ops, rng).items():
+                start = time.perf_counter()
+                for i in range(repeat):
+                    operation(i)
+                seconds = time.perf_counter() - start
+                results[backend][name] = {'repeat': repeat, 'seconds': seconds, 'us_per_op': seconds / repeat * 1e6}
+                print(f"{backend:<14}{name:<36}{seconds:>12.4f}s", flush=True)
+
+            if backend == 'csv_journal':
+                start = time.perf_counter()
+                db.compact()
+                seconds = time.perf_counter() - start
+                results[backend]['compact'] = {'repeat': 1, 'seconds': seconds, 'us_per_op': seconds * 1e6}
+            db.close()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def _check_operations(db):
+    """Chuỗi thao tác cố định, gồm cả khóa rỗng (ô '' của CSV, NULL của SQLite); trả về kết quả từng bước."""
+    return [
+        ('get_first_row_by_key[order_id=\'\']', lambda: db.get_first_row_by_key('order_id', '')),
+        ('update_row[order_id=\'\']', lambda: db.update_row('order_id', '', {'note': 'empty ticket'})),
+        ('get_first_row_by_key[note]', lambda: db.get_first_row_by_key('note', 'empty ticket')),
+        ('update_row[signal_key]', lambda: db.update_row('signal_key', 'XAUUSD_3', {'processed': 'False'})),
+        ('get_unprocessed_rows', lambda: list(db.get_unprocessed_rows())),
+        ('delete_row[note=\'\']', lambda: db.delete_row('note', '')),
+        ('get_all_rows', lambda: db.get_all_rows()),
+        ('get_last_n_rows[2]', lambda: db.get_last_n_rows(2)),
+    ]
+
+
+def check_backends(n_rows=20, backends=BACKENDS, seed=0):
+    """
+    Chạy cùng chuỗi thao tác trên từng backend, với một số dòng không có order_id, và so sánh kết quả.
+
+    Returns:
+        list[str]: các bước cho kết quả khác backend đầu tiên (rỗng nếu mọi backend giống nhau).
+    """
+    rows = list(synthetic_signals(n_rows, seed))
+    for row in rows[1::3]:
+        row['order_id'] = None
+    for row in rows[2::3]:
+        row['note'] = 'kept'
+
+    outputs = {}
+    for backend in backends:
+        directory = tempfile.mkdtemp(prefix='db_check_')
+        try:
+            db, _ = _load(backend, directory, rows)
+            outputs[backend] = [(name, operation()) for name, operation in _check_operations(db)]
+            db.close()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    reference, *others = backends
+    return [f"{backend}: {name}" for backend in others
+            for (name, expected), (_, actual) in zip(outputs[reference], outputs[backend]) if expected != actual]
+
+
+def print_table(results):
+    backends = list(results)
+    operations = list(dict.fromkeys(name for backend in backends for name in results[backend]))
+    print(f"{'µs/op':<36}" + ''.join(f"{backend:>16}" for backend in backends))
+    for name in operations:
+        cells = [results[backend].get(name) for backend in backends]
+        print(f"{name:<36}" + ''.join('-'.rjust(16) if cell is None else f"{cell['us_per_op']:>16.1f}"
+                                      for cell in cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark CSVDatabase và SQLiteDatabase.')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Số dòng nạp sẵn')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--ops', type=int, default=1000, help='Số lần lặp thao tác trên một dòng')
+    parser.add_argument('--scan-ops', type=int, default=3, help='Số lần lặp thao tác duyệt cả bảng')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Ghi kết quả ra file JSON')
+    parser.add_argument('--check', action='store_true', help='Chỉ so sánh kết quả giữa các backend')
+    args = parser.parse_args(argv)
+
+    if args.check:
+        mismatches = check_backends(backends=args.backends, seed=args.seed)
+        for mismatch in mismatches:
+            print(f"Khác {args.backends[0]}: {mismatch}")
+        print('Các backend cho cùng kết quả' if not mismatches else f"{len(mismatches)} bước khác nhau")
+        return 1 if mismatches else 0
+
+    results = run_benchmarks(args.rows, args.backends, args.ops, args.scan_ops, args.seed)
+    print()
+    print_table(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump({'environment': environment(), 'rows': args.rows, 'results': results}, file, indent=2)
+        print(f"\nĐã lưu kết quả vào {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
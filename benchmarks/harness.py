@@ -0,0 +1,106 @@
+import gc
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+
+def measure(function, prepare, repeat=3, track_memory=True):
+    """
+    Đo thời gian (nhỏ nhất trong `repeat` lần) và bộ nhớ đỉnh của `function(prepare())`.
+
+    `prepare` tạo dữ liệu vào cho mỗi lần chạy (vd. bản sao DataFrame) và không được tính vào kết quả.
+    Bộ nhớ đỉnh được đo bằng tracemalloc trong một lần chạy riêng, để chi phí theo dõi cấp phát
+    không làm sai lệch thời gian.
+
+    Returns:
+        tuple[float, float | None]: (giây, MB cấp phát đỉnh)
+    """
+    seconds = float('inf')
+    for _ in range(repeat):
+        data = prepare()
+        gc.collect()
+        start = time.perf_counter()
+        function(data)
+        seconds = min(seconds, time.perf_counter() - start)
+        del data
+
+    peak_mb = None
+    if track_memory:
+        data = prepare()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            function(data)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+        del data
+
+    return seconds, peak_mb
+
+
+def environment():
+    """Thông tin môi trường chạy benchmark, lưu kèm baseline để biết số liệu đến từ máy nào."""
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_baseline(path, results):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'environment': environment(), 'results': results}, file, indent=2, sort_keys=True)
+
+
+def find_regressions(results, baseline, tolerance=0.5, min_seconds=0.001, min_mb=1.0):
+    """
+    So sánh kết quả với baseline.
+
+    Một phép đo bị coi là chậm đi khi vượt baseline quá `tolerance` (tỷ lệ) và chênh lệch tuyệt đối lớn
+    hơn `min_seconds` / `min_mb`, để nhiễu đo ở các kích thước nhỏ không gây báo động giả.
+
+    Returns:
+        list[str]: Mô tả từng phép đo bị chậm đi hoặc tốn bộ nhớ hơn.
+    """
+    regressions = []
+    for name, sizes in results.items():
+        for size, current in sizes.items():
+            reference = baseline.get(name, {}).get(size)
+            if reference is None:
+                continue
+
+            seconds, base_seconds = current['seconds'], reference['seconds']
+            if seconds > base_seconds * (1 + tolerance) and seconds - base_seconds > min_seconds:
+                regressions.append(f"{name} @ {size} bars: {seconds:.6f}s > baseline {base_seconds:.6f}s")
+
+            peak, base_peak = current.get('peak_mb'), reference.get('peak_mb')
+            if peak is not None and base_peak is not None and peak > base_peak * (1 + tolerance) \
+                    and peak - base_peak > min_mb:
+                regressions.append(f"{name} @ {size} bars: {peak:.1f}MB > baseline {base_peak:.1f}MB")
+
+    return regressions
+
+
+def print_table(results):
+    print(f"{'benchmark':<36}{'bars':>12}{'seconds':>12}{'ns/bar':>12}{'peak MB':>12}")
+    for name, sizes in results.items():
+        for size, result in sizes.items():
+            peak = '-' if result.get('peak_mb') is None else f"{result['peak_mb']:.1f}"
+            print(f"{name:<36}{size:>12}{result['seconds']:>12.4f}{result['ns_per_bar']:>12.1f}{peak:>12}")
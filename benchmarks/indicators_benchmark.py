@@ -0,0 +1,179 @@
+"""
+Benchmark các chỉ báo trong `indicators/` trên dữ liệu OHLCV giả lập, không cần MetaTrader5.
+
+Cách chạy (từ thư mục gốc của repo):
+    python -m benchmarks.indicators_benchmark                         # kích thước mặc định, so với baseline
+    python -m benchmarks.indicators_benchmark --sizes 1000 10000000   # tới 10 triệu nến
+    python -m benchmarks.indicators_benchmark --only rsi atr adx      # chỉ một số chỉ báo
+    python -m benchmarks.indicators_benchmark --save-baseline         # ghi lại baseline
+
+Kết quả là thời gian mỗi nến và bộ nhớ cấp phát đỉnh; chương trình thoát với mã 1 nếu có phép đo
+chậm hơn (hoặc tốn bộ nhớ hơn) baseline quá ngưỡng cho phép.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from benchmarks.harness import measure, load_baseline, save_baseline, find_regressions, print_table
+from data.synthetic_ohlcv import generate_ohlcv
+from indicators.columnar import compute_indicators
+from indicators.momentum import rsi, bollinger_bands, calculate_true_range, atr, rsi_values, wilder_smoothing
+from indicators.moving_average import sma, ema, wma, calculate_ema, wma_values, sma_batch, ema_batch, wma_batch
+from indicators.streaming import StreamingRSI, StreamingATR, StreamingADX, StreamingBollingerBands, StreamingMACD
+from indicators.support_resistence import calculate_support_resistance, support_resistance_levels
+from indicators.trend import adx, ama, adx_wilder, dema, frama, ichimoku, parabolic_sar, tema, calculate_macd, \
+    ama_values, frama_values, ParabolicSar
+from indicators.trend_lines import calculate_trendlines, rolling_linreg_slope, TrendlineEngine
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines', 'indicators.json')
+BATCH_PERIODS = list(range(5, 105, 5))
+
+
+def _stream(indicator, *columns):
+    # Cập nhật chỉ báo streaming lần lượt từng nến
+    def run(df):
+        update = indicator().update
+        for values in zip(*(df[column].tolist() for column in columns)):
+            update(*values)
+    return run
+
+
+def _array(function, *columns):
+    return lambda df: function(*(df[column].to_numpy() for column in columns))
+
+
+# Tên benchmark -> hàm nhận DataFrame (bản sao riêng cho mỗi lần chạy)
+BENCHMARKS = {
+    # Hàm trên DataFrame
+    'rsi': lambda df: rsi(df, 14),
+    'bollinger_bands': lambda df: bollinger_bands(df, 20, 2),
+    'calculate_true_range': calculate_true_range,
+    'atr': lambda df: atr(df, 14),
+    'sma': lambda df: sma(df, 20),
+    'ema': lambda df: ema(df, 20),
+    'wma': lambda df: wma(df, 20),
+    'moving_average.calculate_ema': lambda df: calculate_ema(df['close'], 20),
+    'adx': lambda df: adx(df, 14),
+    'adx_wilder': lambda df: adx_wilder(df, 14),
+    'ama': lambda df: ama(df),
+    'dema': lambda df: dema(df),
+    'frama': lambda df: frama(df),
+    'ichimoku': ichimoku,
+    'parabolic_sar': lambda df: parabolic_sar(df),
+    'tema': lambda df: tema(df),
+    'calculate_macd': lambda df: calculate_macd(df),
+    'calculate_support_resistance': lambda df: calculate_support_resistance(df),
+    'calculate_trendlines': lambda df: calculate_trendlines(df),
+    'calculate_trendlines[Linreg]': lambda df: calculate_trendlines(df, method='Linreg'),
+
+    # Hàm trên mảng NumPy
+    'rsi_values': _array(rsi_values, 'close'),
+    'wilder_smoothing': _array(lambda close: wilder_smoothing(close, 14), 'close'),
+    'wma_values': _array(lambda close: wma_values(close, 20), 'close'),
+    'sma_batch[20 periods]': _array(lambda close: sma_batch(close, BATCH_PERIODS), 'close'),
+    'ema_batch[20 periods]': _array(lambda close: ema_batch(close, BATCH_PERIODS), 'close'),
+    'wma_batch[20 periods]': _array(lambda close: wma_batch(close, BATCH_PERIODS), 'close'),
+    'ama_values': _array(ama_values, 'close'),
+    'frama_values': _array(frama_values, 'high', 'low', 'close'),
+    'ParabolicSar.extend': _array(lambda high, low, close: ParabolicSar().extend(high, low, close),
+                                  'high', 'low', 'close'),
+    'support_resistance_levels': _array(lambda low, high, close: support_resistance_levels(low, high, close[-1]),
+                                        'low', 'high', 'close'),
+    'rolling_linreg_slope': _array(lambda close: rolling_linreg_slope(close, 14), 'close'),
+    'TrendlineEngine.extend': _array(lambda high, low, close: TrendlineEngine().extend(high, low, close),
+                                     'high', 'low', 'close'),
+    'compute_indicators[strategy]': lambda df: compute_indicators(
+        df, [('rsi', {'period': 14}), ('bollinger_bands', {'period': 20}), ('sma', {'period': 20}),
+             ('atr', {'period': 14}), ('adx', {'period': 14})]),
+    'compute_indicators[strategy,float32]': lambda df: compute_indicators(
+        df, [('rsi', {'period': 14}), ('bollinger_bands', {'period': 20}), ('sma', {'period': 20}),
+             ('atr', {'period': 14}), ('adx', {'period': 14})], dtype=np.float32),
+
+    # Chỉ báo streaming, cập nhật từng nến
+    'StreamingRSI.update': _stream(StreamingRSI, 'close'),
+    'StreamingATR.update': _stream(StreamingATR, 'high', 'low', 'close'),
+    'StreamingADX.update': _stream(StreamingADX, 'high', 'low', 'close'),
+    'StreamingBollingerBands.update': _stream(StreamingBollingerBands, 'close'),
+    'StreamingMACD.update': _stream(StreamingMACD, 'close'),
+}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, names=None, seed=0, repeat=None, track_memory=True):
+    """
+    Chạy các benchmark trên dữ liệu giả lập cho từng kích thước.
+
+    Args:
+        sizes (iterable[int]): Số nến của mỗi bộ dữ liệu.
+        names (list[str], optional): Tên benchmark cần chạy, mặc định tất cả.
+        seed (int): Hạt giống của dữ liệu giả lập.
+        repeat (int, optional): Số lần đo thời gian, mặc định 3 lần cho tới 100k nến và 1 lần cho lớn hơn.
+        track_memory (bool): Có đo bộ nhớ đỉnh hay không.
+
+    Returns:
+        dict: {tên: {số nến (str): {'seconds', 'ns_per_bar', 'peak_mb'}}}
+    """
+    names = list(BENCHMARKS) if names is None else names
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Không có benchmark {unknown}")
+
+    results = {name: {} for name in names}
+    for size in sizes:
+        df = generate_ohlcv(size, seed=seed)
+        runs = repeat if repeat is not None else (3 if size <= 100_000 else 1)
+        for name in names:
+            seconds, peak_mb = measure(BENCHMARKS[name], df.copy, runs, track_memory)
+            results[name][str(size)] = {'seconds': seconds, 'ns_per_bar': seconds / size * 1e9, 'peak_mb': peak_mb}
+            print(f"{name:<36}{size:>12} bars {seconds:>10.4f}s", flush=True)
+        del df
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark các chỉ báo trên dữ liệu OHLCV giả lập.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help='Số nến của mỗi lần chạy')
+    parser.add_argument('--only', nargs='+', help='Chỉ chạy các benchmark này')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, help='Số lần đo thời gian cho mỗi phép đo')
+    parser.add_argument('--no-memory', action='store_true', help='Bỏ qua đo bộ nhớ đỉnh')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Đường dẫn file baseline JSON')
+    parser.add_argument('--save-baseline', action='store_true', help='Ghi kết quả làm baseline mới')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='Tỷ lệ chậm đi tối đa so với baseline')
+    parser.add_argument('--list', action='store_true', help='Liệt kê tên các benchmark')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print('\n'.join(BENCHMARKS))
+        return 0
+
+    results = run_benchmarks(args.sizes, args.only, args.seed, args.repeat, not args.no_memory)
+    print()
+    print_table(results)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"\nĐã lưu baseline vào {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"\nChưa có baseline tại {args.baseline}, chạy lại với --save-baseline để tạo.")
+        return 0
+
+    regressions = find_regressions(results, baseline['results'], args.tolerance)
+    if regressions:
+        print('\nREGRESSION so với baseline:')
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+
+    print('\nKhông có regression so với baseline.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
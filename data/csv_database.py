@@ -1,18 +1,163 @@
+import bisect
 import csv
-from typing import Type, List, Any, Optional, Callable, Dict, Iterable
+import io
+import locale
+import os
+import threading
+from functools import wraps
+from itertools import accumulate, islice
+from typing import Type, List, Any, Optional, Callable, Dict, Iterable, Iterator, Sequence, Tuple
 from pydantic import BaseModel
 from pathlib import Path
 
+# Encoding mặc định của Path.open, dùng để đổi offset byte <-> dòng văn bản
+ENCODING = locale.getpreferredencoding(False)
+
+# Loại bản ghi journal: B (file CSV gốc mà journal áp dụng, theo inode), U (phiên bản mới của dòng), D (xóa dòng)
+OP_BASE = 'B'
+OP_UPDATE = 'U'
+OP_DELETE = 'D'
+
+# Kích thước mỗi khối khi đọc ngược từ cuối file
+TAIL_BLOCK_SIZE = 64 * 1024
+
+# Số dòng mỗi khối khi ghi lại cả file
+WRITE_CHUNK_ROWS = 4096
+
+# Kết quả rỗng dùng chung của get_unprocessed_rows, để lần gọi không có lệnh chờ không cấp phát gì
+NO_ROWS: Tuple[Dict[str, str], ...] = ()
+
+
+def _synchronized(method):
+    # Gộp journal có thể chạy ở luồng nền, mọi thao tác trên file đi qua cùng một khóa
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _iter_records(file, offset: int = 0) -> Iterator[Tuple[int, str]]:
+    """Các bản ghi (offset byte, văn bản) từ `offset`; một bản ghi gồm nhiều dòng nếu có ô chứa xuống dòng."""
+    file.seek(offset)
+    parts = []
+    start = offset
+    for line in file:
+        parts.append(line)
+        record = b''.join(parts) if len(parts) > 1 else line
+        # Số dấu nháy lẻ nghĩa là ô có nháy chưa đóng, bản ghi tiếp tục ở dòng sau
+        if record.count(b'"') % 2 == 0:
+            # Bỏ qua dòng trống như csv.DictReader
+            if record.strip(b'\r\n'):
+                yield start, record.decode(ENCODING)
+            start += len(record)
+            parts = []
+    if parts:
+        yield start, b''.join(parts).decode(ENCODING)
+
+
+def _iter_records_reversed(file, block_size: int = TAIL_BLOCK_SIZE) -> Iterator[Tuple[int, str]]:
+    """
+    Các bản ghi (offset byte, văn bản) từ cuối file về đầu, không gồm dòng tiêu đề. File được đọc ngược từng
+    khối `block_size` byte, chỉ tới khi người gọi dừng lấy bản ghi.
+
+    Một vị trí ngay sau ký tự xuống dòng là đầu bản ghi khi và chỉ khi số dấu nháy từ đó tới cuối file là chẵn
+    (xuống dòng nằm trong ô có nháy thì số đó lẻ), nên đọc ngược vẫn tách đúng bản ghi nhiều dòng.
+    """
+    position = file.seek(0, os.SEEK_END)
+    buffer = b''
+    record_end = 0
+    quotes = 0  # Số dấu nháy trong buffer[scanned:record_end]
+    while position > 0:
+        start = max(0, position - block_size)
+        file.seek(start)
+        chunk = file.read(position - start)
+        position = start
+        buffer = chunk + buffer[:record_end]
+        record_end = len(buffer)
+        scanned = len(chunk)
+
+        while True:
+            newline = buffer.rfind(b'\n', 0, scanned)
+            if newline < 0:
+                break
+            quotes += buffer.count(b'"', newline, scanned)
+            scanned = newline
+            if quotes % 2 == 0:
+                record = buffer[newline + 1:record_end]
+                if record.strip(b'\r\n'):
+                    yield position + newline + 1, record.decode(ENCODING)
+                record_end = newline + 1
+                quotes = 0
+        quotes += buffer.count(b'"', 0, scanned)
+    # Phần còn lại trong buffer là dòng tiêu đề
+
+
+def _parse_header(header: str) -> Optional[List[str]]:
+    return next(csv.reader([header])) if header.strip() else None
+
+
+def read_tail(file_path: str, n: int = 1) -> str:
+    """
+    Dòng tiêu đề và `n` bản ghi cuối của một file CSV bất kỳ, dạng văn bản CSV (vd. cho pd.read_csv), chỉ đọc
+    phần đầu và phần cuối của file.
+    """
+    with open(file_path, mode='rb') as file:
+        header = next(_iter_records(file), (0, ''))[1]
+        records = list(islice(_iter_records_reversed(file), n))
+    return header + ''.join(record for _, record in reversed(records))
+
 
 class CSVDatabase:
-    def __init__(self, model: Type[BaseModel], file_path: str):
+    def __init__(self, model: Type[BaseModel], file_path: str,
+                 index_fields: Iterable[str] = ('signal_key', 'order_id'), journal: bool = False,
+                 compact_bytes: int = 1 << 20, compact_interval: Optional[float] = None):
+        """
+        Args:
+            model: pydantic model mô tả các cột của file.
+            file_path: đường dẫn file CSV.
+            index_fields: các cột được đánh chỉ mục băm cho `get_first_row_by_key` / `update_row`. Cột khác
+                          được thêm vào chỉ mục ở lần tra cứu đầu tiên.
+            journal: ghi update/delete thành bản ghi nối thêm vào file `<file_path>.journal` thay vì ghi lại
+                     cả file; dòng mới vẫn được nối vào file CSV. Các hàm đọc trả về phiên bản mới nhất của
+                     mỗi dòng. Một file chỉ nên được mở cùng một chế độ, và với journal chỉ bởi một đối tượng
+                     (lúc gộp, file CSV được thay bằng file mới nên dòng do tiến trình khác ghi cùng lúc sẽ mất).
+            compact_bytes: journal vượt kích thước này (byte) thì được gộp vào file CSV ngay sau lần ghi.
+            compact_interval: chu kỳ (giây) gộp journal ở luồng nền; None thì chỉ gộp theo kích thước.
+        """
         self.model = model
         self.file_path = Path(file_path)
+        self.fieldnames = list(model.model_fields.keys())
+        self.index_fields = [field for field in index_fields if field in model.model_fields]
+
+        # Chỉ mục {cột: {giá trị: offset byte các dòng có giá trị đó, tăng dần}}, dựng lại khi file bị thay đổi
+        # từ bên ngoài (kích thước hoặc thời gian sửa khác với lần ghi/đọc cuối của đối tượng này)
+        self._indexes: Optional[Dict[str, Dict[str, List[int]]]] = None
+        self._header: List[str] = self.fieldnames
+        self._stat: Optional[Tuple[int, int]] = None
+        self._lock = threading.RLock()
+
+        # Offset (tăng dần) các dòng có processed == False, cập nhật cùng chỉ mục
+        self._pending: List[int] = []
+
+        # Journal: {offset dòng trong file CSV: phiên bản mới nhất, None nếu đã xóa}
+        self.journal_path = Path(f"{self.file_path}.journal") if journal else None
+        self.compact_bytes = compact_bytes
+        self._journal_fields = ['_op', '_offset'] + self.fieldnames
+        self._overrides: Dict[int, Optional[Dict[str, str]]] = {}
+        self._journal_stat: Optional[Tuple[int, int]] = None
 
         # Ensure the file exists and has the correct headers
         if not self.file_path.exists() or self._is_empty():
             self._create_file()
 
+        self._closed = threading.Event()
+        self._compactor = None
+        if journal and compact_interval:
+            self._compactor = threading.Thread(target=self._compact_periodically, args=(compact_interval,),
+                                               daemon=True)
+            self._compactor.start()
+
     def _is_empty(self) -> bool:
         return self.file_path.stat().st_size == 0
 
@@ -20,22 +165,269 @@ class CSVDatabase:
         with self.file_path.open(mode='w', newline='') as file:
             writer = csv.DictWriter(file, fieldnames=self.model.model_fields.keys())
             writer.writeheader()
+        self._indexes = None
+        if self.journal_path is not None:
+            self._reset_journal()
+
+    # ------ Chỉ mục ------ #
+    def _file_stat(self) -> Tuple[int, int]:
+        stat = self.file_path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def _format_row(self, row: Dict[str, Any], fieldnames: Optional[List[str]] = None) -> str:
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, fieldnames=fieldnames or self.fieldnames).writerow(row)
+        return buffer.getvalue()
+
+    def _parse_record(self, record: str) -> Dict[str, str]:
+        return next(csv.DictReader(io.StringIO(record, newline=''), fieldnames=self._header))
+
+    @staticmethod
+    def _is_pending(row: Dict[str, Any]) -> bool:
+        # Giá trị như csv ghi ra: None là '', bool False là 'False'
+        processed = row.get('processed')
+        return processed is not None and str(processed).strip().lower() == 'false'
+
+    def _add_to_indexes(self, indexes: Dict[str, Dict[str, List[int]]], pending: List[int], row: Dict[str, str],
+                        offset: int):
+        # Chỉ dùng khi offset lớn hơn mọi offset đã có (đọc tuần tự hoặc nối thêm dòng)
+        for field, index in indexes.items():
+            index.setdefault(row.get(field), []).append(offset)
+        if self._is_pending(row):
+            pending.append(offset)
+
+    def _build_indexes(self):
+        if self.journal_path is not None:
+            self._replay_journal()
+        indexes = {field: {} for field in self.index_fields}
+        pending = []
+        with self.file_path.open(mode='rb') as file:
+            records = _iter_records(file)
+            self._header = _parse_header(next(records, (0, ''))[1]) or self.fieldnames
+            for offset, record in records:
+                row = self._overrides[offset] if offset in self._overrides else self._parse_record(record)
+                if row is not None:
+                    self._add_to_indexes(indexes, pending, row, offset)
+            self._stat = self._file_stat()
+        self._indexes = indexes
+        self._pending = pending
+
+    def _fresh_indexes(self) -> Dict[str, Dict[str, List[int]]]:
+        # Chỉ tốn một lần stat (hai nếu có journal) nếu file không đổi
+        if self._indexes is None or self._file_stat() != self._stat or (
+                self.journal_path is not None and self._journal_file_stat() != self._journal_stat):
+            self._build_indexes()
+        return self._indexes
+
+    def _index_for(self, field: str) -> Dict[str, List[int]]:
+        if field not in self.index_fields:
+            self.index_fields.append(field)
+            self._indexes = None
+        return self._fresh_indexes()[field]
+
+    def _read_rows_at(self, offsets: Iterable[int]) -> List[Dict[str, str]]:
+        rows = []
+        with self.file_path.open(mode='rb') as file:
+            for offset in offsets:
+                if offset in self._overrides:
+                    rows.append(dict(self._overrides[offset]))
+                else:
+                    rows.append(self._parse_record(next(_iter_records(file, offset))[1]))
+        return rows
+
+    def _read_row_at(self, offset: int) -> Dict[str, str]:
+        return self._read_rows_at([offset])[0]
+
+    def iter_rows(self) -> Iterator[Dict[str, str]]:
+        """Các dòng hiện tại theo thứ tự trong file (đã áp dụng journal), không nạp cả file vào bộ nhớ."""
+        if self.journal_path is not None:
+            self._fresh_indexes()
+        if not self._overrides:
+            with self.file_path.open(mode='r', newline='') as file:
+                yield from csv.DictReader(file)
+            return
+
+        with self.file_path.open(mode='rb') as file:
+            records = _iter_records(file)
+            next(records, None)
+            for offset, record in records:
+                if offset not in self._overrides:
+                    yield self._parse_record(record)
+                elif self._overrides[offset] is not None:
+                    yield dict(self._overrides[offset])
+
+    def iter_rows_reversed(self) -> Iterator[Dict[str, str]]:
+        """
+        Các dòng hiện tại từ cuối file về đầu (đã áp dụng journal). File được đọc ngược từng khối và chỉ các dòng
+        được lấy mới được phân tích, nên thời gian lấy vài dòng cuối không phụ thuộc kích thước file.
+        """
+        if self.journal_path is not None:
+            self._fresh_indexes()
+        with self.file_path.open(mode='rb') as file:
+            if self.journal_path is None:
+                # Không dựng chỉ mục thì chỉ cần đọc dòng tiêu đề
+                self._header = _parse_header(next(_iter_records(file), (0, ''))[1]) or self.fieldnames
+            for offset, record in _iter_records_reversed(file):
+                if offset not in self._overrides:
+                    yield self._parse_record(record)
+                elif self._overrides[offset] is not None:
+                    yield dict(self._overrides[offset])
+
+    # ------ Journal ------ #
+    def _journal_file_stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.journal_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _parse_journal_record(self, record: str) -> Tuple[str, int, Dict[str, str]]:
+        row = next(csv.DictReader(io.StringIO(record, newline=''), fieldnames=self._journal_fields))
+        return row.pop('_op'), int(row.pop('_offset')), row
+
+    def _reset_journal(self):
+        """Journal rỗng cho file CSV hiện tại, ghi file tạm rồi đổi tên."""
+        temp_path = self.journal_path.with_name(self.journal_path.name + '.tmp')
+        with temp_path.open(mode='w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=self._journal_fields)
+            writer.writeheader()
+            writer.writerow({'_op': OP_BASE, '_offset': self.file_path.stat().st_ino})
+        os.replace(temp_path, self.journal_path)
+        self._overrides = {}
+        self._journal_stat = self._journal_file_stat()
+
+    def _replay_journal(self):
+        """
+        Đọc lại journal vào `_overrides`. Journal của file CSV khác (còn sót lại nếu bị ngắt giữa lúc gộp) được
+        bỏ đi; bản ghi cuối ghi dở (không có xuống dòng) bị cắt khỏi journal.
+        """
+        overrides = {}
+        valid = False
+        truncate_at = None
+        if self.journal_path.exists():
+            inode = self.file_path.stat().st_ino
+            with self.journal_path.open(mode='rb') as file:
+                records = _iter_records(file)
+                next(records, None)
+                for offset, record in records:
+                    if not record.endswith('\n'):
+                        truncate_at = offset
+                        break
+                    op, position, row = self._parse_journal_record(record)
+                    if op == OP_BASE:
+                        valid = position == inode
+                        if not valid:
+                            break
+                    elif valid:
+                        overrides[position] = row if op == OP_UPDATE else None
+
+        if not valid:
+            self._reset_journal()
+            return
+        if truncate_at is not None:
+            with self.journal_path.open(mode='r+b') as file:
+                file.truncate(truncate_at)
+        self._overrides = overrides
+        self._journal_stat = self._journal_file_stat()
+
+    def _write_version(self, offset: int, old_row: Dict[str, str], new_row: Optional[Dict[str, Any]]):
+        """Nối phiên bản mới (None là xóa) của dòng tại `offset` vào journal và cập nhật chỉ mục."""
+        op = OP_DELETE if new_row is None else OP_UPDATE
+        record = self._format_row({**(new_row or {}), '_op': op, '_offset': offset}, self._journal_fields)
+        with self.journal_path.open(mode='a', newline='') as file:
+            file.write(record)
+        self._journal_stat = self._journal_file_stat()
+
+        # Giữ giá trị dạng chuỗi như khi đọc lại từ file
+        new_row = None if new_row is None else self._parse_journal_record(record)[2]
+        self._overrides[offset] = new_row
+        for field, index in self._indexes.items():
+            old_value = old_row.get(field)
+            new_value = None if new_row is None else new_row.get(field)
+            if new_row is not None and new_value == old_value:
+                continue
+            offsets = index[old_value]
+            offsets.remove(offset)
+            if not offsets:
+                del index[old_value]
+            if new_row is not None:
+                bisect.insort(index.setdefault(new_value, []), offset)
+
+        position = bisect.bisect_left(self._pending, offset)
+        was_pending = position < len(self._pending) and self._pending[position] == offset
+        if was_pending and (new_row is None or not self._is_pending(new_row)):
+            del self._pending[position]
+        elif not was_pending and new_row is not None and self._is_pending(new_row):
+            self._pending.insert(position, offset)
+
+    def _maybe_compact(self):
+        if self._journal_stat is not None and self._journal_stat[1] >= self.compact_bytes:
+            self.compact()
+
+    @_synchronized
+    def compact(self):
+        """Gộp journal vào file CSV: ghi các dòng hiện tại ra file tạm, đổi tên đè file CSV rồi tạo journal mới."""
+        if self.journal_path is None:
+            return
+        self._fresh_indexes()
+        if not self._overrides:
+            return
+        self._write_all_rows(list(self.iter_rows()), atomic=True)
+        self._reset_journal()
+
+    def _compact_periodically(self, interval: float):
+        while not self._closed.wait(interval):
+            try:
+                self.compact()
+            except OSError as e:
+                print(f"Lỗi gộp journal {self.journal_path}: {e}")
+
+    def close(self):
+        """Dừng luồng gộp nền và gộp phần journal còn lại."""
+        self._closed.set()
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+        self.compact()
 
     def _check_and_create_header(self):
         if self._is_empty():
             self._create_file()
 
+    @_synchronized
     def insert_row(self, data: dict):
         # Ensure the header exists before inserting
         self._check_and_create_header()
 
         # Ensure the data matches the model's fields
         validated_data = self.model(**data)
+        record = self._format_row(validated_data.model_dump())
+        indexes = self._fresh_indexes()
+        offset = self._stat[1]
         with self.file_path.open(mode='a', newline='') as file:
-            writer = csv.DictWriter(file, fieldnames=self.model.model_fields.keys())
-            writer.writerow(validated_data.model_dump())
+            file.write(record)
 
+        # Cập nhật chỉ mục với dòng vừa thêm thay vì đọc lại file
+        self._add_to_indexes(indexes, self._pending, self._parse_record(record), offset)
+        self._stat = self._file_stat()
+
+    @_synchronized
     def update_row(self, key_field: str, key_value: Any, updated_data: dict):
+        # Không có dòng nào khớp thì không cần đọc cả file
+        offsets = self._index_for(key_field).get(key_value)
+        if not offsets:
+            return
+
+        if self.journal_path is not None:
+            row = self._read_row_at(offsets[0])
+            old_row = dict(row)
+            for key, value in updated_data.items():
+                if key in row:
+                    row[key] = value
+            self._write_version(offsets[0], old_row, row)
+            self._maybe_compact()
+            return
+
         rows = self.get_all_rows()
         updated = False
 
@@ -50,36 +442,85 @@ class CSVDatabase:
         if updated:
             self._write_all_rows(rows)
 
+    @_synchronized
     def delete_row(self, key_field: str, key_value: Any):
+        if self.journal_path is not None:
+            for offset in list(self._index_for(key_field).get(key_value, ())):
+                self._write_version(offset, self._read_row_at(offset), None)
+            self._maybe_compact()
+            return
+
         rows = self.get_all_rows()
         rows = [row for row in rows if row[key_field] != key_value]
         self._write_all_rows(rows)
 
+    @_synchronized
     def get_all_rows(self) -> List[dict]:
-        with self.file_path.open(mode='r', newline='') as file:
-            reader = csv.DictReader(file)
-            return list(reader)
+        return list(self.iter_rows())
+
+    def _write_all_rows(self, rows: List[Dict[str, str]], atomic: bool = False):
+        """
+        Writes all rows to the CSV file with the specified fieldnames.
 
-    def _write_all_rows(self, rows: List[Dict[str, str]]):
-        """Writes all rows to the CSV file with the specified fieldnames."""
+        Args:
+            atomic: ghi ra file tạm rồi đổi tên đè file CSV (không bao giờ để lại file ghi dở).
+        """
         # Access fieldnames correctly, depending on whether __fields__ is a dict or property
         fieldnames = list(self.model.model_fields.keys()) if isinstance(self.model.model_fields, dict) else list(
             self.model.model_fields.keys())
 
-        with self.file_path.open(mode='w', newline='') as file:
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
-
+        # Ghi từng khối dòng qua một DictWriter; writerow trả về số ký tự đã ghi nên biết được offset mới của
+        # mỗi dòng và dựng lại chỉ mục không cần đọc lại file
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+        writer.writeheader()
+        header = buffer.getvalue()
+        self._header = fieldnames
+        offsets = []
+        offset = len(header.encode(ENCODING))
+        path = self.file_path.with_name(self.file_path.name + '.tmp') if atomic else self.file_path
+        with path.open(mode='w', newline='') as file:
+            file.write(header)
+            for start in range(0, len(rows), WRITE_CHUNK_ROWS):
+                buffer.seek(0)
+                buffer.truncate()
+                sizes = [writer.writerow(row) for row in rows[start:start + WRITE_CHUNK_ROWS]]
+                text = buffer.getvalue()
+                if not text.isascii():
+                    # Số byte của từng dòng khác số ký tự
+                    ends = list(accumulate(sizes))
+                    sizes = [len(text[end - size:end].encode(ENCODING)) for size, end in zip(sizes, ends)]
+                file.write(text)
+                for size in sizes:
+                    offsets.append(offset)
+                    offset += size
+            if atomic:
+                file.flush()
+                os.fsync(file.fileno())
+        if atomic:
+            os.replace(path, self.file_path)
+
+        # Chỉ mục theo giá trị đã ghi (chuỗi như csv ghi ra), vì row có thể chứa giá trị khác chuỗi từ update_row
+        indexes = {}
+        for field in self.index_fields:
+            index = indexes[field] = {}
+            for row, row_offset in zip(rows, offsets):
+                value = row.get(field)
+                index.setdefault('' if value is None else str(value), []).append(row_offset)
+        pending = [row_offset for row, row_offset in zip(rows, offsets) if self._is_pending(row)]
+
+        self._indexes = indexes
+        self._pending = pending
+        self._stat = self._file_stat()
+
+    @_synchronized
     def get_first_row_by_key(self, key_field: str, key_value: Any) -> Optional[Dict[str, str]]:
-        """Retrieve the first row that matches the specified key."""
-        with self.file_path.open(mode='r', newline='') as file:
-            reader: Iterable[Dict[str, str]] = csv.DictReader(file)  # Explicit type hint for reader
-            for row in reader:
-                if row.get(key_field) == str(key_value):  # Convert key_value to string to match CSV string data
-                    return row
-        return None
+        """Retrieve the first row that matches the specified key (O(1) qua chỉ mục băm)."""
+        # Convert key_value to string to match CSV string data
+        offsets = self._index_for(key_field).get(str(key_value))
+        return self._read_row_at(offsets[0]) if offsets else None
 
+    @_synchronized
     def get_rows_by_condition(self, condition: Callable[[Dict[str, str]], bool]) -> List[Dict[str, str]]:
         """
         Retrieve rows that satisfy the provided condition.
@@ -94,33 +535,31 @@ class CSVDatabase:
         """
         matched_rows: List[Dict[str, str]] = []
 
-        with self.file_path.open(mode='r', newline='') as file:
-            reader: Iterable[Dict[str, str]] = csv.DictReader(file)  # Explicit type hint for reader
-            for row in reader:
-                if condition(row):
-                    matched_rows.append(row)
+        for row in self.iter_rows():
+            if condition(row):
+                matched_rows.append(row)
 
         return matched_rows
 
-    def get_unprocessed_rows(self) -> List[Dict[str, str]]:
-        """Retrieve all rows where 'processed' is False."""
-        unprocessed_rows: List[Dict[str, str]] = []
-
-        with self.file_path.open(mode='r', newline='') as file:
-            reader: Iterable[Dict[str, str]] = csv.DictReader(file)  # Explicitly hint the type for clarity
-            for row in reader:
-                if row.get('processed', '').strip().lower() == 'false':
-                    unprocessed_rows.append(row)
+    @_synchronized
+    def get_unprocessed_rows(self) -> Sequence[Dict[str, str]]:
+        """
+        Retrieve all rows where 'processed' is False.
 
-        return unprocessed_rows
+        Chỉ đọc các dòng trong chỉ mục dòng chờ xử lý (O(số dòng chờ)); không có dòng nào thì trả về NO_ROWS
+        (tuple rỗng dùng chung) mà không đọc file.
+        """
+        self._fresh_indexes()
+        if not self._pending:
+            return NO_ROWS
+        return self._read_rows_at(self._pending)
 
+    @_synchronized
     def get_last_row(self) -> Optional[dict]:
         """Retrieve the last row in the CSV file."""
-        with self.file_path.open(mode='r', newline='') as file:
-            reader = csv.DictReader(file)
-            rows = list(reader)
-            return rows[-1] if rows else None
+        return next(self.iter_rows_reversed(), None)
 
+    @_synchronized
     def get_last_row_by_condition(self, condition: Callable[[Dict[str, str]], bool]) -> Optional[dict]:
         """
         Retrieve the last row that matches the specified condition.
@@ -133,16 +572,13 @@ class CSVDatabase:
         Returns:
             Optional[dict]: The last row that matches the condition, or None if no match is found.
         """
-        with self.file_path.open(mode='r', newline='') as file:
-            reader = csv.DictReader(file)
-            rows = list(reader)  # Load all rows into memory
-
-            # Iterate in reverse to find the last matching row based on the physical order
-        for row in reversed(rows):
+        # Iterate in reverse to find the last matching row based on the physical order
+        for row in self.iter_rows_reversed():
             if condition(row):
                 return row
         return None
 
+    @_synchronized
     def get_last_n_rows(self, n: int) -> List[Dict[str, str]]:
         """
         Retrieve the last n rows in the CSV file.
@@ -153,7 +589,9 @@ class CSVDatabase:
         Returns:
             List[Dict[str, str]]: A list of the last n rows.
         """
-        with self.file_path.open(mode='r', newline='') as file:
-            reader = csv.DictReader(file)
-            rows = list(reader)
-            return rows[-n:] if rows else []
+        if n <= 0:
+            # Giữ đúng kết quả rows[-n:] khi n <= 0
+            return list(self.iter_rows())[-n:]
+        rows = list(islice(self.iter_rows_reversed(), n))
+        rows.reverse()
+        return rows
@@ -0,0 +1,286 @@
+"""
+Lưu trữ SQLite với cùng giao diện CSVDatabase (insert_row, update_row, get_unprocessed_rows, ...).
+
+Bảng được sinh từ `model_fields` của pydantic model: bool / int là INTEGER, float là REAL, còn lại (str,
+datetime) là TEXT, theo thứ tự chèn (rowid) như thứ tự dòng trong file CSV. Các hàm đọc trả về dict giá trị
+dạng chuỗi giống hệt CSVDatabase (None là '', bool là 'True' / 'False'), nên có thể thay thế trực tiếp.
+
+Ví dụ:
+    migrate_csv_to_sqlite(Signal, 'data/signals.csv', 'data/signals.db')
+    db = SQLiteDatabase(Signal, 'data/signals.db')
+
+Chuyển dữ liệu từ dòng lệnh (từ thư mục gốc của repo):
+    python -m data.sqlite_database data/signals.csv data/signals.db --model signal
+"""
+import argparse
+import sqlite3
+import sys
+import threading
+import typing
+from datetime import datetime
+from pathlib import Path
+from typing import Type, List, Any, Optional, Callable, Dict, Iterable, Iterator
+
+from pydantic import BaseModel
+
+from data.csv_database import CSVDatabase
+
+# Các cột được đánh chỉ mục nếu có trong model
+INDEX_FIELDS = ('signal_key', 'order_id', 'processed')
+
+
+def _field_type(annotation) -> type:
+    # Optional[X] -> X
+    if typing.get_origin(annotation) is typing.Union:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        annotation = args[0] if len(args) == 1 else str
+    return annotation if annotation in (bool, int, float, datetime) else str
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SQLiteDatabase:
+    def __init__(self, model: Type[BaseModel], file_path: str, table: Optional[str] = None):
+        """
+        Args:
+            model: pydantic model mô tả các cột của bảng.
+            file_path: đường dẫn file SQLite (tạo mới nếu chưa có).
+            table: tên bảng, mặc định là tên model viết thường (vd. 'signal').
+        """
+        self.model = model
+        self.file_path = Path(file_path)
+        self.fieldnames = list(model.model_fields.keys())
+        self.table = table or model.__name__.lower()
+        self._types = {name: _field_type(field.annotation) for name, field in model.model_fields.items()}
+        self._bool_columns = [column for column, name in enumerate(self.fieldnames) if self._types[name] is bool]
+        self._lock = threading.Lock()
+
+        # Tự quản lý transaction (autocommit), mỗi lần ghi là một transaction ngắn
+        self.connection = sqlite3.connect(str(self.file_path), isolation_level=None, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self._create_table()
+
+        # Câu lệnh cố định, được sqlite3 chuẩn bị một lần và lấy lại từ bộ đệm câu lệnh ở các lần gọi sau
+        table_name = _quote(self.table)
+        columns = ', '.join(_quote(name) for name in self.fieldnames)
+        self._insert_sql = (f"INSERT INTO {table_name} ({columns}) "
+                            f"VALUES ({', '.join('?' * len(self.fieldnames))})")
+        self._select_sql = f"SELECT {columns} FROM {table_name}"
+
+    def _create_table(self):
+        sql_types = {bool: 'INTEGER', int: 'INTEGER', float: 'REAL', datetime: 'TEXT', str: 'TEXT'}
+        table_name = _quote(self.table)
+        columns = ', '.join(f"{_quote(name)} {sql_types[self._types[name]]}" for name in self.fieldnames)
+        with self.connection:
+            self.connection.execute(f"CREATE TABLE IF NOT EXISTS {table_name} ({columns})")
+
+            # Model có thêm trường mới so với bảng đã tạo trước đó
+            existing = {row[1] for row in self.connection.execute(f"PRAGMA table_info({table_name})")}
+            for name in self.fieldnames:
+                if name not in existing:
+                    self.connection.execute(
+                        f"ALTER TABLE {table_name} ADD COLUMN {_quote(name)} {sql_types[self._types[name]]}")
+
+            for name in INDEX_FIELDS:
+                if name in self._types:
+                    index_name = _quote(f"idx_{self.table}_{name}")
+                    self.connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({_quote(name)})")
+
+    # ------ Chuyển đổi giá trị ------ #
+    def _encode(self, field: str, value: Any) -> Any:
+        """Giá trị Python hoặc chuỗi (như đọc từ CSV) -> giá trị lưu trong cột của `field`."""
+        if value is None or value == '':
+            return None
+        kind = self._types[field]
+        if isinstance(value, bool) and kind is not bool:
+            return str(value)
+        if kind is bool:
+            if isinstance(value, bool):
+                return int(value)
+            return {'true': 1, 'false': 0}.get(str(value).strip().lower(), value)
+        if kind in (int, float) and isinstance(value, str):
+            # Chuỗi không đổi được thì giữ nguyên như CSV
+            try:
+                return kind(value)
+            except ValueError:
+                return value
+        if isinstance(value, (int, float, str)):
+            return value
+        return str(value)
+
+    def _decode_row(self, values: Iterable[Any]) -> Dict[str, str]:
+        """Một dòng của bảng -> dict giá trị chuỗi như csv.DictReader của CSVDatabase."""
+        decoded = ['' if value is None else str(value) for value in values]
+        for column in self._bool_columns:
+            if isinstance(values[column], int):
+                decoded[column] = 'True' if values[column] else 'False'
+        return dict(zip(self.fieldnames, decoded))
+
+    def _check_field(self, field: str):
+        if field not in self._types:
+            raise ValueError(f"Không có cột {field} trong {self.model.__name__}")
+
+    def _key_condition(self, key_field: str, key_value: Any):
+        self._check_field(key_field)
+        # '' được lưu là NULL, mà "= NULL" không bao giờ đúng: dùng IS để khớp ô rỗng như CSVDatabase
+        operator = 'IS' if key_value == '' else '='
+        return f"{_quote(key_field)} {operator} ?", self._encode(key_field, key_value)
+
+    # ------ Ghi ------ #
+    def insert_row(self, data: dict):
+        # Ensure the data matches the model's fields
+        row = self.model(**data).model_dump()
+        with self._lock:
+            self.connection.execute(self._insert_sql, [self._encode(name, row[name]) for name in self.fieldnames])
+
+    def insert_rows(self, rows: Iterable[Dict[str, Any]], validate: bool = True, batch_size: int = 10_000) -> int:
+        """
+        Chèn nhiều dòng trong một transaction.
+
+        Args:
+            rows: các dòng (dict theo tên cột), kiểu Python hoặc chuỗi như đọc từ CSV.
+            validate: kiểm tra từng dòng bằng model như `insert_row`; False thì chèn nguyên giá trị.
+            batch_size: số dòng mỗi lần executemany.
+
+        Returns:
+            int: số dòng đã chèn.
+        """
+        count = 0
+        with self._lock, self.connection:
+            self.connection.execute('BEGIN')
+            batch = []
+            for row in rows:
+                if validate:
+                    row = self.model(**row).model_dump()
+                batch.append([self._encode(name, row.get(name)) for name in self.fieldnames])
+                if len(batch) >= batch_size:
+                    self.connection.executemany(self._insert_sql, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                self.connection.executemany(self._insert_sql, batch)
+                count += len(batch)
+        return count
+
+    def update_row(self, key_field: str, key_value: Any, updated_data: dict):
+        # Như CSVDatabase: chỉ cập nhật dòng đầu tiên khớp và bỏ qua khóa không phải cột của bảng
+        fields = [key for key in updated_data if key in self._types]
+        if not fields:
+            return
+        condition, key = self._key_condition(key_field, key_value)
+        table_name = _quote(self.table)
+        assignments = ', '.join(f"{_quote(name)} = ?" for name in fields)
+        with self._lock:
+            self.connection.execute(
+                f"UPDATE {table_name} SET {assignments} "
+                f"WHERE rowid = (SELECT rowid FROM {table_name} WHERE {condition} ORDER BY rowid LIMIT 1)",
+                [self._encode(name, updated_data[name]) for name in fields] + [key])
+
+    def delete_row(self, key_field: str, key_value: Any):
+        condition, key = self._key_condition(key_field, key_value)
+        with self._lock:
+            self.connection.execute(f"DELETE FROM {_quote(self.table)} WHERE {condition}", [key])
+
+    # ------ Đọc ------ #
+    def _select(self, where: str = '', parameters: Iterable[Any] = (), order: str = 'ASC',
+                limit: Optional[int] = None) -> Iterator[Dict[str, str]]:
+        sql = f"{self._select_sql} {where} ORDER BY rowid {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self.connection.execute(sql, list(parameters)).fetchall()
+        return (self._decode_row(values) for values in rows)
+
+    def iter_rows(self, reverse: bool = False) -> Iterator[Dict[str, str]]:
+        """Duyệt các dòng theo thứ tự chèn (hoặc ngược lại) mà không nạp cả bảng vào bộ nhớ."""
+        cursor = self.connection.cursor()
+        cursor.execute(f"{self._select_sql} ORDER BY rowid {'DESC' if reverse else 'ASC'}")
+        for values in cursor:
+            yield self._decode_row(values)
+
+    def get_all_rows(self) -> List[dict]:
+        return list(self._select())
+
+    def get_first_row_by_key(self, key_field: str, key_value: Any) -> Optional[Dict[str, str]]:
+        """Retrieve the first row that matches the specified key."""
+        # Convert key_value to string to match CSV string data
+        condition, key = self._key_condition(key_field, str(key_value))
+        return next(self._select(f"WHERE {condition}", [key], limit=1), None)
+
+    def get_rows_by_condition(self, condition: Callable[[Dict[str, str]], bool]) -> List[Dict[str, str]]:
+        """Retrieve rows that satisfy the provided condition (hàm Python, nên phải duyệt cả bảng)."""
+        return [row for row in self.iter_rows() if condition(row)]
+
+    def get_unprocessed_rows(self) -> List[Dict[str, str]]:
+        """Retrieve all rows where 'processed' is False (qua chỉ mục của cột processed)."""
+        return list(self._select(f"WHERE {_quote('processed')} = 0"))
+
+    def get_last_row(self) -> Optional[dict]:
+        """Retrieve the last row in the table."""
+        return next(self._select(order='DESC', limit=1), None)
+
+    def get_last_row_by_condition(self, condition: Callable[[Dict[str, str]], bool]) -> Optional[dict]:
+        """Retrieve the last row that matches the specified condition, duyệt từ cuối bảng."""
+        return next((row for row in self.iter_rows(reverse=True) if condition(row)), None)
+
+    def get_last_n_rows(self, n: int) -> List[Dict[str, str]]:
+        """Retrieve the last n rows, theo thứ tự chèn."""
+        if n <= 0:
+            # Giữ đúng kết quả rows[-n:] của CSVDatabase
+            return self.get_all_rows()[-n:]
+        return list(self._select(order='DESC', limit=n))[::-1]
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+def migrate_csv_to_sqlite(model: Type[BaseModel], csv_path: str, sqlite_path: str, table: Optional[str] = None,
+                          batch_size: int = 10_000) -> int:
+    """
+    Chuyển một lần toàn bộ dòng của file CSV (kèm journal nếu có) sang bảng SQLite, giữ nguyên thứ tự.
+
+    Args:
+        model: pydantic model của file.
+        csv_path: file CSV của CSVDatabase.
+        sqlite_path: file SQLite đích.
+        table: tên bảng, mặc định như SQLiteDatabase.
+        batch_size: số dòng mỗi lần executemany.
+
+    Returns:
+        int: số dòng đã chuyển.
+    """
+    source = CSVDatabase(model, csv_path, journal=Path(f"{csv_path}.journal").exists())
+    target = SQLiteDatabase(model, sqlite_path, table)
+    try:
+        if target.get_last_row() is not None:
+            raise ValueError(f"Bảng {target.table} trong {sqlite_path} đã có dữ liệu")
+        # Giá trị đã là chuỗi đúng định dạng của CSVDatabase, không cần kiểm tra lại bằng model
+        return target.insert_rows(source.iter_rows(), validate=False, batch_size=batch_size)
+    finally:
+        target.close()
+
+
+def main(argv=None):
+    from models.trading_signal import Signal
+    from models.trading_step import TradingStep
+
+    models = {'signal': Signal, 'trading_step': TradingStep}
+    parser = argparse.ArgumentParser(description='Chuyển dữ liệu CSVDatabase sang SQLite.')
+    parser.add_argument('csv_path')
+    parser.add_argument('sqlite_path')
+    parser.add_argument('--model', choices=list(models), default='signal')
+    parser.add_argument('--table', help='Tên bảng, mặc định là tên model')
+    args = parser.parse_args(argv)
+
+    count = migrate_csv_to_sqlite(models[args.model], args.csv_path, args.sqlite_path, args.table)
+    print(f"Đã chuyển {count} dòng từ {args.csv_path} sang {args.sqlite_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
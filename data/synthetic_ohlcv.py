@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+
+def generate_ohlcv(n_bars, seed=0, start_price=1.1, volatility=2e-4, tick_size=1e-5, start='2020-01-01',
+                   freq='1min', timezone='Asia/Ho_Chi_Minh'):
+    """
+    Sinh dữ liệu OHLCV giả lập có thể tái lập, cùng cấu trúc cột với dữ liệu `mt5.copy_rates_range`.
+
+    Giá đóng cửa là bước ngẫu nhiên hình học (log-return chuẩn), open là close của nến trước,
+    high/low mở rộng thân nến một khoảng ngẫu nhiên; mọi giá được làm tròn theo `tick_size`.
+
+    Args:
+        n_bars (int): Số nến.
+        seed (int): Hạt giống ngẫu nhiên, cùng seed cho cùng dữ liệu.
+        start_price (float): Giá mở cửa của nến đầu tiên.
+        volatility (float): Độ lệch chuẩn log-return mỗi nến.
+        tick_size (float): Bước giá nhỏ nhất.
+        start (str): Thời điểm nến đầu tiên.
+        freq (str): Khung thời gian giữa các nến (chuỗi tần suất của pandas).
+        timezone (str): Múi giờ của cột 'time', giống dữ liệu đã chuyển múi giờ trong các chiến lược.
+
+    Returns:
+        pd.DataFrame: Các cột time, open, high, low, close, tick_volume, spread, real_volume.
+    """
+    rng = np.random.default_rng(seed)
+
+    log_returns = rng.normal(0.0, volatility, n_bars)
+    close = start_price * np.exp(np.cumsum(log_returns))
+    open_ = np.empty(n_bars)
+    open_[:1] = start_price
+    open_[1:] = close[:-1]
+
+    wick = np.abs(rng.normal(0.0, volatility * start_price, (2, n_bars)))
+    high = np.maximum(open_, close) + wick[0]
+    low = np.minimum(open_, close) - wick[1]
+
+    def to_tick(prices):
+        return np.round(prices / tick_size) * tick_size
+
+    time = pd.date_range(start=start, periods=n_bars, freq=freq, tz='UTC').tz_convert(timezone)
+    return pd.DataFrame({
+        'time': time,
+        'open': to_tick(open_),
+        'high': to_tick(high),
+        'low': to_tick(low),
+        'close': to_tick(close),
+        'tick_volume': rng.integers(1, 500, n_bars),
+        'spread': rng.integers(0, 20, n_bars),
+        'real_volume': np.zeros(n_bars, dtype=np.int64),
+    })
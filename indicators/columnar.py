@@ -0,0 +1,73 @@
+import numpy as np
+
+from indicators.pipeline import IndicatorGraph, IndicatorPipeline
+
+OHLC_COLUMNS = ('open', 'high', 'low', 'close')
+
+
+def ohlc_views(source, columns=OHLC_COLUMNS, dtype=np.float64):
+    """
+    Lấy các cột giá dưới dạng mảng NumPy chỉ đọc, không sao chép khi kiểu dữ liệu đã khớp.
+
+    Args:
+        source (pd.DataFrame | dict): Dữ liệu OHLC theo tên cột.
+        columns (tuple[str]): Các cột cần lấy, cột không có trong nguồn được bỏ qua.
+        dtype: Kiểu số thực của mảng kết quả (np.float64 hoặc np.float32).
+
+    Returns:
+        dict[str, np.ndarray]: Mảng chỉ đọc của từng cột.
+    """
+    views = {}
+    for name in columns:
+        if name not in source:
+            continue
+        values = np.asarray(source[name])
+        # view() để cờ chỉ đọc không ảnh hưởng tới mảng gốc của người gọi
+        values = values.view() if values.dtype == dtype else values.astype(dtype)
+        values.flags.writeable = False
+        views[name] = values
+    return views
+
+
+def compute_indicators(source, indicators, outputs=None, dtype=np.float64):
+    """
+    Tính chỉ báo trên mảng OHLC mà không sửa hay sao chép DataFrame của người gọi.
+
+    Chỉ các mảng kết quả được yêu cầu được trả về; các đại lượng trung gian (True Range, STD, ...)
+    chỉ sống trong đồ thị tính toán và được giải phóng khi hàm kết thúc.
+
+    Args:
+        source (pd.DataFrame | dict): Dữ liệu OHLC theo tên cột.
+        indicators (list): Danh sách chỉ báo, mỗi phần tử là tên (tham số mặc định) hoặc (tên, dict tham số),
+                           tên xem `indicators.pipeline.INDICATORS`.
+        outputs (list[str], optional): Tên các cột kết quả cần trả về, mặc định trả về tất cả.
+        dtype: Kiểu số thực dùng cho dữ liệu vào và kết quả. np.float32 giảm một nửa bộ nhớ; các bước cần
+               cộng dồn chính xác (rolling của pandas, bộ lọc đệ quy) vẫn tính nội bộ bằng float64.
+
+    Returns:
+        dict[str, np.ndarray]: Mảng kết quả theo tên cột.
+
+    Ví dụ:
+        compute_indicators(df, [('rsi', {'period': 14}), ('bollinger_bands', {'period': 20})],
+                           outputs=['RSI_14', 'Upper', 'Lower'], dtype=np.float32)
+    """
+    pipeline = IndicatorPipeline()
+    for indicator in indicators:
+        name, params = (indicator, {}) if isinstance(indicator, str) else indicator
+        pipeline.add(name, **params)
+
+    columns = pipeline.columns()
+    if outputs is not None:
+        missing = [column for column in outputs if column not in columns]
+        if missing:
+            raise ValueError(f"Không có cột kết quả {missing} trong các chỉ báo đã khai báo {sorted(columns)}")
+        columns = {column: columns[column] for column in outputs}
+
+    graph = IndicatorGraph(ohlc_views(source, dtype=dtype))
+    result = {}
+    for column, key in columns.items():
+        values = graph.value(key)
+        if values.dtype.kind == 'f':
+            values = values.astype(dtype, copy=False)
+        result[column] = values
+    return result
@@ -0,0 +1,107 @@
+"""
+Bộ lọc đệ quy bậc một y[i] = a * y[i - 1] + b * x[i] trên mảng NumPy, dùng chung cho các chỉ báo làm mượt
+(Wilder / RSI, EMA, ...).
+"""
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache(maxsize=64)
+def _block_kernel(a, b, block):
+    """
+    Các ma trận dùng chung của `block_filter` cho hệ số `a`, `b` (tuple, một giá trị hoặc một giá trị mỗi dòng),
+    tính một lần cho mỗi bộ hệ số thay vì ở mỗi lần gọi và mỗi mức đệ quy.
+    """
+    # Hệ số dạng (số dòng hoặc 1, 1, 1) để dùng chung công thức cho hệ số vô hướng và theo dòng
+    a = np.reshape(a, (-1, 1, 1))
+    b = np.reshape(b, (-1, 1, 1))
+    steps = np.arange(block)
+    lag = steps[None, :] - steps[:, None]
+    # kernel[j, i]: ảnh hưởng của x tại vị trí j lên y tại vị trí i trong cùng khối (đã chuyển vị cho matmul)
+    kernel = np.where(lag >= 0, b * a ** np.maximum(lag, 0), 0.0)
+    last = np.ascontiguousarray(kernel[:, :, -1:])
+    decay = a[:, 0] ** (steps + 1)
+    # Trạng thái s mang sang một khối tương đương đầu vào s * a / b thêm vào nến đầu của khối
+    carry = (a / b)[:, 0]
+    block_a = tuple((a[:, 0, 0] ** block).tolist())
+    return kernel, last, decay, carry, block_a
+
+
+def _coefficients(value):
+    # Khóa của bộ đệm `_block_kernel`: tuple hệ số (đệ quy truyền thẳng tuple, không cần đổi lại)
+    return value if isinstance(value, tuple) else tuple(np.ravel(value).tolist())
+
+
+def block_filter(values, a, b, initial, block=16, overwrite=False, out=None):
+    """
+    Bộ lọc đệ quy bậc một y[i] = a * y[i - 1] + b * x[i] theo trục cuối của mảng 2-D.
+
+    Mảng được chia thành các khối `block` nến: phần đáp ứng bên trong khối được tính bằng
+    một phép nhân ma trận, trạng thái cuối mỗi khối được lan truyền bằng chính bộ lọc này
+    (hệ số a ** block) nên không có vòng lặp Python theo từng nến.
+    `a` và `b` có thể là số hoặc mảng một hệ số cho mỗi dòng.
+    Với `overwrite=True`, `values` được dùng làm vùng nhớ tạm và bị thay đổi. `out` (nếu có) nhận kết quả,
+    không được chồng lên `values`.
+    """
+    n_series, n_bars = values.shape
+    full_blocks, remainder = divmod(n_bars, block)
+    kernel, last, decay, carry, block_a = _block_kernel(_coefficients(a), _coefficients(b), block)
+    initial = np.asarray(initial, dtype=float)
+    if initial.shape != (n_series,):
+        initial = np.full(n_series, initial)
+
+    if out is None:
+        out = np.empty((n_series, n_bars))
+    state = initial
+    if full_blocks:
+        size = full_blocks * block
+        inputs = values[:, :size] if overwrite else values[:, :size].copy()
+        inputs = inputs.reshape(n_series, full_blocks, block)
+
+        # Đáp ứng tại nến cuối mỗi khối (trạng thái đầu khối bằng 0) là đầu vào của bộ lọc theo khối,
+        # hệ số a ** block, cho ra trạng thái cuối của từng khối
+        block_inputs = (inputs @ last)[:, :, 0]
+        block_ends = block_filter(block_inputs, block_a, (1.0,), initial, block, overwrite=True)
+
+        # Phần mang sang từ khối trước được gộp vào cùng phép nhân ma trận
+        inputs[:, 0, 0] += initial * carry[:, 0]
+        inputs[:, 1:, 0] += block_ends[:, :-1] * carry
+        np.matmul(inputs, kernel, out=out[:, :size].reshape(n_series, full_blocks, block))
+        state = block_ends[:, -1]
+
+    if remainder:
+        tail = values[:, full_blocks * block:]
+        out[:, full_blocks * block:] = ((tail[:, None, :] @ kernel[:, :remainder, :remainder])[:, 0]
+                                        + state[:, None] * decay[:, :remainder])
+    return out
+
+
+def linear_filter(values, a, b, initial, out=None, chunk=1 << 16):
+    """
+    Bộ lọc đệ quy bậc một y[i] = a * y[i - 1] + b * x[i] trên mảng 2-D (số chuỗi x số nến).
+
+    Chuỗi dài được xử lý theo từng đoạn `chunk` nến để dữ liệu trung gian nằm gọn trong cache,
+    trạng thái cuối của đoạn trước là trạng thái khởi tạo của đoạn sau.
+
+    Args:
+        values (np.ndarray): Mảng 2-D đầu vào.
+        a (float | np.ndarray): Hệ số hồi quy, chung hoặc một giá trị cho mỗi chuỗi.
+        b (float | np.ndarray): Hệ số đầu vào, chung hoặc một giá trị cho mỗi chuỗi.
+        initial (np.ndarray): Trạng thái y[-1] của mỗi chuỗi.
+        out (np.ndarray, optional): Mảng nhận kết quả, cùng kích thước với `values`.
+        chunk (int): Số nến tối đa của mỗi đoạn.
+
+    Returns:
+        np.ndarray: Kết quả lọc.
+    """
+    if out is None:
+        out = np.empty(values.shape)
+
+    state = np.asarray(initial, dtype=float)
+    for start in range(0, values.shape[1], chunk):
+        stop = min(start + chunk, values.shape[1])
+        out[:, start:stop] = block_filter(values[:, start:stop], a, b, state)
+        state = out[:, stop - 1]
+
+    return out
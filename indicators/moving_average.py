@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 
+from indicators.filters import linear_filter
+
 
 def sma(df, period):
     df[f'sma_{period}'] = df['close'].rolling(window=period).mean()
@@ -13,11 +15,142 @@ def ema(df, period):
 
 
 def wma(df, period):
-    weights = pd.Series(range(1, period + 1))
-    df[f'wma_{period}'] = df['close'].rolling(window=period).apply(lambda prices: np.dot(prices, weights) / weights.sum(), raw=True)
+    df[f'wma_{period}'] = wma_values(df['close'].to_numpy(dtype=float), period)
     return df
 
 
 def calculate_ema(prices, period):
     """Tính đường EMA."""
     return prices.ewm(span=period, adjust=False).mean()
+
+
+def wma_values(close, period):
+    """
+    Tính WMA (trọng số 1..period, nến mới nhất trọng số lớn nhất) bằng tích chập.
+
+    Args:
+        close (array-like): Giá đóng cửa.
+        period (int): Chu kỳ WMA.
+
+    Returns:
+        np.ndarray: Giá trị WMA, NaN cho `period` - 1 nến đầu.
+    """
+    close = np.asarray(close, dtype=float)
+    result = np.full(len(close), np.nan)
+    if 1 <= period <= len(close):
+        weights = np.arange(1, period + 1, dtype=float)
+        # np.convolve đảo ngược kernel, nên truyền trọng số theo thứ tự giảm dần
+        result[period - 1:] = np.convolve(close, weights[::-1], mode='valid') / weights.sum()
+    return result
+
+
+def _rolling_sums(values, periods, chunk=1 << 12):
+    """
+    Tổng trượt của `values` cho nhiều chu kỳ, kết quả (số chu kỳ x số nến), NaN khi cửa sổ chưa đủ.
+
+    Mỗi đoạn `chunk` nến dùng một tổng tích lũy riêng, trừ đi giá trị đầu đoạn, nên độ lớn tổng tích lũy
+    và sai số làm tròn không tăng theo độ dài lịch sử. Giá NaN được cộng như 0 và đếm riêng,
+    cửa sổ nào chứa NaN thì kết quả là NaN như `rolling(period).sum()`.
+    """
+    n_bars = len(values)
+    result = np.full((len(periods), n_bars), np.nan)
+    longest = max(periods, default=0)
+    missing = np.isnan(values)
+    has_missing = missing.any()
+
+    for start in range(0, n_bars, chunk):
+        stop = min(start + chunk, n_bars)
+        offset = max(0, start - longest)
+        window = values[offset:stop]
+        reference = 0.0 if missing[offset] else values[offset]
+        cumulative = np.empty(stop - offset + 1)
+        cumulative[0] = 0.0
+        if has_missing:
+            np.cumsum(np.nan_to_num(window - reference), out=cumulative[1:])
+            missing_count = np.zeros(stop - offset + 1, dtype=np.int64)
+            np.cumsum(missing[offset:stop], out=missing_count[1:])
+        else:
+            np.cumsum(window - reference, out=cumulative[1:])
+
+        # Tổng của cửa sổ kết thúc tại nến i là cumulative[i + 1] - cumulative[i + 1 - p]
+        for k, period in enumerate(periods):
+            first = max(start, period - 1)
+            if first >= stop:
+                continue
+            ends = slice(first - offset + 1, stop - offset + 1)
+            begins = slice(first - offset + 1 - period, stop - offset + 1 - period)
+            np.subtract(cumulative[ends], cumulative[begins], out=result[k, first:stop])
+            result[k, first:stop] += reference * period
+            if has_missing:
+                result[k, first:stop][missing_count[ends] > missing_count[begins]] = np.nan
+
+    return result
+
+
+def sma_batch(close, periods):
+    """
+    Tính SMA cho nhiều chu kỳ trong một lần, dùng chung một tổng tích lũy.
+
+    Args:
+        close (array-like): Giá đóng cửa.
+        periods (list[int]): Danh sách chu kỳ.
+
+    Returns:
+        np.ndarray: Mảng (số nến x số chu kỳ), cột k là SMA của periods[k].
+    """
+    close = np.asarray(close, dtype=float)
+    periods = [int(period) for period in periods]
+    sums = _rolling_sums(close, periods)
+    sums /= np.asarray(periods, dtype=float)[:, None]
+    return sums.T
+
+
+def ema_batch(close, periods):
+    """
+    Tính EMA (`ewm(span=period, adjust=False)`) cho nhiều chu kỳ trong một lần gọi bộ lọc đệ quy dạng khối.
+
+    Args:
+        close (array-like): Giá đóng cửa.
+        periods (list[int]): Danh sách chu kỳ.
+
+    Returns:
+        np.ndarray: Mảng (số nến x số chu kỳ), cột k là EMA của periods[k].
+    """
+    close = np.asarray(close, dtype=float)
+    result = np.empty((len(periods), len(close)))
+    if len(close) == 0:
+        return result.T
+
+    if np.isnan(close).any():
+        # NaN được pandas bỏ qua khi cập nhật trọng số, bộ lọc tuyến tính thì lan truyền NaN
+        for k, period in enumerate(periods):
+            result[k] = pd.Series(close).ewm(span=period, adjust=False).mean().to_numpy()
+        return result.T
+
+    # Mọi chu kỳ được lọc cùng lúc, mỗi dòng một hệ số alpha
+    alpha = 2 / (np.asarray(periods, dtype=float) + 1)
+    result[:, 0] = close[0]
+    values = np.broadcast_to(close[1:], (len(periods), len(close) - 1))
+    linear_filter(values, 1 - alpha, alpha, result[:, 0], out=result[:, 1:])
+    return result.T
+
+
+def wma_batch(close, periods):
+    """
+    Tính WMA cho nhiều chu kỳ, mỗi cột là một tích chập trên cùng mảng giá.
+
+    Tích chập giữ nguyên thứ tự cộng trong cửa sổ nên không có sai số tích lũy như khi suy WMA
+    từ tổng tích lũy của tổng tích lũy.
+
+    Args:
+        close (array-like): Giá đóng cửa.
+        periods (list[int]): Danh sách chu kỳ.
+
+    Returns:
+        np.ndarray: Mảng (số nến x số chu kỳ), cột k là WMA của periods[k].
+    """
+    close = np.asarray(close, dtype=float)
+    result = np.empty((len(periods), len(close)))
+    for k, period in enumerate(periods):
+        result[k] = wma_values(close, period)
+    return result.T
@@ -0,0 +1,328 @@
+import numpy as np
+import pandas as pd
+
+from indicators.momentum import rsi_values
+from indicators.moving_average import wma_values
+from indicators.support_resistence import support_resistance_levels
+from indicators.trend import ParabolicSar, ParabolicSarResult, ama_values, frama_values
+from indicators.trend_lines import TrendlineEngine, TrendlineResult
+
+CLOSE = ('column', 'close')
+HIGH = ('column', 'high')
+LOW = ('column', 'low')
+
+
+# ------ Các nút trung gian của đồ thị ------ #
+# Mỗi nút được định danh bằng tuple (tên, *tham số); tham số có thể là khóa của nút khác,
+# nên hai chỉ báo cùng cần một đại lượng (True Range, EMA của close, ...) sẽ dùng chung một nút.
+
+def _column(graph, name):
+    # Giữ nguyên kiểu số thực của nguồn (vd. float32), kiểu khác được chuyển sang float64
+    values = np.asarray(graph.source[name])
+    return values if values.dtype.kind == 'f' else values.astype(float)
+
+
+def _shift(graph, key, periods):
+    return pd.Series(graph.value(key)).shift(periods).to_numpy()
+
+
+def _diff(graph, key):
+    return pd.Series(graph.value(key)).diff().to_numpy()
+
+
+def _true_range(graph):
+    high = graph.value(HIGH)
+    low = graph.value(LOW)
+    previous_close = graph.value(('shift', CLOSE, 1))
+    # np.fmax bỏ qua NaN giống max(axis=1) của pandas (nến đầu tiên chỉ có high - low)
+    return np.fmax(np.fmax(high - low, np.abs(high - previous_close)), np.abs(low - previous_close))
+
+
+def _rolling_mean(graph, key, period):
+    return pd.Series(graph.value(key)).rolling(window=period).mean().to_numpy()
+
+
+def _rolling_std(graph, key, period):
+    return pd.Series(graph.value(key)).rolling(window=period).std().to_numpy()
+
+
+def _ema(graph, key, period):
+    return pd.Series(graph.value(key)).ewm(span=period, adjust=False).mean().to_numpy()
+
+
+def _wilder_ewm(graph, key, period):
+    return pd.Series(graph.value(key)).ewm(alpha=1 / period).mean().to_numpy()
+
+
+def _directional_movement(graph, sign):
+    # +DM: phần tăng của high (âm thì bằng 0), -DM: phần giảm của low (dương thì bằng 0), giống hàm adx
+    if sign > 0:
+        movement = graph.value(('diff', HIGH)).copy()
+        movement[movement < 0] = 0
+    else:
+        movement = graph.value(('diff', LOW)).copy()
+        movement[movement > 0] = 0
+    return movement
+
+
+def _dx(graph, period):
+    atr = graph.value(('rolling_mean', ('true_range',), period))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = 100 * (graph.value(('wilder_ewm', ('directional_movement', 1), period)) / atr)
+        minus_di = np.abs(100 * (graph.value(('wilder_ewm', ('directional_movement', -1), period)) / atr))
+        return (np.abs(plus_di - minus_di) / np.abs(plus_di + minus_di)) * 100
+
+
+def _rsi(graph, key, period):
+    return rsi_values(graph.value(key), period)
+
+
+def _wma(graph, key, period):
+    return wma_values(graph.value(key), period)
+
+
+def _difference(graph, first, second):
+    return graph.value(first) - graph.value(second)
+
+
+def _item(graph, key, index):
+    # Một thành phần của nút trả về nhiều mảng (support/resistance, trendline, Parabolic SAR)
+    return graph.value(key)[index]
+
+
+def _support_resistance(graph, level_range, pip, min_occurrence):
+    close = graph.value(CLOSE)
+    return support_resistance_levels(graph.value(LOW), graph.value(HIGH), close[-1], level_range, pip, min_occurrence)
+
+
+def _trendlines(graph, length, mult, method):
+    return TrendlineEngine(length, mult, method).extend(graph.value(HIGH), graph.value(LOW), graph.value(CLOSE))
+
+
+def _parabolic_sar(graph, initial_af, step, max_af):
+    return ParabolicSar(initial_af, step, max_af).extend(graph.value(HIGH), graph.value(LOW), graph.value(CLOSE))
+
+
+def _ama(graph, period, fast_period, slow_period):
+    return ama_values(graph.value(CLOSE), period, fast_period, slow_period)
+
+
+def _frama(graph, period, long_period):
+    return frama_values(graph.value(HIGH), graph.value(LOW), graph.value(CLOSE), period, long_period)
+
+
+def _bollinger_band(graph, mid, std, multiplier, side):
+    # side = 1: dải trên, side = -1: dải dưới
+    if side > 0:
+        return graph.value(mid) + (multiplier * graph.value(std))
+    return graph.value(mid) - (multiplier * graph.value(std))
+
+
+def _dema(graph, period):
+    ema1 = graph.value(('ema', CLOSE, period))
+    ema2 = graph.value(('ema', ('ema', CLOSE, period), period))
+    return 2 * ema1 - ema2
+
+
+def _tema(graph, period):
+    ema1_key = ('ema', CLOSE, period)
+    ema2_key = ('ema', ema1_key, period)
+    ema1 = graph.value(ema1_key)
+    ema2 = graph.value(ema2_key)
+    ema3 = graph.value(('ema', ema2_key, period))
+    return 3 * (ema1 - ema2) + ema3
+
+
+NODES = {
+    'column': _column,
+    'shift': _shift,
+    'diff': _diff,
+    'true_range': _true_range,
+    'rolling_mean': _rolling_mean,
+    'rolling_std': _rolling_std,
+    'ema': _ema,
+    'wilder_ewm': _wilder_ewm,
+    'directional_movement': _directional_movement,
+    'dx': _dx,
+    'rsi': _rsi,
+    'wma': _wma,
+    'difference': _difference,
+    'item': _item,
+    'support_resistance': _support_resistance,
+    'trendlines': _trendlines,
+    'parabolic_sar': _parabolic_sar,
+    'ama': _ama,
+    'frama': _frama,
+    'bollinger_band': _bollinger_band,
+    'dema': _dema,
+    'tema': _tema,
+}
+
+
+class IndicatorGraph:
+    """
+    Đồ thị phụ thuộc (DAG) của các nút chỉ báo trên một bộ dữ liệu.
+
+    Giá trị của mỗi nút được tính một lần khi được yêu cầu lần đầu (các nút phụ thuộc được tính trước
+    theo thứ tự duyệt sâu) rồi lưu lại, các chỉ báo sau dùng lại kết quả đã có.
+
+    Args:
+        source (pd.DataFrame | dict): Dữ liệu nguồn, truy cập được theo tên cột ('open', 'high', 'low', 'close').
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.values = {}
+
+    def value(self, key):
+        """Giá trị (np.ndarray) của nút `key`, tính và lưu lại nếu chưa có."""
+        if key not in self.values:
+            name, *params = key
+            self.values[key] = NODES[name](self, *params)
+        return self.values[key]
+
+
+# ------ Các chỉ báo khai báo được trong pipeline ------ #
+# Mỗi chỉ báo trả về {tên cột: khóa nút}, tên cột giống các hàm chỉ báo tương ứng.
+
+def _sma_columns(period):
+    return {f'sma_{period}': ('rolling_mean', CLOSE, period)}
+
+
+def _ema_columns(period):
+    return {f'ema_{period}': ('ema', CLOSE, period)}
+
+
+def _wma_columns(period):
+    return {f'wma_{period}': ('wma', CLOSE, period)}
+
+
+def _rsi_columns(period=14):
+    return {f'RSI_{period}': ('rsi', CLOSE, period)}
+
+
+def _bollinger_bands_columns(period=20, multiplier=2):
+    mid = ('rolling_mean', CLOSE, period)
+    std = ('rolling_std', CLOSE, period)
+    return {'MID': mid, 'STD': std, 'Upper': ('bollinger_band', mid, std, multiplier, 1),
+            'Lower': ('bollinger_band', mid, std, multiplier, -1)}
+
+
+def _atr_columns(period=14):
+    return {'True_Range': ('true_range',), 'atr': ('rolling_mean', ('true_range',), period)}
+
+
+def _adx_columns(period=14):
+    return {'adx': ('rolling_mean', ('dx', period), period)}
+
+
+def _dema_columns(period=20):
+    return {'dema': ('dema', period)}
+
+
+def _tema_columns(period=20):
+    return {'tema': ('tema', period)}
+
+
+def _macd_columns(short_period=12, long_period=26, signal_period=9):
+    ema_short = ('ema', CLOSE, short_period)
+    ema_long = ('ema', CLOSE, long_period)
+    macd_line = ('difference', ema_short, ema_long)
+    signal_line = ('ema', macd_line, signal_period)
+    return {'ema_short': ema_short, 'ema_long': ema_long, 'macd_line': macd_line, 'signal_line': signal_line,
+            'macd_histogram': ('difference', macd_line, signal_line)}
+
+
+def _support_resistance_columns(level_range=20, pip=0.0001, min_occurrence=2):
+    levels = ('support_resistance', level_range, pip, min_occurrence)
+    return {'support': ('item', levels, 0), 'resistance': ('item', levels, 1)}
+
+
+def _trendlines_columns(length=14, mult=1.0, method='Atr'):
+    trendlines = ('trendlines', length, mult, method)
+    return {name: ('item', trendlines, index) for index, name in enumerate(TrendlineResult._fields)}
+
+
+def _parabolic_sar_columns(initial_af=0.02, step=0.02, max_af=0.2):
+    psar = ('parabolic_sar', initial_af, step, max_af)
+    return {name: ('item', psar, index) for index, name in enumerate(ParabolicSarResult._fields[:4])}
+
+
+def _ama_columns(period=10, fast_period=2, slow_period=30):
+    return {'ama': ('ama', period, fast_period, slow_period)}
+
+
+def _frama_columns(period=10, long_period=30):
+    return {'frama': ('frama', period, long_period)}
+
+
+INDICATORS = {
+    'sma': _sma_columns,
+    'ema': _ema_columns,
+    'wma': _wma_columns,
+    'rsi': _rsi_columns,
+    'bollinger_bands': _bollinger_bands_columns,
+    'atr': _atr_columns,
+    'adx': _adx_columns,
+    'dema': _dema_columns,
+    'tema': _tema_columns,
+    'macd': _macd_columns,
+    'support_resistance': _support_resistance_columns,
+    'trendlines': _trendlines_columns,
+    'parabolic_sar': _parabolic_sar_columns,
+    'ama': _ama_columns,
+    'frama': _frama_columns,
+}
+
+
+class IndicatorPipeline:
+    """
+    Pipeline chỉ báo: chiến lược khai báo các chỉ báo cần dùng, pipeline gom chúng thành một DAG
+    và tính mỗi đại lượng trung gian dùng chung đúng một lần.
+
+    Ví dụ:
+        pipeline = IndicatorPipeline().add('rsi', period=14).add('sma', period=20).add('bollinger_bands', period=20)
+        pipeline.apply(df)  # MID của Bollinger dùng lại sma_20
+
+    Tên cột kết quả giống các hàm chỉ báo riêng lẻ (RSI_14, sma_20, MID/STD/Upper/Lower, atr, adx, ...).
+    """
+
+    def __init__(self):
+        self.requests = []
+
+    def add(self, name, **params):
+        """Khai báo một chỉ báo (xem `INDICATORS`) cùng tham số của nó."""
+        if name not in INDICATORS:
+            raise ValueError(f"Chỉ báo không hỗ trợ: {name!r}, chọn một trong {sorted(INDICATORS)}")
+        self.requests.append((name, params))
+        return self
+
+    def columns(self):
+        """Ánh xạ tên cột kết quả sang khóa nút trong đồ thị."""
+        columns = {}
+        for name, params in self.requests:
+            columns.update(INDICATORS[name](**params))
+        return columns
+
+    def compute(self, source, graph=None):
+        """
+        Tính mọi chỉ báo đã khai báo.
+
+        Args:
+            source (pd.DataFrame | dict): Dữ liệu nguồn.
+            graph (IndicatorGraph, optional): Đồ thị đã có để dùng lại các nút đã tính.
+
+        Returns:
+            dict[str, np.ndarray]: Giá trị của từng cột kết quả.
+        """
+        graph = IndicatorGraph(source) if graph is None else graph
+        return {column: graph.value(key) for column, key in self.columns().items()}
+
+    def apply(self, df):
+        """Tính các chỉ báo và gán kết quả vào `df` (giống các hàm chỉ báo riêng lẻ), trả về `df`."""
+        assigned = set()
+        for column, values in self.compute(df).items():
+            # Các cột dùng chung một nút (vd. sma_20 và MID) nhận bản sao riêng
+            df[column] = values.copy() if id(values) in assigned else values
+            assigned.add(id(values))
+        return df
@@ -0,0 +1,418 @@
+import math
+from collections import deque
+
+nan = float('nan')
+
+
+class _EwmState:
+    """Trạng thái EWM cập nhật từng giá trị, cùng công thức với `pd.Series.ewm(...).mean()`."""
+
+    __slots__ = ('_factor', '_new_wt', '_adjust', '_old_wt', 'value')
+
+    def __init__(self, alpha, adjust):
+        self._factor = 1 - alpha
+        self._new_wt = 1.0 if adjust else alpha
+        self._adjust = adjust
+        self._old_wt = 1.0
+        self.value = nan
+
+    def update(self, x):
+        if self.value != self.value:
+            # Chưa có quan sát nào: giá trị đầu tiên hợp lệ là điểm khởi tạo
+            if x == x:
+                self.value = x
+            return self.value
+
+        self._old_wt *= self._factor
+        if x == x:
+            if self.value != x:
+                self.value = (self._old_wt * self.value + self._new_wt * x) / (self._old_wt + self._new_wt)
+            self._old_wt = self._old_wt + self._new_wt if self._adjust else 1.0
+        return self.value
+
+
+class _RollingMean:
+    """Trung bình trượt `period` phần tử, NaN khi cửa sổ chưa đủ hoặc chứa NaN (như `rolling().mean()`)."""
+
+    __slots__ = ('period', '_window', '_sum', '_compensation', '_nan_count')
+
+    def __init__(self, period):
+        self.period = period
+        self._window = deque()
+        self._sum = 0.0
+        self._compensation = 0.0
+        self._nan_count = 0
+
+    def _add(self, x):
+        # Cộng có bù sai số (Neumaier) để tổng không bị trôi sau hàng triệu lần cập nhật
+        total = self._sum + x
+        if abs(self._sum) >= abs(x):
+            self._compensation += (self._sum - total) + x
+        else:
+            self._compensation += (x - total) + self._sum
+        self._sum = total
+
+    def update(self, x):
+        self._window.append(x)
+        if x == x:
+            self._add(x)
+        else:
+            self._nan_count += 1
+
+        if len(self._window) > self.period:
+            old = self._window.popleft()
+            if old == old:
+                self._add(-old)
+            else:
+                self._nan_count -= 1
+
+        if len(self._window) < self.period or self._nan_count:
+            return nan
+        return (self._sum + self._compensation) / self.period
+
+
+class StreamingSMA:
+    """
+    Đường trung bình động đơn giản cập nhật theo từng nến đóng, O(1) thời gian và bộ nhớ.
+
+    Args:
+        period (int): Chu kỳ SMA.
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self._mean = _RollingMean(period)
+        self.value = nan
+
+    def update(self, close):
+        self.value = self._mean.update(close)
+        return self.value
+
+
+class StreamingEMA:
+    """
+    Đường EMA (`ewm(span=period, adjust=False)`) cập nhật theo từng nến đóng.
+
+    Args:
+        period (int): Chu kỳ EMA.
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self._ewm = _EwmState(2 / (period + 1), adjust=False)
+        self.value = nan
+
+    def update(self, close):
+        self.value = self._ewm.update(close)
+        return self.value
+
+
+class StreamingRSI:
+    """
+    RSI làm mượt Wilder cập nhật theo từng nến đóng, cho cùng giá trị với `rsi` sau giai đoạn khởi động.
+
+    Args:
+        period (int): Chu kỳ RSI.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self._count = 0
+        self._prev_close = None
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+        self.value = nan
+
+    def update(self, close):
+        if self._prev_close is None:
+            gain = loss = 0.0
+        else:
+            delta = close - self._prev_close
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else 0.0
+        self._prev_close = close
+
+        index = self._count
+        self._count += 1
+        period = self.period
+
+        if index < period:
+            # Tích lũy tổng cho trung bình SMA đầu tiên
+            self._avg_gain += gain
+            self._avg_loss += loss
+            return self.value
+        if index == period:
+            # Trung bình đầu tiên dùng `period` nến trước đó, giống hàm rsi
+            self._avg_gain /= period
+            self._avg_loss /= period
+        else:
+            self._avg_gain = (self._avg_gain * (period - 1) + gain) / period
+            self._avg_loss = (self._avg_loss * (period - 1) + loss) / period
+
+        if self._avg_loss == 0:
+            self.value = nan
+        else:
+            self.value = 100 * self._avg_gain / (self._avg_gain + self._avg_loss)
+        return self.value
+
+
+class StreamingTrueRange:
+    """True Range của nến vừa đóng, nến đầu tiên dùng high - low."""
+
+    def __init__(self):
+        self._prev_close = None
+        self.value = nan
+
+    def update(self, high, low, close):
+        value = high - low
+        if self._prev_close is not None:
+            value = max(value, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        self.value = value
+        return value
+
+
+class StreamingATR:
+    """
+    ATR (trung bình trượt của True Range) cập nhật theo từng nến đóng, cùng giá trị với `atr`.
+
+    Args:
+        period (int): Chu kỳ ATR.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self._true_range = StreamingTrueRange()
+        self._mean = _RollingMean(period)
+        self.value = nan
+
+    def update(self, high, low, close):
+        self.value = self._mean.update(self._true_range.update(high, low, close))
+        return self.value
+
+
+class StreamingADX:
+    """
+    ADX cập nhật theo từng nến đóng, cùng công thức với `indicators.trend.adx`.
+
+    Args:
+        period (int): Chu kỳ ADX.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self._atr = StreamingATR(period)
+        self._plus_dm = _EwmState(1 / period, adjust=True)
+        self._minus_dm = _EwmState(1 / period, adjust=True)
+        self._dx_mean = _RollingMean(period)
+        self._prev_high = None
+        self._prev_low = None
+        self.value = nan
+
+    def update(self, high, low, close):
+        if self._prev_high is None:
+            plus_dm = minus_dm = nan
+        else:
+            plus_dm = max(high - self._prev_high, 0.0)
+            minus_dm = min(low - self._prev_low, 0.0)
+        self._prev_high = high
+        self._prev_low = low
+
+        atr = self._atr.update(high, low, close)
+        plus_dm = self._plus_dm.update(plus_dm)
+        minus_dm = self._minus_dm.update(minus_dm)
+        plus_di = 100 * (plus_dm / atr) if atr else nan
+        minus_di = abs(100 * (minus_dm / atr)) if atr else nan
+
+        di_sum = abs(plus_di + minus_di)
+        dx = abs(plus_di - minus_di) / di_sum * 100 if di_sum else nan
+        self.value = self._dx_mean.update(dx)
+        return self.value
+
+
+class StreamingBollingerBands:
+    """
+    Dải Bollinger cập nhật theo từng nến đóng, phương sai trượt tính bằng thuật toán Welford.
+
+    Args:
+        period (int): Số chu kỳ của SMA và độ lệch chuẩn.
+        multiplier (float): Hệ số nhân độ lệch chuẩn.
+    """
+
+    def __init__(self, period=20, multiplier=2):
+        self.period = period
+        self.multiplier = multiplier
+        self._window = deque()
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._updates = 0
+        self.mid = self.upper = self.lower = nan
+
+    def update(self, close):
+        window = self._window
+        window.append(close)
+        count = len(window)
+
+        if count > self.period:
+            # Thay phần tử cũ nhất bằng phần tử mới trong một bước Welford
+            old = window.popleft()
+            count -= 1
+            delta = close - old
+            old_mean = self._mean
+            self._mean += delta / count
+            self._m2 += delta * (close - self._mean + old - old_mean)
+
+            # Định kỳ tính lại từ cửa sổ để sai số làm tròn không tích lũy, chi phí trung bình vẫn O(1)
+            self._updates += 1
+            if self._updates % (self.period * 64) == 0:
+                self._mean = math.fsum(window) / count
+                self._m2 = math.fsum((x - self._mean) ** 2 for x in window)
+        else:
+            delta = close - self._mean
+            self._mean += delta / count
+            self._m2 += delta * (close - self._mean)
+
+        if count < self.period:
+            return self.mid, self.upper, self.lower
+
+        std = math.sqrt(max(self._m2, 0.0) / (count - 1)) if count > 1 else nan
+        self.mid = self._mean
+        self.upper = self._mean + self.multiplier * std
+        self.lower = self._mean - self.multiplier * std
+        return self.mid, self.upper, self.lower
+
+
+class StreamingMACD:
+    """
+    MACD (MACD line, Signal line, Histogram) cập nhật theo từng nến đóng, cùng giá trị với `calculate_macd`.
+
+    Args:
+        short_period (int): Chu kỳ EMA ngắn hạn.
+        long_period (int): Chu kỳ EMA dài hạn.
+        signal_period (int): Chu kỳ Signal line.
+    """
+
+    def __init__(self, short_period=12, long_period=26, signal_period=9):
+        self._ema_short = StreamingEMA(short_period)
+        self._ema_long = StreamingEMA(long_period)
+        self._signal = StreamingEMA(signal_period)
+        self.macd_line = self.signal_line = self.histogram = nan
+
+    def update(self, close):
+        self.macd_line = self._ema_short.update(close) - self._ema_long.update(close)
+        self.signal_line = self._signal.update(self.macd_line)
+        self.histogram = self.macd_line - self.signal_line
+        return self.macd_line, self.signal_line, self.histogram
+
+
+class StreamingAMA:
+    """
+    AMA (Kaufman Adaptive Moving Average) cập nhật theo từng nến đóng, cùng công thức với `ama`.
+
+    Args:
+        period (int): Chu kỳ efficiency ratio.
+        fast_period (int): Chu kỳ EMA nhanh.
+        slow_period (int): Chu kỳ EMA chậm.
+    """
+
+    def __init__(self, period=10, fast_period=2, slow_period=30):
+        self.period = period
+        self._fast = 2 / (fast_period + 1)
+        self._slow = 2 / (slow_period + 1)
+        self._closes = deque(maxlen=period + 1)
+        self._volatility = _RollingMean(period)
+        self._count = 0
+        self._initial_sum = 0.0
+        self.value = nan
+
+    def update(self, close):
+        closes = self._closes
+        change = abs(close - closes[-1]) if closes else nan
+        volatility = self._volatility.update(change) * self.period
+        closes.append(close)
+
+        index = self._count
+        self._count += 1
+        if index < self.period:
+            self._initial_sum += close
+            return self.value
+        if index == self.period:
+            # Giá trị đầu tiên là trung bình `period` giá đóng cửa trước đó
+            self.value = self._initial_sum / self.period
+            return self.value
+
+        efficiency_ratio = abs(close - closes[0]) / volatility if volatility else nan
+        smoothing_constant = (efficiency_ratio * (self._fast - self._slow) + self._slow) ** 2
+        self.value = self.value + smoothing_constant * (close - self.value)
+        return self.value
+
+
+class StreamingFRAMA:
+    """
+    FRAMA (Fractal Adaptive Moving Average) cập nhật theo từng nến đóng, cùng công thức với `frama`.
+
+    Max/min của cửa sổ được giữ bằng hàng đợi đơn điệu nên mỗi lần cập nhật là O(1) trung bình.
+
+    Args:
+        period (int): Chu kỳ dùng khi cửa sổ không có biên độ.
+        long_period (int): Độ dài cửa sổ tính số chiều fractal.
+    """
+
+    def __init__(self, period=10, long_period=30):
+        self.period = period
+        self.long_period = long_period
+        self._highs = deque()
+        self._lows = deque()
+        self._log_range = _RollingMean(long_period)
+        self._zero_flags = deque()
+        self._zero_ranges = 0
+        self._count = 0
+        self.value = nan
+
+    def update(self, high, low, close):
+        index = self._count
+        self._count += 1
+
+        if index >= self.long_period:
+            # alpha dùng cửa sổ `long_period` nến trước nến hiện tại
+            distance = self._highs[0][1] - self._lows[0][1]
+            if not distance > 0:
+                alpha = 2 / (self.period + 1)
+            elif self._zero_ranges:
+                alpha = 0.0
+            else:
+                dimension = (math.log(distance) - self._log_range_mean) / math.log(2)
+                alpha = 2 / (dimension + 1)
+
+            if self.value == self.value:
+                self.value = self.value + alpha * (close - self.value)
+            else:
+                self.value = close
+
+        self._push(index, high, low)
+        return self.value
+
+    def _push(self, index, high, low):
+        expired = index - self.long_period
+        highs = self._highs
+        while highs and highs[-1][1] <= high:
+            highs.pop()
+        highs.append((index, high))
+        if highs[0][0] <= expired:
+            highs.popleft()
+
+        lows = self._lows
+        while lows and lows[-1][1] >= low:
+            lows.pop()
+        lows.append((index, low))
+        if lows[0][0] <= expired:
+            lows.popleft()
+
+        # Nến biên độ 0 có log = -inf: đếm riêng, phần trung bình cộng 0 thay thế
+        bar_range = high - low
+        is_zero = bar_range == 0
+        self._zero_flags.append(is_zero)
+        self._zero_ranges += is_zero
+        if len(self._zero_flags) > self.long_period:
+            self._zero_ranges -= self._zero_flags.popleft()
+        self._log_range_mean = self._log_range.update(math.log(bar_range) if bar_range > 0 else 0.0 if is_zero else nan)
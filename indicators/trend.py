@@ -1,3 +1,5 @@
+from collections import namedtuple
+
 import pandas as pd
 import numpy as np
 
@@ -35,6 +37,60 @@ def adx(df, period=14):
     return df
 
 
+def _adaptive_filter(values, alpha, start, initial, restart=False):
+    """
+    Đệ quy y[i] = y[i - 1] + alpha[i] * (x[i] - y[i - 1]) bắt đầu từ y[start] = initial.
+
+    Mọi phần tính theo cửa sổ đã được tính trước thành mảng `alpha`, vòng lặp chỉ còn phép tính
+    số thực trên list Python nên không có chi phí truy cập pandas cho từng nến.
+
+    :param restart: nếu True, khi y[i - 1] là NaN thì y[i] khởi động lại bằng x[i]
+    """
+    n = len(values)
+    if start >= n:
+        return np.full(n, np.nan)
+
+    xs = values.tolist()
+    alphas = alpha.tolist()
+    result = [np.nan] * n
+    previous = result[start] = initial
+
+    for i in range(start + 1, n):
+        if restart and previous != previous:
+            previous = xs[i]
+        else:
+            previous = previous + alphas[i] * (xs[i] - previous)
+        result[i] = previous
+
+    return np.array(result)
+
+
+def ama_values(close, period=10, fast_period=2, slow_period=30):
+    """
+    Tính AMA trên mảng giá đóng cửa, cho kết quả giống hàm `ama`.
+
+    :param close: mảng giá đóng cửa
+    :param period: chu kỳ efficiency ratio
+    :param fast_period: chu kỳ EMA nhanh
+    :param slow_period: chu kỳ EMA chậm
+    :return: np.ndarray giá trị AMA, NaN trước nến `period`
+    """
+    close = np.asarray(close, dtype=float)
+    series = pd.Series(close)
+
+    change = np.abs(close - series.shift(period).to_numpy())
+    volatility = series.diff().abs().rolling(window=period).sum().to_numpy()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        efficiency_ratio = change / volatility
+    fast = 2 / (fast_period + 1)
+    slow = 2 / (slow_period + 1)
+    smoothing_constant = (efficiency_ratio * (fast - slow) + slow) ** 2
+
+    initial = close[:period].mean() if len(close) > period else np.nan
+    return _adaptive_filter(close, smoothing_constant, period, initial)
+
+
 def ama(df, period=10, fast_period=2, slow_period=30):
     """AMA.
     Hàm tính chỉ báo AMA
@@ -44,19 +100,7 @@ def ama(df, period=10, fast_period=2, slow_period=30):
     :param df: dataframe chứa dữ liệu giao dịch OHLCV
     :param period: chu kỳ giao dịch
     """
-    change = abs(df['close'] - df['close'].shift(period))
-    volatility = df['close'].diff().abs().rolling(window=period).sum()
-
-    efficiency_ratio = change / volatility
-    smoothing_constant = (
-            (efficiency_ratio * (2 / (fast_period + 1) - 2 / (slow_period + 1)) + 2 / (slow_period + 1)) ** 2)
-
-    df['ama'] = np.nan
-    df['ama'].iloc[period] = df['close'].iloc[:period].mean()  # Initialize the first value
-
-    for i in range(period + 1, len(df)):
-        df['ama'].iloc[i] = df['ama'].iloc[i - 1] + smoothing_constant.iloc[i] * (
-                df['close'].iloc[i] - df['ama'].iloc[i - 1])
+    df['ama'] = ama_values(df['close'].to_numpy(dtype=float), period, fast_period, slow_period)
 
     return df
 
@@ -85,6 +129,44 @@ def dema(df, period=20):
     return df
 
 
+def frama_values(high, low, close, period=10, long_period=30):
+    """
+    Tính FRAMA trên mảng OHLC, cho kết quả giống hàm `frama`.
+
+    Max/min của cửa sổ `long_period` nến trước đó và trung bình log biên độ nến được tính bằng
+    rolling, nến có biên độ bằng 0 (log = -inf) được đếm riêng và cho alpha = 0 như công thức gốc.
+
+    :param high: mảng giá cao nhất
+    :param low: mảng giá thấp nhất
+    :param close: mảng giá đóng cửa
+    :param period: chu kỳ dùng khi cửa sổ không có biên độ
+    :param long_period: độ dài cửa sổ tính số chiều fractal
+    :return: np.ndarray giá trị FRAMA, NaN trước nến `long_period`
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+
+    # Cửa sổ của nến i là [i - long_period, i), tức rolling rồi dịch 1 nến
+    high_max = pd.Series(high).rolling(window=long_period).max().shift(1).to_numpy()
+    low_min = pd.Series(low).rolling(window=long_period).min().shift(1).to_numpy()
+    distance = high_max - low_min
+
+    bar_range = high - low
+    zero_range = bar_range == 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_range = np.log(np.where(zero_range, 1.0, bar_range))
+        mean_log_range = pd.Series(log_range).rolling(window=long_period).mean().shift(1).to_numpy()
+        has_zero_range = pd.Series(zero_range).rolling(window=long_period).sum().shift(1).to_numpy() > 0
+
+        dimension = (np.log(distance) - mean_log_range) / np.log(2)
+        alpha = np.where(has_zero_range, 0.0, 2 / (dimension + 1))
+    alpha = np.where(distance > 0, alpha, 2 / (period + 1))
+
+    initial = close[long_period] if len(close) > long_period else np.nan
+    return _adaptive_filter(close, alpha, long_period, initial, restart=True)
+
+
 def frama(df, period=10, long_period=30):
     """Fractal Adaptive Moving Average.
     Hàm tính chỉ báo Fractal Adaptive Moving Average
@@ -93,26 +175,8 @@ def frama(df, period=10, long_period=30):
     :param df: dataframe chứa dữ liệu giao dịch OHLCV
     :param period: chu kỳ giao dịch
     """
-    n = len(df)
-    frama = pd.Series(np.nan, index=df.index)
-    for i in range(long_period, n):
-        high_max = df['high'][i - long_period:i].max()
-        low_min = df['low'][i - long_period:i].min()
-        distance = high_max - low_min
-
-        if distance > 0:
-            alpha = (np.log(distance) - np.log(
-                df['high'][i - long_period:i] - df['low'][i - long_period:i]).mean()) / np.log(2)
-            alpha = 2 / (alpha + 1)
-        else:
-            alpha = 2 / (period + 1)
-
-        if pd.notnull(frama[i - 1]):
-            frama[i] = frama[i - 1] + alpha * (df['close'][i] - frama[i - 1])
-        else:
-            frama[i] = df['close'][i]
-
-    df['frama'] = frama
+    df['frama'] = frama_values(df['high'].to_numpy(dtype=float), df['low'].to_numpy(dtype=float),
+                               df['close'].to_numpy(dtype=float), period, long_period)
     return df
 
 
@@ -141,6 +205,129 @@ def ichimoku(df):
     return df
 
 
+ParabolicSarResult = namedtuple('ParabolicSarResult', ['psar', 'psar_bull', 'psar_bear', 'af', 'trend'])
+
+
+class ParabolicSar:
+    """
+    Engine Parabolic SAR chạy trên mảng float64 liên tục, cùng công thức với `parabolic_sar`.
+
+    Trạng thái (SAR, extreme point tăng/giảm, hệ số gia tốc) được giữ giữa các lần gọi `extend`,
+    nên có thể nạp lịch sử một lần rồi thêm từng nến mới mà không tính lại từ đầu.
+    Giống hàm gốc, extreme point của phía không được cập nhật quay về high/low của nến đầu tiên
+    và hệ số gia tốc tăng `step` sau mỗi nến đến khi chạm `max_af`.
+
+    :param initial_af: hệ số gia tốc ban đầu
+    :param step: bước tăng hệ số gia tốc
+    :param max_af: hệ số gia tốc tối đa
+    """
+
+    def __init__(self, initial_af=0.02, step=0.02, max_af=0.2):
+        self.initial_af = initial_af
+        self.step = step
+        self.max_af = max_af
+        self.length = 0
+        self._buffers = [np.empty(0) for _ in ParabolicSarResult._fields[:-1]] + [np.empty(0, dtype=np.int8)]
+        self._state = None
+
+    def _reserve(self, length):
+        capacity = len(self._buffers[0])
+        if length <= capacity:
+            return
+        capacity = max(length, 2 * capacity)
+        for k, buffer in enumerate(self._buffers):
+            grown = np.empty(capacity, dtype=buffer.dtype)
+            grown[:self.length] = buffer[:self.length]
+            self._buffers[k] = grown
+
+    def extend(self, high, low, close):
+        """
+        Thêm các nến mới và trả về kết quả của riêng các nến đó.
+
+        :param high: mảng giá cao nhất của các nến mới
+        :param low: mảng giá thấp nhất của các nến mới
+        :param close: mảng giá đóng cửa của các nến mới
+        :return: ParabolicSarResult(psar, psar_bull, psar_bear, af, trend), trend = 1 (nhánh tăng), -1 (nhánh giảm), 0 (nến đầu)
+        """
+        highs = np.asarray(high, dtype=float).tolist()
+        lows = np.asarray(low, dtype=float).tolist()
+        closes = np.asarray(close, dtype=float).tolist()
+        count = len(closes)
+        if count == 0:
+            return self.result(self.length, self.length)
+
+        psar_values = [0.0] * count
+        bull_values = [0.0] * count
+        bear_values = [0.0] * count
+
+        first = 0
+        if self._state is None:
+            # Nến đầu tiên: SAR bằng giá đóng cửa, extreme point bằng high/low của nến
+            self._state = (closes[0], highs[0], lows[0], self.initial_af, highs[0], lows[0])
+            psar_values[0], bull_values[0], bear_values[0] = self._state[:3]
+            first = 1
+
+        psar, bull, bear, af, first_high, first_low = self._state
+        previous_psar = psar
+
+        # Hệ số gia tốc không phụ thuộc giá: tính trước dãy giá trị cho đến khi chạm max_af
+        af_values = [af] * (count + 1)
+        for k in range(first, count):
+            af = af + self.step
+            if af >= self.max_af:
+                af_values[k + 1:] = [min(af, self.max_af)] * (count - k)
+                break
+            af_values[k + 1] = af
+
+        for k in range(first, count):
+            if closes[k] > psar:
+                psar += af_values[k] * (bull - psar)
+                high = highs[k]
+                if high > bull:
+                    bull = high
+                bear = first_low
+            else:
+                psar -= af_values[k] * (psar - bear)
+                low = lows[k]
+                if low < bear:
+                    bear = low
+                bull = first_high
+            psar_values[k] = psar
+            bull_values[k] = bull
+            bear_values[k] = bear
+
+        self._state = (psar, bull, bear, af_values[count], first_high, first_low)
+
+        # Nhánh của mỗi nến: giá đóng cửa trên hay dưới SAR của nến trước
+        closes = np.asarray(closes)
+        psar_array = np.asarray(psar_values)
+        trend_values = np.where(closes[1:] > psar_array[:-1], 1, -1)
+        trend_values = np.concatenate([[0 if first else (1 if closes[0] > previous_psar else -1)], trend_values])
+        af_values = af_values[1:]
+
+        start = self.length
+        self._reserve(start + count)
+        for buffer, values in zip(self._buffers, (psar_values, bull_values, bear_values, af_values, trend_values)):
+            buffer[start:start + count] = values
+        self.length = start + count
+
+        return self.result(start, self.length)
+
+    def update(self, high, low, close):
+        """Thêm một nến và trả về giá trị SAR của nến đó."""
+        return self.extend((high,), (low,), (close,)).psar[0]
+
+    def result(self, start=0, stop=None):
+        """Kết quả (dạng view chỉ đọc) cho các nến [start, stop)."""
+        stop = self.length if stop is None else stop
+        views = []
+        for buffer in self._buffers:
+            view = buffer[start:stop]
+            view.flags.writeable = False
+            views.append(view)
+        return ParabolicSarResult(*views)
+
+
 def parabolic_sar(df, initial_af=0.02, step=0.02, max_af=0.2):
     """Parabolic SAR.
     Hàm tính chỉ báo Parabolic SAR
@@ -151,22 +338,12 @@ def parabolic_sar(df, initial_af=0.02, step=0.02, max_af=0.2):
     :param df: dataframe chứa dữ liệu giao dịch OHLCV
     """
     # Parabolic SAR
-    df['psar'] = df['close'][0]  # Start with the first close price
-    df['psar_bull'] = df['high'][0]
-    df['psar_bear'] = df['low'][0]
-    df['af'] = initial_af
-
-    for i in range(1, len(df)):
-        if df['close'].iloc[i] > df['psar'].iloc[i - 1]:
-            df['psar'].iloc[i] = df['psar'].iloc[i - 1] + df['af'].iloc[i - 1] * (
-                    df['psar_bull'].iloc[i - 1] - df['psar'].iloc[i - 1])
-            df['psar_bull'].iloc[i] = max(df['psar_bull'].iloc[i - 1], df['high'].iloc[i])
-            df['af'].iloc[i] = min(max_af, df['af'].iloc[i - 1] + step)
-        else:
-            df['psar'].iloc[i] = df['psar'].iloc[i - 1] - df['af'].iloc[i - 1] * (
-                    df['psar'].iloc[i - 1] - df['psar_bear'].iloc[i - 1])
-            df['psar_bear'].iloc[i] = min(df['psar_bear'].iloc[i - 1], df['low'].iloc[i])
-            df['af'].iloc[i] = min(max_af, df['af'].iloc[i - 1] + step)
+    result = ParabolicSar(initial_af, step, max_af).extend(df['high'].to_numpy(), df['low'].to_numpy(),
+                                                           df['close'].to_numpy())
+    df['psar'] = result.psar
+    df['psar_bull'] = result.psar_bull
+    df['psar_bear'] = result.psar_bear
+    df['af'] = result.af
 
     return df
 
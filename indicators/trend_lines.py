@@ -1,6 +1,194 @@
+from collections import namedtuple
+
 import numpy as np
 import pandas as pd
 
+TrendlineResult = namedtuple('TrendlineResult', ['pivot_high', 'pivot_low', 'slope', 'upper', 'lower', 'upos', 'dnos',
+                                                 'upper_break', 'lower_break'])
+
+
+def rolling_linreg_slope(values, length, start=0):
+    """
+    Hệ số góc hồi quy tuyến tính của cửa sổ `length` nến, tính từ tổng trượt trong O(n).
+
+    Với cửa sổ y_0..y_{L-1} và x = 0..L-1: slope = (sum(j * y_j) - (L - 1) / 2 * sum(y_j)) / sum((j - x̄)^2).
+    sum(j * y_j) được lấy từ tổng trượt của t * y với t là chỉ số nến tính theo modulo 2L; hai pha lệch
+    nhau L nến bảo đảm luôn có một pha mà cửa sổ không vắt qua điểm quay vòng, nên các tổng giữ độ lớn
+    nhỏ và sai số tương đương np.polyfit.
+
+    :param values: mảng giá
+    :param length: số nến của cửa sổ hồi quy
+    :param start: chỉ số tuyệt đối của phần tử đầu tiên (để pha không đổi khi tính từng đoạn)
+    :return: np.ndarray hệ số góc, NaN khi cửa sổ chưa đủ
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return values.copy()
+
+    period = 2 * length
+    index = np.arange(start, start + len(values))
+    centered = values - values[0]
+
+    def rolling_sum(x):
+        return pd.Series(x).rolling(window=length).sum().to_numpy()
+
+    total = rolling_sum(centered)
+    phases = (index % period, (index + length) % period)
+    weighted = [rolling_sum(phase * centered) for phase in phases]
+
+    # Pha của nến đầu cửa sổ; cửa sổ không vắt qua điểm quay vòng khi pha đầu <= pha cuối
+    first = [(phase - (length - 1)) % period for phase in phases]
+    moment = np.where(first[0] <= phases[0], weighted[0] - first[0] * total, weighted[1] - first[1] * total)
+
+    x = np.arange(length)
+    return (moment - (length - 1) / 2 * total) / ((x - x.mean()) ** 2).sum()
+
+
+class TrendlineEngine:
+    """
+    Engine trendline kháng cự/hỗ trợ theo chỉ báo LuxAlgo, tính trên mảng NumPy và mở rộng tăng dần.
+
+    Pivot được xác nhận bằng cửa sổ trung tâm 2 * length + 1 nến, nên mỗi lần `extend` chỉ tính lại
+    `length` nến cuối trước đó (pivot chưa đủ nến bên phải) cùng các nến mới. Đường trendline giữa hai
+    pivot được lan truyền dạng đóng pivot - slope * k qua chỉ số pivot gần nhất, không vòng lặp theo nến.
+
+    :param length: số chu kỳ để tính đỉnh/đáy
+    :param mult: hệ số điều chỉnh slope
+    :param method: phương pháp tính slope ('Atr', 'Stdev', 'Linreg')
+    """
+
+    methods = ('Atr', 'Stdev', 'Linreg')
+
+    def __init__(self, length=14, mult=1.0, method='Atr'):
+        if method not in self.methods:
+            raise ValueError(f"method phải là một trong {self.methods}, nhận được {method!r}")
+        self.length = length
+        self.mult = mult
+        self.method = method
+        self.size = 0
+
+        float_columns = ('high', 'low', 'close', 'slope', 'pivot_high', 'pivot_low', 'upper', 'lower',
+                         'upper_break', 'lower_break')
+        self._columns = {name: np.empty(0) for name in float_columns}
+        self._columns.update({name: np.empty(0, dtype=np.int64) for name in ('upos', 'dnos', 'last_high', 'last_low')})
+
+    def _reserve(self, size):
+        capacity = len(self._columns['high'])
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self._columns[name] = grown
+
+    def _slope(self, start, stop):
+        """Slope của các nến [start, stop), chỉ dùng `length` - 1 nến trước start."""
+        length = self.length
+        offset = max(0, start - length + 1)
+        column = self._columns
+        if self.method == 'Atr':
+            high = pd.Series(column['high'][offset:stop]).rolling(window=length)
+            slope = (high.max() - high.min()).to_numpy() / length * self.mult
+        elif self.method == 'Stdev':
+            slope = pd.Series(column['close'][offset:stop]).rolling(window=length).std().to_numpy() / length * self.mult
+        else:
+            slope = rolling_linreg_slope(column['close'][offset:stop], length, offset) * self.mult
+        return slope[start - offset:]
+
+    def _pivots(self, values, start, stop, highest):
+        """Giá tại pivot của các nến [start, stop), NaN nếu không phải pivot hoặc cửa sổ chưa đủ."""
+        length = self.length
+        offset = max(0, start - length)
+        window = pd.Series(values[offset:stop]).rolling(window=length * 2 + 1, center=True)
+        extreme = (window.max() if highest else window.min()).to_numpy()[start - offset:]
+        current = values[start:stop]
+        return np.where(current == extreme, current, np.nan)
+
+    def _propagate(self, start, stop):
+        """Lan truyền trendline, điểm phá vỡ cho các nến [start, stop) từ trạng thái ở nến start - 1."""
+        column = self._columns
+        length = self.length
+        index = np.arange(start, stop)
+        close = column['close'][start:stop]
+        slope = column['slope']
+
+        for pivot, last, line, position, sign in (('pivot_high', 'last_high', 'upper', 'upos', -1),
+                                                  ('pivot_low', 'last_low', 'lower', 'dnos', 1)):
+            # Chỉ số pivot gần nhất (kể cả nến hiện tại), -1 nếu chưa có pivot
+            previous = column[last][start - 1] if start > 0 else -1
+            last_pivot = np.where(np.isnan(column[pivot][start:stop]), -1, index)
+            last_pivot = np.maximum.accumulate(np.maximum(last_pivot, previous))
+            column[last][start:stop] = last_pivot
+
+            has_pivot = last_pivot >= 0
+            anchor = np.where(has_pivot, last_pivot, 0)
+            pivot_value = np.where(has_pivot, column[pivot][anchor], np.nan)
+            pivot_slope = np.where(has_pivot, slope[anchor], 0.0)
+
+            # Giống cộng/trừ slope sau mỗi nến: tại pivot giữ nguyên giá pivot (kể cả khi slope là NaN)
+            bars_since = index - anchor
+            values = np.where(bars_since == 0, pivot_value, pivot_value + sign * pivot_slope * bars_since)
+            column[line][start:stop] = values
+
+            with np.errstate(invalid='ignore'):
+                if sign < 0:
+                    broken = close > values - pivot_slope * length
+                else:
+                    broken = close < values + pivot_slope * length
+            column[position][start:stop] = broken
+
+        # Tín hiệu phá vỡ: nến mà upos/dnos chuyển từ 0 lên 1
+        for position, signal, price in (('upos', 'upper_break', 'low'), ('dnos', 'lower_break', 'high')):
+            current = column[position][start:stop]
+            previous = np.empty_like(current)
+            previous[1:] = current[:-1]
+            previous[:1] = column[position][start - 1] if start > 0 else 1
+            column[signal][start:stop] = np.where(current > previous, column[price][start:stop], np.nan)
+
+    def extend(self, high, low, close):
+        """
+        Thêm các nến mới và cập nhật trendline.
+
+        :param high: mảng giá cao nhất của các nến mới
+        :param low: mảng giá thấp nhất của các nến mới
+        :param close: mảng giá đóng cửa của các nến mới
+        :return: TrendlineResult cho các nến có giá trị thay đổi (từ `length` nến trước các nến mới)
+        """
+        high = np.asarray(high, dtype=float)
+        count = len(high)
+        old_size = self.size
+        new_size = old_size + count
+        if count == 0:
+            return self.result(new_size, new_size)
+
+        self._reserve(new_size)
+        column = self._columns
+        column['high'][old_size:new_size] = high
+        column['low'][old_size:new_size] = low
+        column['close'][old_size:new_size] = close
+        self.size = new_size
+
+        column['slope'][old_size:new_size] = self._slope(old_size, new_size)
+
+        # `length` nến cuối trước đây chưa đủ nến bên phải để xác nhận pivot
+        start = max(0, old_size - self.length)
+        column['pivot_high'][start:new_size] = self._pivots(column['high'], start, new_size, highest=True)
+        column['pivot_low'][start:new_size] = self._pivots(column['low'], start, new_size, highest=False)
+        self._propagate(start, new_size)
+
+        return self.result(start, new_size)
+
+    def result(self, start=0, stop=None):
+        """Kết quả (dạng view chỉ đọc) cho các nến [start, stop)."""
+        stop = self.size if stop is None else stop
+        views = []
+        for name in TrendlineResult._fields:
+            view = self._columns[name][start:stop]
+            view.flags.writeable = False
+            views.append(view)
+        return TrendlineResult(*views)
+
 
 def calculate_trendlines(data, length=14, mult=1.0, method='Atr'):
     """
@@ -17,49 +205,9 @@ def calculate_trendlines(data, length=14, mult=1.0, method='Atr'):
     """
     df = data.copy()
 
-    # Tính Pivot High và Pivot Low
-    df['pivot_high'] = df['high'][(df['high'] == df['high'].rolling(window=length * 2 + 1, center=True).max())]
-    df['pivot_low'] = df['low'][(df['low'] == df['low'].rolling(window=length * 2 + 1, center=True).min())]
-
-    # Tính slope dựa trên phương pháp được chọn
-    if method == 'Atr':
-        df['slope'] = df['high'].rolling(window=length).apply(lambda x: np.ptp(x) / length) * mult
-    elif method == 'Stdev':
-        df['slope'] = df['close'].rolling(window=length).std() / length * mult
-    elif method == 'Linreg':
-        x = np.arange(length)
-        df['slope'] = df['close'].rolling(window=length).apply(lambda y: np.polyfit(x, y, 1)[0]) * mult
-
-    # Khởi tạo các trendline
-    df['upper'] = np.nan
-    df['lower'] = np.nan
-    df['upos'] = 0
-    df['dnos'] = 0
-
-    # Khởi tạo các biến slope
-    slope_ph = 0
-    slope_pl = 0
-
-    # Tính các mức kháng cự và hỗ trợ
-    for i in range(len(df)):
-        if not np.isnan(df['pivot_high'].iloc[i]):
-            slope_ph = df['slope'].iloc[i]
-            df['upper'].iloc[i] = df['pivot_high'].iloc[i]
-        else:
-            df['upper'].iloc[i] = df['upper'].iloc[i - 1] - slope_ph if i > 0 else np.nan
-
-        if not np.isnan(df['pivot_low'].iloc[i]):
-            slope_pl = df['slope'].iloc[i]
-            df['lower'].iloc[i] = df['pivot_low'].iloc[i]
-        else:
-            df['lower'].iloc[i] = df['lower'].iloc[i - 1] + slope_pl if i > 0 else np.nan
-
-        # Tính điểm phá vỡ
-        df['upos'].iloc[i] = 1 if (df['close'].iloc[i] > df['upper'].iloc[i] - slope_ph * length) else 0
-        df['dnos'].iloc[i] = 1 if (df['close'].iloc[i] < df['lower'].iloc[i] + slope_pl * length) else 0
-
-    # Tín hiệu phá vỡ trendline
-    df['upper_break'] = df.apply(lambda row: row['low'] if row['upos'] > row['upos'].shift(1) else np.nan, axis=1)
-    df['lower_break'] = df.apply(lambda row: row['high'] if row['dnos'] > row['dnos'].shift(1) else np.nan, axis=1)
+    engine = TrendlineEngine(length, mult, method)
+    result = engine.extend(df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy())
+    for name, values in zip(TrendlineResult._fields, result):
+        df[name] = values
 
     return df
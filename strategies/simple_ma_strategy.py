@@ -17,9 +17,7 @@ from mt5.trade_execution import close_all_sell_orders
 from mt5.trade_execution import close_all_profitable_orders
 from mt5.trade_execution import update_order_sl_tp
 
-from indicators.momentum import rsi, atr, bollinger_bands
-from indicators.trend import adx
-from indicators.moving_average import sma, ema, wma
+from indicators.pipeline import IndicatorPipeline
 from backtest.simple_back_test import calculate_sl_tp, run_simple_backtest, calculate_strategy_summary, \
     run_simple_backtest_with_daily_target, calculate_sl_tp_with_entry_price
 from backtest.compound_interest_back_test import run_compound_backtest, run_compound_backtest_with_daily_target
@@ -117,11 +115,14 @@ def is_time_in_exclude_range(time, exclude_ranges):
 
 
 def calculate_technical_indicator(df, rsi_period, ma_period, atr_period=14, adx_period=14, bb_period=20):
-    rsi(df, rsi_period)
-    bollinger_bands(df, period=bb_period, multiplier=2)
-    sma(df, ma_period)
-    atr(df, atr_period)
-    adx(df, adx_period)
+    # True Range dùng chung cho atr và adx, SMA dùng chung với dải giữa Bollinger khi cùng chu kỳ
+    (IndicatorPipeline()
+     .add('rsi', period=rsi_period)
+     .add('bollinger_bands', period=bb_period, multiplier=2)
+     .add('sma', period=ma_period)
+     .add('atr', period=atr_period)
+     .add('adx', period=adx_period)
+     .apply(df))
     df['MA'] = df[f'sma_{ma_period}']
     df['RSI'] = df[f'RSI_{rsi_period}']
     return df
@@ -17,9 +17,7 @@ from mt5.trade_execution import close_all_sell_orders
 from mt5.trade_execution import close_all_profitable_orders
 from mt5.trade_execution import update_order_sl_tp
 
-from indicators.momentum import rsi, atr, bollinger_bands
-from indicators.trend import adx
-from indicators.moving_average import sma, ema, wma
+from indicators.pipeline import IndicatorPipeline
 from backtest.simple_back_test import calculate_sl_tp, run_simple_backtest, calculate_strategy_summary, \
     run_simple_backtest_with_daily_target, calculate_sl_tp_with_entry_price
 from backtest.compound_interest_back_test import run_compound_backtest, run_compound_backtest_with_daily_target
@@ -27,9 +25,10 @@ from backtest.models.trailing_stop import TrailingStopConfig
 
 from config.simple_ma_config import load_config, save_config, save_settings
 
-from data.csv_database import CSVDatabase
+from data.csv_database import CSVDatabase, read_tail
 from models.trading_signal import Signal
 
+import io
 import sys
 import logging
 
@@ -83,24 +82,22 @@ def is_time_in_exclude_range(time, exclude_ranges):
 
 
 def calculate_technical_indicator(df, rsi_period, ma_period):
-    rsi(df, rsi_period)
-    sma(df, ma_period)
+    IndicatorPipeline().add('rsi', period=rsi_period).add('sma', period=ma_period).apply(df)
     df['MA'] = df[f'sma_{ma_period}']
     df['RSI'] = df[f'RSI_{rsi_period}']
     return df
 
 
 def calculate_technical_indicator_v2(df, rsi_period, ma_period):
-    rsi(df, rsi_period)
-    ema(df, ma_period)
+    IndicatorPipeline().add('rsi', period=rsi_period).add('ema', period=ma_period).apply(df)
     df['MA'] = df[f'ema_{ma_period}']
     df['RSI'] = df[f'RSI_{rsi_period}']
     return df
 
 
 def read_last_processed_signal(file_path):
-    # Chỉ đọc dòng cuối cùng từ file CSV
-    last_row = pd.read_csv(file_path, skiprows=lambda x: x < sum(1 for _ in open(file_path)) - 1)
+    # Chỉ đọc dòng tiêu đề và dòng cuối cùng từ file CSV (đọc ngược từ cuối file)
+    last_row = pd.read_csv(io.StringIO(read_tail(file_path, 1)))
     return last_row
 
 